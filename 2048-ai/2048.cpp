@@ -6,9 +6,21 @@
 #include <string.h>
 #include <time.h>
 #include <algorithm>
+#include <atomic>
+#include <mutex>
+#include <new>
+#include <thread>
+#include <vector>
 
 #include "2048.h"
 
+#if !defined(_WIN32)
+    #include <fcntl.h>
+    #include <sys/mman.h>
+    #include <sys/stat.h>
+    #include <unistd.h>
+#endif
+
 #include "config.h"
 #if defined(HAVE_UNORDERED_MAP)
     #include <unordered_map>
@@ -47,6 +59,58 @@ static inline board_t transpose(board_t x)
     return b1 | (b2 >> 24) | (b3 << 24);
 }
 
+// Reverse the tiles within every row (mirror left-right): reverse_row on all four rows.
+static inline board_t mirror_rows(board_t x)
+{
+    return ((x & 0x000F000F000F000FULL) << 12) | ((x & 0x00F000F000F000F0ULL) << 4) |
+           ((x & 0x0F000F000F000F00ULL) >>  4) | ((x & 0xF000F000F000F000ULL) >> 12);
+}
+
+// Reverse the order of the rows (mirror top-bottom).
+static inline board_t flip_rows(board_t x)
+{
+    return (x << 48) | ((x << 16) & 0x0000FFFF00000000ULL) | ((x >> 16) & 0x00000000FFFF0000ULL) | (x >> 48);
+}
+
+board_t transform_board(board_t board, int symmetry)
+{
+    if (symmetry & 1) board = mirror_rows(board);
+    if (symmetry & 2) board = flip_rows(board);
+    if (symmetry & 4) board = transpose(board);
+    return board;
+}
+
+int symmetry_move(int symmetry, int move)
+{
+    static const int mirrored[4] = {0, 1, 3, 2};
+    static const int flipped[4] = {1, 0, 2, 3};
+    static const int transposed[4] = {2, 3, 0, 1};
+    if (move < 0) return move;
+    if (symmetry & 1) move = mirrored[move];
+    if (symmetry & 2) move = flipped[move];
+    if (symmetry & 4) move = transposed[move];
+    return move;
+}
+
+board_t canonical_board(board_t board, int *symmetry)
+{
+    board_t mirrored = mirror_rows(board);
+    board_t images[8];
+    images[0] = board;
+    images[1] = mirrored;
+    images[2] = flip_rows(board);
+    images[3] = flip_rows(mirrored);
+    for (int i = 0; i < 4; i++)
+        images[i + 4] = transpose(images[i]);
+    int best = 0;
+    for (int i = 1; i < 8; i++)
+        if (images[i] < images[best])
+            best = i;
+    if (symmetry)
+        *symmetry = best;
+    return images[best];
+}
+
 // Count the number of empty positions (= zero nibbles) in a board.
 // Precondition: the board cannot be fully empty.
 static int count_empty(board_t x)
@@ -71,12 +135,37 @@ static int count_empty(board_t x)
  *
  * Thus, the value is 0 if there is no move, and otherwise equals a value that can easily be
  * xor'ed into the current board state to update the board. */
-static row_t row_left_table [65536];
-static row_t row_right_table[65536];
-static board_t col_up_table[65536];
-static board_t col_down_table[65536];
-static float heur_score_table[65536];
-static float score_table[65536];
+typedef struct {
+    board_t col_up[65536];
+    board_t col_down[65536];
+    float heur_score[65536];
+    float score[65536];
+    row_t row_left[65536];
+    row_t row_right[65536];
+} move_tables_t;
+
+/* The tables in use point either into built_tables or into a read-only mapping of a
+ * table cache file (see init_tables_cached), which processes share through the page cache. */
+static move_tables_t built_tables;
+static const row_t *row_left_table = built_tables.row_left;
+static const row_t *row_right_table = built_tables.row_right;
+static const board_t *col_up_table = built_tables.col_up;
+static const board_t *col_down_table = built_tables.col_down;
+static const float *heur_score_table = built_tables.heur_score;
+static const float *score_table = built_tables.score;
+/* Tables are set up once per process: searches on other threads read them without
+ * locks, so a later init_tables or init_tables_cached call must not rebuild them. */
+static std::once_flag tables_once;
+static bool tables_mapped = false;
+
+static void use_tables(const move_tables_t *tables) {
+    row_left_table = tables->row_left;
+    row_right_table = tables->row_right;
+    col_up_table = tables->col_up;
+    col_down_table = tables->col_down;
+    heur_score_table = tables->heur_score;
+    score_table = tables->score;
+}
 
 // Heuristic scoring settings
 static const float SCORE_LOST_PENALTY = 200000.0f;
@@ -87,7 +176,7 @@ static const float SCORE_SUM_WEIGHT = 11.0f;
 static const float SCORE_MERGES_WEIGHT = 700.0f;
 static const float SCORE_EMPTY_WEIGHT = 270.0f;
 
-void init_tables() {
+static void build_tables(move_tables_t *tables) {
     for (unsigned row = 0; row < 65536; ++row) {
         unsigned line[4] = {
                 (row >>  0) & 0xf,
@@ -105,7 +194,7 @@ void init_tables() {
                 score += (rank - 1) * (1 << rank);
             }
         }
-        score_table[row] = score;
+        tables->score[row] = score;
 
 
         // Heuristic score
@@ -144,7 +233,7 @@ void init_tables() {
             }
         }
 
-        heur_score_table[row] = SCORE_LOST_PENALTY +
+        tables->heur_score[row] = SCORE_LOST_PENALTY +
             SCORE_EMPTY_WEIGHT * empty +
             SCORE_MERGES_WEIGHT * merges -
             SCORE_MONOTONICITY_WEIGHT * std::min(monotonicity_left, monotonicity_right) -
@@ -178,11 +267,109 @@ void init_tables() {
         row_t rev_result = reverse_row(result);
         unsigned rev_row = reverse_row(row);
 
-        row_left_table [    row] =                row  ^                result;
-        row_right_table[rev_row] =            rev_row  ^            rev_result;
-        col_up_table   [    row] = unpack_col(    row) ^ unpack_col(    result);
-        col_down_table [rev_row] = unpack_col(rev_row) ^ unpack_col(rev_result);
+        tables->row_left [    row] =                row  ^                result;
+        tables->row_right[rev_row] =            rev_row  ^            rev_result;
+        tables->col_up   [    row] = unpack_col(    row) ^ unpack_col(    result);
+        tables->col_down [rev_row] = unpack_col(rev_row) ^ unpack_col(rev_result);
+    }
+}
+
+static void build_and_use_tables() {
+    build_tables(&built_tables);
+    use_tables(&built_tables);
+}
+
+void init_tables() {
+    std::call_once(tables_once, build_and_use_tables);
+}
+
+/* Table cache file: this header, zero padding up to TABLE_CACHE_OFFSET, then a
+ * move_tables_t. A file whose header does not match this build is rebuilt. */
+typedef struct {
+    char magic[8];
+    uint32_t version;
+    uint32_t tables_size;
+    float constants[7];
+    uint32_t reserved;
+} table_cache_header_t;
+
+static const size_t TABLE_CACHE_OFFSET = 4096;
+
+static table_cache_header_t table_cache_header() {
+    table_cache_header_t header;
+    memset(&header, 0, sizeof(header));
+    memcpy(header.magic, "2048TBL", 8);
+    header.version = 1;
+    header.tables_size = sizeof(move_tables_t);
+    const float constants[7] = {
+        SCORE_LOST_PENALTY, SCORE_MONOTONICITY_POWER, SCORE_MONOTONICITY_WEIGHT, SCORE_SUM_POWER,
+        SCORE_SUM_WEIGHT, SCORE_MERGES_WEIGHT, SCORE_EMPTY_WEIGHT,
+    };
+    memcpy(header.constants, constants, sizeof(constants));
+    return header;
+}
+
+#if !defined(_WIN32)
+static const move_tables_t *map_table_cache(const char *path) {
+    const size_t size = TABLE_CACHE_OFFSET + sizeof(move_tables_t);
+    int fd = open(path, O_RDONLY);
+    if (fd < 0)
+        return NULL;
+    struct stat st;
+    table_cache_header_t header;
+    table_cache_header_t expected = table_cache_header();
+    void *mapping = MAP_FAILED;
+    if (fstat(fd, &st) == 0 && (size_t)st.st_size == size &&
+            pread(fd, &header, sizeof(header), 0) == (ssize_t)sizeof(header) &&
+            memcmp(&header, &expected, sizeof(header)) == 0) {
+        mapping = mmap(NULL, size, PROT_READ, MAP_SHARED, fd, 0);
+    }
+    close(fd);
+    if (mapping == MAP_FAILED)
+        return NULL;
+    return (const move_tables_t *)((const char *)mapping + TABLE_CACHE_OFFSET);
+}
+
+/* Write to a private temporary name, then rename, so readers never see a partial file. */
+static void write_table_cache(const char *path, const move_tables_t *tables) {
+    std::vector<char> tmp_path(strlen(path) + 32);
+    snprintf(tmp_path.data(), tmp_path.size(), "%s.%ld.tmp", path, (long)getpid());
+    int fd = open(tmp_path.data(), O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    if (fd < 0)
+        return;
+    std::vector<char> head(TABLE_CACHE_OFFSET, 0);
+    table_cache_header_t header = table_cache_header();
+    memcpy(head.data(), &header, sizeof(header));
+    bool ok = write(fd, head.data(), head.size()) == (ssize_t)head.size() &&
+              write(fd, tables, sizeof(*tables)) == (ssize_t)sizeof(*tables);
+    ok = close(fd) == 0 && ok;
+    if (!ok || rename(tmp_path.data(), path) != 0)
+        unlink(tmp_path.data());
+}
+#endif
+
+static void init_tables_from_cache(const char *path) {
+#if !defined(_WIN32)
+    if (path != NULL && *path != '\0') {
+        const move_tables_t *mapped = map_table_cache(path);
+        if (mapped != NULL) {
+            use_tables(mapped);
+            tables_mapped = true;
+            return;
+        }
+        build_and_use_tables();
+        write_table_cache(path, &built_tables);
+        return;
     }
+#else
+    (void)path;
+#endif
+    build_and_use_tables();
+}
+
+int init_tables_cached(const char *path) {
+    std::call_once(tables_once, init_tables_from_cache, path);
+    return tables_mapped ? 1 : 0;
 }
 
 static inline board_t execute_move_0(board_t board) {
@@ -266,20 +453,268 @@ static inline int count_distinct_tiles(board_t board) {
     return count;
 }
 
+/* Endgame tablebases written by tablebase_2048.py: TABLEBASE_HEADER (this struct), zero
+ * padding up to TABLEBASE_OFFSET, then one float per free-region position, indexed by
+ * the free-cell ranks as base-target_rank digits, lowest cell first. */
+typedef struct {
+    char magic[8];
+    uint32_t version;
+    uint32_t target_rank;
+    uint64_t locked;
+    uint64_t locked_mask;
+    uint32_t free_count;
+    int32_t pending_sum; // -1 once every layer is solved
+} tablebase_header_t;
+
+static const size_t TABLEBASE_OFFSET = 64;
+
+struct tablebase_t {
+    const float *values;
+    void *mapping;
+    size_t size;
+    board_t locked;
+    board_t locked_mask;
+    int target_rank;
+    int free_count;
+    int free_shifts[16];
+};
+
+tablebase_t *tablebase_open(const char *path) {
+#if !defined(_WIN32)
+    int fd = open(path, O_RDONLY);
+    if (fd < 0)
+        return NULL;
+    struct stat st;
+    tablebase_header_t header;
+    if (fstat(fd, &st) != 0 || pread(fd, &header, sizeof(header), 0) != (ssize_t)sizeof(header) ||
+            memcmp(header.magic, "2048TBS", 8) != 0 || header.version != 1 || header.pending_sum >= 0 ||
+            header.target_rank < 2 || header.target_rank > 15 || header.free_count > 16) {
+        close(fd);
+        return NULL;
+    }
+    tablebase_t *tb = new tablebase_t();
+    tb->locked = header.locked;
+    tb->locked_mask = header.locked_mask;
+    tb->target_rank = header.target_rank;
+    tb->free_count = 0;
+    size_t positions = 1;
+    for (int cell = 0; cell < 16; cell++) {
+        if (((header.locked_mask >> (4 * cell)) & 0xf) == 0) {
+            tb->free_shifts[tb->free_count++] = 4 * cell;
+            positions *= header.target_rank;
+        }
+    }
+    tb->size = TABLEBASE_OFFSET + positions * sizeof(float);
+    void *mapping = MAP_FAILED;
+    if (tb->free_count == (int)header.free_count && (size_t)st.st_size == tb->size)
+        mapping = mmap(NULL, tb->size, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    if (mapping == MAP_FAILED) {
+        delete tb;
+        return NULL;
+    }
+    tb->mapping = mapping;
+    tb->values = (const float *)((const char *)mapping + TABLEBASE_OFFSET);
+    return tb;
+#else
+    (void)path;
+    return NULL;
+#endif
+}
+
+void tablebase_close(tablebase_t *tb) {
+    if (!tb)
+        return;
+#if !defined(_WIN32)
+    munmap(tb->mapping, tb->size);
+#endif
+    delete tb;
+}
+
+float tablebase_probe(const tablebase_t *tb, board_t board) {
+    if ((board & tb->locked_mask) != tb->locked)
+        return -1.0f;
+    size_t index = 0;
+    for (int i = tb->free_count - 1; i >= 0; i--) {
+        int rank = (board >> tb->free_shifts[i]) & 0xf;
+        if (rank >= tb->target_rank)
+            return 1.0f;
+        index = index * tb->target_rank + rank;
+    }
+    return tb->values[index];
+}
+
+// Success chance of a board that still has to take its spawn, or -1 outside the tablebase.
+static float tablebase_chance_value(const tablebase_t *tb, board_t board) {
+    float value = tablebase_probe(tb, board);
+    if (value < 0.0f || value >= 1.0f)
+        return value;
+    int num_open = 0;
+    float total = 0.0f;
+    for (int i = 0; i < tb->free_count; i++) {
+        if (((board >> tb->free_shifts[i]) & 0xf) == 0) {
+            board_t tile_2 = 1ULL << tb->free_shifts[i];
+            total += tablebase_probe(tb, board | tile_2) * 0.9f;
+            total += tablebase_probe(tb, board | (tile_2 << 1)) * 0.1f;
+            num_open++;
+        }
+    }
+    return num_open ? total / num_open : 0.0f;
+}
+
+/* n-tuple networks written by ntuple_2048.py: this header, one ntuple_record_t per
+ * tuple, then from NTUPLE_OFFSET each tuple's 16^cells float weights in turn. A
+ * board's value sums every tuple's weight over the 8 symmetric images of the board. */
+typedef struct {
+    char magic[8];
+    uint32_t version;
+    uint32_t tuple_count;
+    uint64_t games; // trained so far
+} ntuple_header_t;
+
+typedef struct {
+    uint8_t size;
+    uint8_t cells[7]; // ascending
+} ntuple_record_t;
+
+static const size_t NTUPLE_OFFSET = 4096;
+
+// A tuple index ORs (board >> shift[i]) & mask[i] over runs of adjacent cells.
+struct ntuple_tuple_t {
+    const float *weights;
+    size_t offset; // of the weights in the file
+    int runs;
+    int shift[7];
+    uint64_t mask[7];
+};
+
+struct ntuple_t {
+    void *mapping;
+    size_t size;
+    std::vector<ntuple_tuple_t> tuples;
+};
+
+ntuple_t *ntuple_open(const char *path) {
+#if !defined(_WIN32)
+    int fd = open(path, O_RDONLY);
+    if (fd < 0)
+        return NULL;
+    struct stat st;
+    ntuple_header_t header;
+    const size_t max_tuples = (NTUPLE_OFFSET - sizeof(header)) / sizeof(ntuple_record_t);
+    if (fstat(fd, &st) != 0 || pread(fd, &header, sizeof(header), 0) != (ssize_t)sizeof(header) ||
+            memcmp(header.magic, "2048NTW", 8) != 0 || header.version != 1 ||
+            header.tuple_count == 0 || header.tuple_count > max_tuples) {
+        close(fd);
+        return NULL;
+    }
+    std::vector<ntuple_record_t> records(header.tuple_count);
+    size_t records_size = records.size() * sizeof(ntuple_record_t);
+    bool ok = pread(fd, records.data(), records_size, sizeof(header)) == (ssize_t)records_size;
+    ntuple_t *nt = new ntuple_t();
+    size_t offset = NTUPLE_OFFSET;
+    for (size_t i = 0; ok && i < records.size(); i++) {
+        const ntuple_record_t &record = records[i];
+        ok = record.size > 0 && record.size <= 7;
+        ntuple_tuple_t tuple;
+        memset(&tuple, 0, sizeof(tuple));
+        int start = 0;
+        for (int end = 1; ok && end <= record.size; end++) {
+            ok = record.cells[end - 1] < 16 && (end == 1 || record.cells[end - 1] > record.cells[end - 2]);
+            if (ok && (end == record.size || record.cells[end] != record.cells[end - 1] + 1)) {
+                tuple.shift[tuple.runs] = 4 * (record.cells[start] - start);
+                tuple.mask[tuple.runs] = ((1ULL << (4 * (end - start))) - 1) << (4 * start);
+                tuple.runs++;
+                start = end;
+            }
+        }
+        tuple.offset = offset;
+        offset += sizeof(float) << (4 * record.size);
+        nt->tuples.push_back(tuple);
+    }
+    void *mapping = MAP_FAILED;
+    if (ok && (size_t)st.st_size == offset)
+        mapping = mmap(NULL, offset, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    if (mapping == MAP_FAILED) {
+        delete nt;
+        return NULL;
+    }
+    nt->mapping = mapping;
+    nt->size = offset;
+    for (size_t i = 0; i < nt->tuples.size(); i++)
+        nt->tuples[i].weights = (const float *)((const char *)mapping + nt->tuples[i].offset);
+    return nt;
+#else
+    (void)path;
+    return NULL;
+#endif
+}
+
+void ntuple_close(ntuple_t *nt) {
+    if (!nt)
+        return;
+#if !defined(_WIN32)
+    munmap(nt->mapping, nt->size);
+#endif
+    delete nt;
+}
+
+float ntuple_evaluate(const ntuple_t *nt, board_t board) {
+    board_t mirrored = mirror_rows(board);
+    board_t flipped = flip_rows(board);
+    board_t both = flip_rows(mirrored);
+    const board_t images[8] = {
+        board, mirrored, flipped, both,
+        transpose(board), transpose(mirrored), transpose(flipped), transpose(both),
+    };
+    float total = 0.0f;
+    for (size_t t = 0; t < nt->tuples.size(); t++) {
+        const ntuple_tuple_t &tuple = nt->tuples[t];
+        if (tuple.runs <= 2) {
+            // Every tuple in NTUPLE_SHAPES is one or two runs; the second mask is 0 for one.
+            for (int i = 0; i < 8; i++)
+                total += tuple.weights[((images[i] >> tuple.shift[0]) & tuple.mask[0]) |
+                                       ((images[i] >> tuple.shift[1]) & tuple.mask[1])];
+            continue;
+        }
+        for (int i = 0; i < 8; i++) {
+            board_t index = 0;
+            for (int r = 0; r < tuple.runs; r++)
+                index |= (images[i] >> tuple.shift[r]) & tuple.mask[r];
+            total += tuple.weights[index];
+        }
+    }
+    return total;
+}
+
 /* Optimizing the game */
 
+struct engine_t;
+
 struct eval_state {
     trans_table_t trans_table; // transposition table, to cache previously-seen moves
+    engine_t *engine; // if set, its persistent table is used instead of trans_table
     int maxdepth;
     int curdepth;
     int cachehits;
     unsigned long moves_evaled;
     int depth_limit;
+    double deadline; // seconds since the epoch, 0 for no deadline
+    unsigned long next_clock_check;
+    bool aborted;
 
-    eval_state() : maxdepth(0), curdepth(0), cachehits(0), moves_evaled(0), depth_limit(0) {
+    eval_state() : engine(NULL), maxdepth(0), curdepth(0), cachehits(0), moves_evaled(0), depth_limit(0),
+                   deadline(0), next_clock_check(0), aborted(false) {
     }
 };
 
+static double now_seconds() {
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    return tv.tv_sec + tv.tv_usec / 1000000.0;
+}
+
 // score a single board heuristically
 static float score_heur_board(board_t board);
 // score a single board actually (adding in the score from spawned 4 tiles)
@@ -312,12 +747,153 @@ static float score_board(board_t board) {
 static const float CPROB_THRESH_BASE = 0.0001f;
 static const int CACHE_DEPTH_LIMIT  = 15;
 
+/* Engine handles own a fixed-size, open-addressed transposition table that lives
+ * across turns and is shared by the four root moves. Entries record the remaining
+ * search depth, so a deeper result answers any shallower probe of the same board. */
+struct hash_entry_t {
+    // Lock-free for concurrent searches: check holds board ^ data, so an entry torn by
+    // racing writers fails verification and reads as a miss. All zero is an empty slot;
+    // chance-node boards always hold a tile, so board 0 is never stored.
+    std::atomic<uint64_t> check;
+    std::atomic<uint64_t> data; // heuristic bits | depth << 32 | generation << 40
+};
+
+struct hash_slot_t {
+    board_t board;
+    float heuristic;
+    int depth; // remaining depth below this node when it was scored
+    uint8_t generation;
+};
+
+static const size_t HASH_BUCKET_SIZE = 4; // one 64-byte cache line
+static const size_t HASH_BUCKET_ALIGN = HASH_BUCKET_SIZE * sizeof(hash_entry_t);
+
+struct engine_t {
+    hash_entry_t *table; // allocated by engine_reserve or the first search; buckets are line-aligned
+    hash_entry_t *table_storage; // what new[] returned, one bucket larger than the table
+    size_t bucket_mask;
+    int policy;
+    int threads;
+    bool symmetric; // key entries by canonical_board, so the 8 symmetric images share one
+    const tablebase_t *tablebase; // leaf oracle, see engine_set_tablebase
+    float tablebase_weight;
+    const ntuple_t *ntuple; // leaf evaluator instead of the heuristic, if set
+    uint8_t generation; // only changed between searches
+    std::atomic<uint32_t> used;
+};
+
+// Full 64-bit mix, so every nibble of the board reaches the bucket index.
+static inline uint64_t board_hash(board_t board) {
+    board = (board ^ (board >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    board = (board ^ (board >> 27)) * 0x94D049BB133111EBULL;
+    return board ^ (board >> 31);
+}
+
+static inline hash_entry_t *engine_bucket(engine_t &engine, board_t board) {
+    return engine.table + (board_hash(board) & engine.bucket_mask) * HASH_BUCKET_SIZE;
+}
+
+static inline hash_slot_t load_slot(const hash_entry_t &entry) {
+    uint64_t data = entry.data.load(std::memory_order_relaxed);
+    uint64_t check = entry.check.load(std::memory_order_relaxed);
+    uint32_t bits = static_cast<uint32_t>(data);
+    hash_slot_t slot;
+    slot.board = check ^ data;
+    memcpy(&slot.heuristic, &bits, sizeof(bits));
+    slot.depth = (data >> 32) & 0xff;
+    slot.generation = (data >> 40) & 0xff;
+    return slot;
+}
+
+static inline void save_slot(hash_entry_t &entry, board_t board, float heuristic, int depth, uint8_t generation) {
+    uint32_t bits;
+    memcpy(&bits, &heuristic, sizeof(bits));
+    uint64_t data = bits | (uint64_t)(depth & 0xff) << 32 | (uint64_t)generation << 40;
+    entry.data.store(data, std::memory_order_relaxed);
+    entry.check.store(board ^ data, std::memory_order_relaxed);
+}
+
+static inline bool engine_probe(engine_t &engine, board_t board, int depth, float &heuristic) {
+    // Chance-node values are invariant under the symmetries: the heuristic is, and the
+    // search below a node explores every move and every spawn. Tablebase bonuses are not.
+    if (engine.symmetric && !engine.tablebase)
+        board = canonical_board(board, NULL);
+    hash_entry_t *bucket = engine_bucket(engine, board);
+    for (size_t i = 0; i < HASH_BUCKET_SIZE; i++) {
+        hash_slot_t slot = load_slot(bucket[i]);
+        if (slot.board == board) {
+            if (slot.depth < depth)
+                return false;
+            if (slot.generation != engine.generation)
+                save_slot(bucket[i], board, slot.heuristic, slot.depth, engine.generation);
+            heuristic = slot.heuristic;
+            return true;
+        }
+    }
+    return false;
+}
+
+static inline void engine_store(engine_t &engine, board_t board, int depth, float heuristic) {
+    if (engine.symmetric && !engine.tablebase)
+        board = canonical_board(board, NULL);
+    hash_entry_t *bucket = engine_bucket(engine, board);
+    hash_slot_t slots[HASH_BUCKET_SIZE];
+    int victim = -1;
+    for (size_t i = 0; i < HASH_BUCKET_SIZE; i++) {
+        slots[i] = load_slot(bucket[i]);
+        if (victim < 0 && (slots[i].board == board || slots[i].board == 0))
+            victim = i;
+    }
+    if (victim < 0) {
+        if (engine.policy == ENGINE_REPLACE_ALWAYS) {
+            victim = board_hash(board) >> 62;
+        } else {
+            // Prefer entries from earlier searches, then the shallowest.
+            victim = 0;
+            for (size_t i = 1; i < HASH_BUCKET_SIZE; i++) {
+                bool stale = slots[i].generation != engine.generation;
+                bool victim_stale = slots[victim].generation != engine.generation;
+                if (stale > victim_stale || (stale == victim_stale && slots[i].depth < slots[victim].depth))
+                    victim = i;
+            }
+        }
+    }
+    if (slots[victim].board == 0)
+        engine.used.fetch_add(1, std::memory_order_relaxed);
+    save_slot(bucket[victim], board, heuristic, depth, engine.generation);
+}
+
+// read the clock once per this many evaluated moves in a deadline-bounded search
+static const unsigned long CLOCK_CHECK_MOVES = 1024;
+
+/* A network leaf is the value of an after-move board, which leaves out the merges of the
+ * move that made it (networks learn gain + value), so moves add their merge score back.
+ * score_board counts every tile by the merges that built it, so the difference is exact. */
+static inline float network_move_gain(const engine_t *engine, board_t board, board_t newboard) {
+    return engine && engine->ntuple ? score_board(newboard) - score_board(board) : 0.0f;
+}
+
 static float score_tilechoose_node(eval_state &state, board_t board, float cprob) {
+    if (state.aborted)
+        return 0.0f;
     if (cprob < CPROB_THRESH_BASE || state.curdepth >= state.depth_limit) {
         state.maxdepth = std::max(state.curdepth, state.maxdepth);
-        return score_heur_board(board);
+        float heur = state.engine && state.engine->ntuple ? ntuple_evaluate(state.engine->ntuple, board)
+                                                          : score_heur_board(board);
+        if (state.engine && state.engine->tablebase) {
+            float chance = tablebase_chance_value(state.engine->tablebase, board);
+            if (chance >= 0.0f)
+                heur += state.engine->tablebase_weight * chance;
+        }
+        return heur;
     }
-    if (state.curdepth < CACHE_DEPTH_LIMIT) {
+    if (state.curdepth < CACHE_DEPTH_LIMIT && state.engine) {
+        float heuristic;
+        if (engine_probe(*state.engine, board, state.depth_limit - state.curdepth, heuristic)) {
+            state.cachehits++;
+            return heuristic;
+        }
+    } else if (state.curdepth < CACHE_DEPTH_LIMIT) {
         const trans_table_t::iterator &i = state.trans_table.find(board);
         if (i != state.trans_table.end()) {
             trans_table_entry_t entry = i->second;
@@ -351,7 +927,10 @@ static float score_tilechoose_node(eval_state &state, board_t board, float cprob
     }
     res = res / num_open;
 
-    if (state.curdepth < CACHE_DEPTH_LIMIT) {
+    // An aborted subtree is incomplete; never cache it.
+    if (state.curdepth < CACHE_DEPTH_LIMIT && !state.aborted && state.engine) {
+        engine_store(*state.engine, board, state.depth_limit - state.curdepth, res);
+    } else if (state.curdepth < CACHE_DEPTH_LIMIT && !state.aborted) {
         trans_table_entry_t entry = {static_cast<uint8_t>(state.curdepth), res};
         state.trans_table[board] = entry;
     }
@@ -360,17 +939,29 @@ static float score_tilechoose_node(eval_state &state, board_t board, float cprob
 }
 
 static float score_move_node(eval_state &state, board_t board, float cprob) {
-    float best = 0.0f;
+    // Network gains can be negative, so start below any score and only fall back to 0 when stuck.
+    float best = -INFINITY;
+    bool has_move = false;
     state.curdepth++;
     for (int move = 0; move < 4; ++move) {
         board_t newboard = execute_move(move, board);
         state.moves_evaled++;
 
         if (board != newboard) {
-            best = std::max(best, score_tilechoose_node(state, newboard, cprob));
+            has_move = true;
+            best = std::max(best, score_tilechoose_node(state, newboard, cprob) +
+                                      network_move_gain(state.engine, board, newboard));
         }
     }
     state.curdepth--;
+    if (!has_move)
+        best = 0.0f;
+
+    if (state.deadline > 0 && state.moves_evaled >= state.next_clock_check) {
+        state.next_clock_check = state.moves_evaled + CLOCK_CHECK_MOVES;
+        if (now_seconds() >= state.deadline)
+            state.aborted = true;
+    }
 
     return best;
 }
@@ -382,7 +973,12 @@ static float _score_toplevel_move(eval_state &state, board_t board, int move) {
     if(board == newboard)
         return 0;
 
-    return score_tilechoose_node(state, newboard, 1.0f) + 1e-6;
+    return score_tilechoose_node(state, newboard, 1.0f) + network_move_gain(state.engine, board, newboard) + 1e-6;
+}
+
+static inline int toplevel_depth_limit(board_t board) {
+    // Clamp depth for stable latency when used in real-time autoplay integrations.
+    return std::min(5, std::max(3, count_distinct_tiles(board) - 2));
 }
 
 float score_toplevel_move(board_t board, int move) {
@@ -390,8 +986,7 @@ float score_toplevel_move(board_t board, int move) {
     struct timeval start, finish;
     double elapsed;
     eval_state state;
-    // Clamp depth for stable latency when used in real-time autoplay integrations.
-    state.depth_limit = std::min(5, std::max(3, count_distinct_tiles(board) - 2));
+    state.depth_limit = toplevel_depth_limit(board);
 
     gettimeofday(&start, NULL);
     res = _score_toplevel_move(state, board, move);
@@ -409,7 +1004,7 @@ float score_toplevel_move(board_t board, int move) {
 /* Find the best move for a given board. */
 int find_best_move(board_t board) {
     int move;
-    float best = 0;
+    float best = -INFINITY;
     int bestmove = -1;
 
     print_board(board);
@@ -418,7 +1013,7 @@ int find_best_move(board_t board) {
     for(move=0; move<4; move++) {
         float res = score_toplevel_move(board, move);
 
-        if(res > best) {
+        if(execute_move(move, board) != board && res > best) {
             best = res;
             bestmove = move;
         }
@@ -427,6 +1022,300 @@ int find_best_move(board_t board) {
     return bestmove;
 }
 
+int find_best_move_stats(board_t board, float *scores, search_stats_t *stats) {
+    int bestmove = -1;
+    float best = -INFINITY;
+    struct timeval start, finish;
+
+    if(stats) {
+        *stats = search_stats_t();
+        gettimeofday(&start, NULL);
+    }
+
+    for(int move=0; move<4; move++) {
+        eval_state state;
+        state.depth_limit = toplevel_depth_limit(board);
+        float res = _score_toplevel_move(state, board, move);
+        if(scores)
+            scores[move] = res;
+        if(stats) {
+            stats->moves_evaled += state.moves_evaled;
+            stats->cache_hits += state.cachehits;
+            stats->cache_size += state.trans_table.size();
+        }
+        // Scores can be negative; an illegal move scores 0 but is never chosen.
+        if(execute_move(move, board) != board && res > best) {
+            best = res;
+            bestmove = move;
+        }
+    }
+
+    if(stats) {
+        // One pass at the depth limit, so that is the completed depth, as in search_iterative.
+        if(bestmove >= 0)
+            stats->max_depth = toplevel_depth_limit(board);
+        gettimeofday(&finish, NULL);
+        stats->elapsed = (finish.tv_sec - start.tv_sec) + (finish.tv_usec - start.tv_usec) / 1000000.0;
+    }
+    return bestmove;
+}
+
+struct depth_result_t {
+    float scores[4];
+    bool legal[4];
+    bool aborted;
+    bool pruned; // every line stopped short of depth on cprob
+};
+
+static void add_state_stats(search_stats_t &total, const eval_state &state, int depth, depth_result_t &result) {
+    total.moves_evaled += state.moves_evaled;
+    total.cache_hits += state.cachehits;
+    total.cache_size += state.trans_table.size();
+    if (state.aborted)
+        result.aborted = true;
+    if (state.maxdepth >= depth || state.cachehits)
+        result.pruned = false;
+}
+
+static void search_depth_serial(engine_t *engine, board_t board, int depth, double deadline,
+                                depth_result_t &result, search_stats_t &total) {
+    for (int move = 0; move < 4 && !result.aborted; move++) {
+        eval_state state;
+        state.engine = engine;
+        state.depth_limit = depth;
+        state.deadline = deadline;
+        result.legal[move] = execute_move(move, board) != board;
+        result.scores[move] = _score_toplevel_move(state, board, move);
+        add_state_stats(total, state, depth, result);
+    }
+}
+
+/* One spawn below a root move: the unit of parallel work. */
+struct root_task_t {
+    int move;
+    board_t board;
+    float cprob;
+    float weight;
+    float value;
+};
+
+/* Split the root moves at their first chance layer and score the spawns on worker threads,
+ * all sharing the engine's table. Matches search_depth_serial up to table-sharing effects. */
+static void search_depth_parallel(engine_t &engine, board_t board, int depth, double deadline,
+                                  depth_result_t &result, search_stats_t &total) {
+    std::vector<root_task_t> tasks;
+    board_t newboards[4];
+    int num_open[4] = {0, 0, 0, 0};
+
+    for (int move = 0; move < 4; move++) {
+        result.scores[move] = 0;
+        newboards[move] = execute_move(move, board);
+        result.legal[move] = newboards[move] != board;
+        if (!result.legal[move])
+            continue;
+        float cached;
+        if (engine_probe(engine, newboards[move], depth, cached)) {
+            result.scores[move] = cached + network_move_gain(&engine, board, newboards[move]) + 1e-6;
+            result.pruned = false;
+            total.cache_hits++;
+            continue;
+        }
+        num_open[move] = count_empty(newboards[move]);
+        float cprob = 1.0f / num_open[move];
+        board_t tmp = newboards[move];
+        for (board_t tile_2 = 1; tile_2; tile_2 <<= 4, tmp >>= 4) {
+            if ((tmp & 0xf) == 0) {
+                root_task_t two = {move, newboards[move] | tile_2, cprob * 0.9f, 0.9f, 0};
+                root_task_t four = {move, newboards[move] | (tile_2 << 1), cprob * 0.1f, 0.1f, 0};
+                tasks.push_back(two);
+                tasks.push_back(four);
+            }
+        }
+    }
+
+    std::atomic<size_t> next(0);
+    std::mutex stats_lock;
+    auto worker = [&]() {
+        for (size_t i = next++; i < tasks.size(); i = next++) {
+            eval_state state;
+            state.engine = &engine;
+            state.depth_limit = depth;
+            state.deadline = deadline;
+            tasks[i].value = score_move_node(state, tasks[i].board, tasks[i].cprob);
+            std::lock_guard<std::mutex> guard(stats_lock);
+            add_state_stats(total, state, depth, result);
+        }
+    };
+    std::vector<std::thread> threads;
+    for (int i = 1; i < std::min<int>(engine.threads, tasks.size()); i++)
+        threads.push_back(std::thread(worker));
+    worker();
+    for (size_t i = 0; i < threads.size(); i++)
+        threads[i].join();
+    if (result.aborted)
+        return;
+
+    float sums[4] = {0, 0, 0, 0};
+    for (size_t i = 0; i < tasks.size(); i++)
+        sums[tasks[i].move] += tasks[i].value * tasks[i].weight;
+    for (int move = 0; move < 4; move++) {
+        if (num_open[move] == 0)
+            continue;
+        float res = sums[move] / num_open[move];
+        engine_store(engine, newboards[move], depth, res);
+        result.scores[move] = res + network_move_gain(&engine, board, newboards[move]) + 1e-6;
+    }
+}
+
+static int search_iterative(engine_t *engine, board_t board, int budget_ms, int max_depth,
+                            float *scores, search_stats_t *stats) {
+    double started = now_seconds();
+    double deadline = budget_ms > 0 ? started + budget_ms / 1000.0 : 0;
+    int bestmove = -1;
+    search_stats_t total = search_stats_t();
+
+    if (max_depth <= 0)
+        max_depth = toplevel_depth_limit(board);
+    if (scores)
+        std::fill(scores, scores + 4, 0.0f);
+    if (engine)
+        engine->generation++;
+
+    // Without a deadline there is nothing to fall back on; search max_depth directly.
+    for (int depth = deadline > 0 ? 1 : max_depth; depth <= max_depth; depth++) {
+        depth_result_t result;
+        std::fill(result.legal, result.legal + 4, false);
+        result.aborted = false;
+        result.pruned = true;
+        // Depth 1 always completes, so there is always a move to return.
+        double depth_deadline = depth > 1 ? deadline : 0;
+        if (engine && engine->threads > 1)
+            search_depth_parallel(*engine, board, depth, depth_deadline, result, total);
+        else
+            search_depth_serial(engine, board, depth, depth_deadline, result, total);
+        if (result.aborted)
+            break;
+
+        // Scores are 0 for illegal moves but may be negative for legal ones; choose by legality.
+        float best = -INFINITY;
+        bestmove = -1;
+        for (int move = 0; move < 4; move++) {
+            if (result.legal[move] && result.scores[move] > best) {
+                best = result.scores[move];
+                bestmove = move;
+            }
+        }
+        total.max_depth = depth;
+        if (scores)
+            std::copy(result.scores, result.scores + 4, scores);
+        if (bestmove < 0 || result.pruned || (deadline > 0 && now_seconds() >= deadline))
+            break;
+    }
+
+    if (stats) {
+        if (engine)
+            total.cache_size = engine->used.load();
+        total.elapsed = now_seconds() - started;
+        *stats = total;
+    }
+    return bestmove;
+}
+
+int find_best_move_timed(board_t board, int budget_ms, int max_depth, float *scores, search_stats_t *stats) {
+    return search_iterative(NULL, board, std::max(1, budget_ms), max_depth, scores, stats);
+}
+
+engine_t *engine_create(int table_mb, int policy) {
+    size_t bytes = (size_t)std::max(1, table_mb) << 20;
+    size_t buckets = 1;
+    while (buckets * 2 * HASH_BUCKET_SIZE * sizeof(hash_entry_t) <= bytes)
+        buckets *= 2;
+
+    engine_t *engine = new (std::nothrow) engine_t();
+    if (!engine)
+        return NULL;
+    engine->table = NULL;
+    engine->table_storage = NULL;
+    engine->bucket_mask = buckets - 1;
+    engine->policy = policy;
+    engine->threads = 1;
+    engine->symmetric = false;
+    engine->tablebase = NULL;
+    engine->tablebase_weight = 0.0f;
+    engine->ntuple = NULL;
+    engine->generation = 0;
+    engine->used = 0;
+    return engine;
+}
+
+int engine_reserve(engine_t *engine) {
+    if (!engine->table) {
+        // new[] only promises alignof(std::max_align_t), so allocate a spare bucket and start
+        // the table at the first cache-line boundary; entries are 16 bytes, so it is one of them.
+        engine->table_storage = new (std::nothrow) hash_entry_t[(engine->bucket_mask + 2) * HASH_BUCKET_SIZE]();
+        if (!engine->table_storage)
+            return 0;
+        uintptr_t address = reinterpret_cast<uintptr_t>(engine->table_storage);
+        size_t skip = (HASH_BUCKET_ALIGN - address % HASH_BUCKET_ALIGN) % HASH_BUCKET_ALIGN;
+        engine->table = engine->table_storage + skip / sizeof(hash_entry_t);
+    }
+    return 1;
+}
+
+void engine_destroy(engine_t *engine) {
+    if (!engine)
+        return;
+    delete[] engine->table_storage;
+    delete engine;
+}
+
+void engine_clear(engine_t *engine) {
+    if (!engine->table)
+        return;
+    for (size_t i = 0; i < (engine->bucket_mask + 1) * HASH_BUCKET_SIZE; i++) {
+        engine->table[i].check.store(0, std::memory_order_relaxed);
+        engine->table[i].data.store(0, std::memory_order_relaxed);
+    }
+    engine->used = 0;
+}
+
+void engine_set_threads(engine_t *engine, int threads) {
+    if (threads <= 0)
+        threads = std::max(1u, std::thread::hardware_concurrency());
+    engine->threads = threads;
+}
+
+void engine_set_symmetry(engine_t *engine, int enabled) {
+    engine->symmetric = enabled != 0;
+}
+
+void engine_set_tablebase(engine_t *engine, const tablebase_t *tb, float weight) {
+    engine->tablebase = tb;
+    engine->tablebase_weight = weight;
+}
+
+void engine_set_ntuple(engine_t *engine, const ntuple_t *nt) {
+    engine->ntuple = nt;
+}
+
+int engine_find_best_move(engine_t *engine, board_t board, int budget_ms, int max_depth,
+                          float *scores, search_stats_t *stats) {
+    if (!engine_reserve(engine)) {
+        if (scores)
+            std::fill(scores, scores + 4, 0.0f);
+        if (stats)
+            *stats = search_stats_t();
+        return -1;
+    }
+    return search_iterative(engine, board, budget_ms, max_depth, scores, stats);
+}
+
+void find_best_moves(const board_t *boards, int count, int *moves, float *scores) {
+    for(int i=0; i<count; i++) {
+        moves[i] = find_best_move_stats(boards[i], scores ? scores + 4 * i : NULL, NULL);
+    }
+}
+
 int ask_for_move(board_t board) {
     int move;
     char validstr[5];
@@ -465,8 +1354,8 @@ static board_t draw_tile() {
     return (unif_random(10) < 9) ? 1 : 2;
 }
 
-static board_t insert_tile_rand(board_t board, board_t tile) {
-    int index = unif_random(count_empty(board));
+/* Place tile in the index-th empty cell, counting from the LSB. */
+static board_t insert_tile_at(board_t board, board_t tile, int index) {
     board_t tmp = board;
     while (true) {
         while ((tmp & 0xf) != 0) {
@@ -481,13 +1370,43 @@ static board_t insert_tile_rand(board_t board, board_t tile) {
     return board | tile;
 }
 
+static board_t insert_tile_rand(board_t board, board_t tile) {
+    return insert_tile_at(board, tile, unif_random(count_empty(board)));
+}
+
 static board_t initial_board() {
     board_t board = draw_tile() << (4 * unif_random(16));
     return insert_tile_rand(board, draw_tile());
 }
 
-void play_game(get_move_func_t get_move) {
-    board_t board = initial_board();
+void spawn_rng_seed(spawn_rng_t *rng, uint64_t seed) {
+    rng->state = seed;
+}
+
+uint64_t spawn_rng_next(spawn_rng_t *rng) {
+    uint64_t z = (rng->state += 0x9E3779B97F4A7C15ULL);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    return z ^ (z >> 31);
+}
+
+/* Pick the empty cell first, then the tile: one draw each, in the same order as
+ * terminal_2048.add_random_tile, so both sides see the same spawn stream. */
+board_t insert_tile_seeded(board_t board, spawn_rng_t *rng) {
+    int empty = board ? count_empty(board) : 16;
+    if (empty == 0)
+        return board;
+    int index = spawn_rng_next(rng) % empty;
+    double draw = (spawn_rng_next(rng) >> 11) * (1.0 / 9007199254740992.0);
+    return insert_tile_at(board, draw < 0.1 ? 2 : 1, index);
+}
+
+board_t initial_board_seeded(spawn_rng_t *rng) {
+    return insert_tile_seeded(insert_tile_seeded(0, rng), rng);
+}
+
+static void play_game_from(get_move_func_t get_move, spawn_rng_t *rng) {
+    board_t board = rng ? initial_board_seeded(rng) : initial_board();
     int moveno = 0;
     int scorepenalty = 0; // "penalty" for obtaining free 4 tiles
 
@@ -515,16 +1434,35 @@ void play_game(get_move_func_t get_move) {
             continue;
         }
 
-        board_t tile = draw_tile();
-        if (tile == 2) scorepenalty += 4;
-        board = insert_tile_rand(newboard, tile);
+        if (rng) {
+            board = insert_tile_seeded(newboard, rng);
+        } else {
+            board = insert_tile_rand(newboard, draw_tile());
+        }
+        // A spawned 4 sets bit 1 of its nibble; a spawned 2 sets bit 0.
+        if ((board ^ newboard) & 0x2222222222222222ULL) scorepenalty += 4;
     }
 
     print_board(board);
     printf("\nGame over. Your score is %.0f. The highest rank you achieved was %d.\n", score_board(board) - scorepenalty, get_max_rank(board));
 }
 
-int main() {
+void play_game(get_move_func_t get_move) {
+    play_game_from(get_move, NULL);
+}
+
+void play_game_seeded(get_move_func_t get_move, uint64_t seed) {
+    spawn_rng_t rng;
+    spawn_rng_seed(&rng, seed);
+    play_game_from(get_move, &rng);
+}
+
+int main(int argc, char **argv) {
     init_tables();
-    play_game(find_best_move);
+    if (argc > 1) {
+        play_game_seeded(find_best_move, strtoull(argv[1], NULL, 0));
+    } else {
+        play_game(find_best_move);
+    }
+    return 0;
 }
@@ -46,20 +46,117 @@ static inline row_t reverse_row(row_t row) {
     return (row >> 12) | ((row >> 4) & 0x00F0)  | ((row << 4) & 0x0F00) | (row << 12);
 }
 
+/* Seeded tile spawns: a splitmix64 stream, so a game can be replayed exactly from its seed.
+ * terminal_2048.SpawnRng implements the same stream and spawn rules in Python. */
+typedef struct {
+    uint64_t state;
+} spawn_rng_t;
+
+/* Telemetry for one quiet search, summed over the four top-level moves. */
+typedef struct {
+    uint64_t moves_evaled;
+    uint32_t cache_hits;
+    uint32_t cache_size;
+    int32_t max_depth; // deepest completed search depth, in chance layers below the root moves
+    double elapsed; // seconds
+} search_stats_t;
+
+/* Opaque engine handle holding a persistent transposition table (see engine_create). */
+typedef struct engine_t engine_t;
+
+/* Read-only mapping of a finished tablebase_2048.py endgame tablebase. */
+typedef struct tablebase_t tablebase_t;
+
+/* Read-only mapping of an ntuple_2048.py n-tuple network weight file. */
+typedef struct ntuple_t ntuple_t;
+
+enum {
+    ENGINE_REPLACE_DEPTH = 0,  // evict entries from earlier searches first, then the shallowest
+    ENGINE_REPLACE_ALWAYS = 1, // evict a fixed slot per board
+};
+
 /* Functions */
 #ifdef __cplusplus
 extern "C" {
 #endif
 
 DLL_PUBLIC void init_tables();
+/* Board symmetries: bit 0 mirrors every row, bit 1 reverses the row order, bit 2 then
+ * transposes. A move m on board is the move symmetry_move(s, m) on transform_board(board, s).
+ * canonical_board returns the smallest of the 8 images and, if symmetry is not NULL, its s. */
+DLL_PUBLIC board_t transform_board(board_t board, int symmetry);
+DLL_PUBLIC int symmetry_move(int symmetry, int move);
+DLL_PUBLIC board_t canonical_board(board_t board, int *symmetry);
+/* Like init_tables, but maps the tables read-only from a cache file at path, so that
+ * processes share one copy. A missing or stale file is rebuilt and written for the next
+ * process. Returns 1 if the tables were mapped from the file, 0 if they were built here
+ * (always the case on Windows or with a NULL/empty path). Tables are set up once per
+ * process by whichever of init_tables and init_tables_cached runs first; later calls
+ * leave them alone and are safe while other threads search. */
+DLL_PUBLIC int init_tables_cached(const char *path);
 DLL_PUBLIC board_t execute_move(int move, board_t board);
 
 typedef int (*get_move_func_t)(board_t);
 DLL_PUBLIC float score_toplevel_move(board_t board, int move);
 DLL_PUBLIC int find_best_move(board_t board);
 DLL_PUBLIC int ask_for_move(board_t board);
+/* Same search as find_best_move with no output. scores (4 floats) and stats may be NULL. */
+DLL_PUBLIC int find_best_move_stats(board_t board, float *scores, search_stats_t *stats);
+/* Quiet iterative deepening from depth 1 to max_depth (<= 0: the find_best_move depth),
+ * stopping when budget_ms runs out. Returns the best move of the deepest completed depth;
+ * depth 1 always completes. stats->max_depth is that completed depth. */
+DLL_PUBLIC int find_best_move_timed(board_t board, int budget_ms, int max_depth, float *scores, search_stats_t *stats);
+/* Engine handles: the table (at most table_mb MiB, rounded down to a power of two)
+ * is reused across calls until engine_clear, e.g. at the start of a new game.
+ * engine_find_best_move searches like find_best_move_timed; budget_ms <= 0 searches
+ * max_depth directly with no deadline. stats->cache_size is the number of filled slots.
+ * The table is allocated and zeroed by engine_reserve (0 if that fails) or else by the
+ * first engine_find_best_move, which returns -1 if it cannot allocate it. */
+DLL_PUBLIC engine_t *engine_create(int table_mb, int policy);
+DLL_PUBLIC int engine_reserve(engine_t *engine);
+DLL_PUBLIC void engine_destroy(engine_t *engine);
+DLL_PUBLIC void engine_clear(engine_t *engine);
+/* Threads per engine_find_best_move (default 1; <= 0: one per hardware thread). With more
+ * than one, root moves are split at their first chance layer across threads that share
+ * the engine's lock-free table. */
+DLL_PUBLIC void engine_set_threads(engine_t *engine, int threads);
+/* With symmetry enabled (default off), the table keys boards by canonical_board, so
+ * positions that are mirror images or transposes of each other share entries. */
+DLL_PUBLIC void engine_set_symmetry(engine_t *engine, int enabled);
+/* Endgame tablebases: tablebase_open returns NULL for a missing, invalid or unfinished
+ * file (and always on Windows). tablebase_probe is the chance of building the target tile
+ * with the player to move, or -1 if board does not have the tablebase's locked tiles.
+ * With a tablebase set, search leaves whose board has the locked tiles score
+ * weight * (success chance over the spawn) on top of the heuristic, so weight is in
+ * heuristic units; terminal_2048.py never sets a tablebase together with a network. The
+ * engine does not own tb; call engine_clear after changing it. Symmetric table keys are
+ * not used while a tablebase is set. */
+DLL_PUBLIC tablebase_t *tablebase_open(const char *path);
+DLL_PUBLIC void tablebase_close(tablebase_t *tb);
+DLL_PUBLIC float tablebase_probe(const tablebase_t *tb, board_t board);
+DLL_PUBLIC void engine_set_tablebase(engine_t *engine, const tablebase_t *tb, float weight);
+/* n-tuple networks: ntuple_open returns NULL for a missing or invalid file (and always on
+ * Windows); ntuple_evaluate is the network's value of an after-move board. With a network
+ * set, chance-node leaves are scored by it instead of the heuristic, each move adds its
+ * merge score and a board without moves is worth 0. The engine does not own nt; call
+ * engine_clear after changing it. */
+DLL_PUBLIC ntuple_t *ntuple_open(const char *path);
+DLL_PUBLIC void ntuple_close(ntuple_t *nt);
+DLL_PUBLIC float ntuple_evaluate(const ntuple_t *nt, board_t board);
+DLL_PUBLIC void engine_set_ntuple(engine_t *engine, const ntuple_t *nt);
+DLL_PUBLIC int engine_find_best_move(engine_t *engine, board_t board, int budget_ms, int max_depth,
+                                     float *scores, search_stats_t *stats);
+/* Batch search with no output: moves[i] is the best move for boards[i] (-1 if none),
+ * and scores, if not NULL, receives 4 per-move scores per board (0 for illegal moves). */
+DLL_PUBLIC void find_best_moves(const board_t *boards, int count, int *moves, float *scores);
 DLL_PUBLIC void play_game(get_move_func_t get_move);
 
+DLL_PUBLIC void spawn_rng_seed(spawn_rng_t *rng, uint64_t seed);
+DLL_PUBLIC uint64_t spawn_rng_next(spawn_rng_t *rng);
+DLL_PUBLIC board_t insert_tile_seeded(board_t board, spawn_rng_t *rng);
+DLL_PUBLIC board_t initial_board_seeded(spawn_rng_t *rng);
+DLL_PUBLIC void play_game_seeded(get_move_func_t get_move, uint64_t seed);
+
 #ifdef __cplusplus
 }
 #endif
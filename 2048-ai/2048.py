@@ -6,7 +6,7 @@
 from __future__ import print_function
 import time
 
-from ailib import ailib, to_c_board, from_c_index
+from ailib import ailib, create_engine, to_c_board, from_c_index
 
 # Enable multithreading?
 MULTITHREAD = True
@@ -29,21 +29,13 @@ def to_score(m):
     return [[_to_score(c) for c in row] for row in m]
 
 if MULTITHREAD:
-    from multiprocessing.pool import ThreadPool
-    pool = ThreadPool(4)
-    def score_toplevel_move(args):
-        return ailib.score_toplevel_move(*args)
-
+    engine = create_engine(threads=4)
     def find_best_move(m):
         board = to_c_board(m)
 
         print_board(to_val(m))
 
-        scores = pool.map(score_toplevel_move, [(board, move) for move in range(4)])
-        bestmove, bestscore = max(enumerate(scores), key=lambda x:x[1])
-        if bestscore == 0:
-            return -1
-        return bestmove
+        return ailib.engine_find_best_move(engine, board, 0, 0, None, None)
 else:
     def find_best_move(m):
         board = to_c_board(m)
@@ -11,7 +11,9 @@ else:
     print("Couldn't find 2048 library bin/2048.{so,dll,dylib}! Make sure to build it first.")
     exit()
 
-ailib.init_tables()
+ailib.init_tables_cached.argtypes = [ctypes.c_char_p]
+ailib.init_tables_cached.restype = ctypes.c_int
+ailib.init_tables_cached(b'bin/tables.cache')
 
 ailib.find_best_move.argtypes = [ctypes.c_uint64]
 ailib.score_toplevel_move.argtypes = [ctypes.c_uint64, ctypes.c_int]
@@ -19,6 +21,86 @@ ailib.score_toplevel_move.restype = ctypes.c_float
 ailib.execute_move.argtypes = [ctypes.c_int, ctypes.c_uint64]
 ailib.execute_move.restype = ctypes.c_uint64
 
+ailib.find_best_moves.argtypes = [ctypes.POINTER(ctypes.c_uint64), ctypes.c_int,
+                                  ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_float)]
+ailib.find_best_moves.restype = None
+
+class search_stats_t(ctypes.Structure):
+    _fields_ = [('moves_evaled', ctypes.c_uint64),
+                ('cache_hits', ctypes.c_uint32),
+                ('cache_size', ctypes.c_uint32),
+                ('max_depth', ctypes.c_int32),
+                ('elapsed', ctypes.c_double)]
+
+ailib.find_best_move_stats.argtypes = [ctypes.c_uint64, ctypes.POINTER(ctypes.c_float),
+                                       ctypes.POINTER(search_stats_t)]
+ailib.find_best_move_stats.restype = ctypes.c_int
+
+ailib.find_best_move_timed.argtypes = [ctypes.c_uint64, ctypes.c_int, ctypes.c_int,
+                                       ctypes.POINTER(ctypes.c_float), ctypes.POINTER(search_stats_t)]
+ailib.find_best_move_timed.restype = ctypes.c_int
+
+ENGINE_REPLACE_DEPTH = 0
+ENGINE_REPLACE_ALWAYS = 1
+
+ailib.engine_create.argtypes = [ctypes.c_int, ctypes.c_int]
+ailib.engine_create.restype = ctypes.c_void_p
+ailib.engine_destroy.argtypes = [ctypes.c_void_p]
+ailib.engine_clear.argtypes = [ctypes.c_void_p]
+ailib.engine_find_best_move.argtypes = [ctypes.c_void_p, ctypes.c_uint64, ctypes.c_int, ctypes.c_int,
+                                        ctypes.POINTER(ctypes.c_float), ctypes.POINTER(search_stats_t)]
+ailib.engine_find_best_move.restype = ctypes.c_int
+ailib.engine_set_threads.argtypes = [ctypes.c_void_p, ctypes.c_int]
+ailib.engine_set_symmetry.argtypes = [ctypes.c_void_p, ctypes.c_int]
+ailib.engine_set_tablebase.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_float]
+
+ailib.tablebase_open.argtypes = [ctypes.c_char_p]
+ailib.tablebase_open.restype = ctypes.c_void_p
+ailib.tablebase_close.argtypes = [ctypes.c_void_p]
+ailib.tablebase_probe.argtypes = [ctypes.c_void_p, ctypes.c_uint64]
+ailib.tablebase_probe.restype = ctypes.c_float
+
+ailib.ntuple_open.argtypes = [ctypes.c_char_p]
+ailib.ntuple_open.restype = ctypes.c_void_p
+ailib.ntuple_close.argtypes = [ctypes.c_void_p]
+ailib.ntuple_evaluate.argtypes = [ctypes.c_void_p, ctypes.c_uint64]
+ailib.ntuple_evaluate.restype = ctypes.c_float
+ailib.engine_set_ntuple.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+
+ailib.transform_board.argtypes = [ctypes.c_uint64, ctypes.c_int]
+ailib.transform_board.restype = ctypes.c_uint64
+ailib.symmetry_move.argtypes = [ctypes.c_int, ctypes.c_int]
+ailib.symmetry_move.restype = ctypes.c_int
+ailib.canonical_board.argtypes = [ctypes.c_uint64, ctypes.POINTER(ctypes.c_int)]
+ailib.canonical_board.restype = ctypes.c_uint64
+
+def create_engine(threads=0, table_mb=64, policy=ENGINE_REPLACE_DEPTH):
+    """Engine handle with a persistent table; threads <= 0 uses every hardware thread."""
+    engine = ailib.engine_create(table_mb, policy)
+    if not engine:
+        raise MemoryError("could not allocate the engine table")
+    ailib.engine_set_threads(engine, threads)
+    return engine
+
+class spawn_rng_t(ctypes.Structure):
+    _fields_ = [('state', ctypes.c_uint64)]
+
+ailib.spawn_rng_seed.argtypes = [ctypes.POINTER(spawn_rng_t), ctypes.c_uint64]
+ailib.spawn_rng_next.argtypes = [ctypes.POINTER(spawn_rng_t)]
+ailib.spawn_rng_next.restype = ctypes.c_uint64
+ailib.insert_tile_seeded.argtypes = [ctypes.c_uint64, ctypes.POINTER(spawn_rng_t)]
+ailib.insert_tile_seeded.restype = ctypes.c_uint64
+ailib.initial_board_seeded.argtypes = [ctypes.POINTER(spawn_rng_t)]
+ailib.initial_board_seeded.restype = ctypes.c_uint64
+
+def find_best_moves(boards):
+    """Best move and the four move scores for each packed board, in one library call."""
+    n = len(boards)
+    moves = (ctypes.c_int * n)()
+    scores = (ctypes.c_float * (4 * n))()
+    ailib.find_best_moves((ctypes.c_uint64 * n)(*boards), n, moves, scores)
+    return list(moves), [list(scores[4*i:4*i+4]) for i in range(n)]
+
 def to_c_board(m):
     board = 0
     i = 0
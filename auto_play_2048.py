@@ -44,11 +44,21 @@ def run_nneonneo(base_dir: str) -> int:
     return run_cmd([bin_path], cwd=nneonneo_repo_dir(base_dir))
 
 
-def run_local(base_dir: str, speed: float, strong: bool) -> int:
+def run_local(
+    base_dir: str,
+    speed: float,
+    strong: bool,
+    prob_threshold: Optional[float] = None,
+    workers: int = 1,
+) -> int:
     game_path = os.path.join(base_dir, "terminal_2048.py")
     cmd = [sys.executable, game_path, "--auto", "--engine", "local", "--speed", str(speed)]
     if strong:
         cmd.append("--strong")
+    if prob_threshold is not None:
+        cmd.extend(["--prob-threshold", str(prob_threshold)])
+    if workers > 1:
+        cmd.extend(["--workers", str(workers)])
     return run_cmd(cmd, cwd=base_dir)
 
 
@@ -62,6 +72,13 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--speed", type=float, default=2.0, help="local engine moves/sec (default: 2).")
     parser.add_argument("--strong", action="store_true", help="use stronger local search mode.")
+    parser.add_argument(
+        "--prob-threshold",
+        type=float,
+        default=None,
+        help="local engine: prune chance nodes below this path probability.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="local engine worker processes (default: 1).")
     return parser.parse_args()
 
 
@@ -83,7 +100,13 @@ def main() -> int:
             return 1
         print("nneonneo engine unavailable, falling back to local bot.", file=sys.stderr)
 
-    return run_local(base_dir, speed=args.speed, strong=args.strong or args.engine == "auto")
+    return run_local(
+        base_dir,
+        speed=args.speed,
+        strong=args.strong or args.engine == "auto",
+        prob_threshold=args.prob_threshold,
+        workers=args.workers,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""NumPy batch versions of the packed-board helpers in terminal_2048.
+
+Every function takes a uint64 array of packed boards and works on all of them at
+once, gathering from numpy copies of terminal_2048's row tables:
+
+- move_boards: moved boards, score gains and validity for all four directions
+- can_move_boards, empty_counts, evaluate_boards (evaluate_nibble64 for arrays)
+- expand_spawns: every spawn child of a layer of chance nodes
+
+layered_move_values and choose_layered_move use them for breadth-first expectimax:
+each layer of the tree is expanded in one go and deduplicated with np.unique, then
+values are backed up layer by layer.
+
+numpy is optional for the rest of the project; without it HAVE_NUMPY is False and
+the functions here raise RuntimeError.
+"""
+
+import argparse
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import terminal_2048 as game
+
+try:
+    import numpy as np
+except ImportError:  # the batch API is the only part of the project that needs numpy
+    np = None
+
+HAVE_NUMPY = np is not None
+# Column order of the (n, 4) move arrays: the native move codes, as in NNEONNEO_MOVE_TO_DIR.
+BATCH_DIRECTIONS = ("up", "down", "left", "right")
+SPAWN_OPTIONS = ((1, 0.9), (2, 0.1))
+
+_tables = None
+
+
+class _Tables:
+    def __init__(self):
+        u64 = np.uint64
+        self.row_left = np.array(game.ROW_LEFT_TABLE, dtype=u64)
+        self.row_right = np.array(game.ROW_RIGHT_TABLE, dtype=u64)
+        self.col_up = np.array(game.COL_UP_TABLE, dtype=u64)
+        self.col_down = np.array(game.COL_DOWN_TABLE, dtype=u64)
+        self.gain_left = np.array(game.ROW_LEFT_GAIN, dtype=np.int64)
+        self.gain_right = np.array(game.ROW_RIGHT_GAIN, dtype=np.int64)
+        self.heur_row = np.array(game.HEUR_ROW_TABLE, dtype=np.int64)
+        self.heur_col = np.array(game.HEUR_COL_TABLE, dtype=np.int64)
+        self.row_max_rank = np.array(game.ROW_MAX_RANK, dtype=np.int64)
+        # snake[corner, row position, row]
+        self.snake = np.array(game.SNAKE_ROW_TABLES, dtype=np.float64)
+        self.row_shifts = np.array([0, 16, 32, 48], dtype=u64)
+        self.cell_shifts = np.arange(0, 64, 4, dtype=u64)
+
+
+def _get_tables() -> "_Tables":
+    global _tables
+    if np is None:
+        raise RuntimeError("batch_2048 needs numpy (pip install numpy)")
+    if _tables is None:
+        _tables = _Tables()
+    return _tables
+
+
+def as_boards(boards) -> "np.ndarray":
+    """A flat uint64 array from packed boards (an array or any iterable of ints)."""
+    _get_tables()
+    return np.ascontiguousarray(np.asarray(boards, dtype=np.uint64).reshape(-1))
+
+
+def _rows(boards: "np.ndarray") -> "np.ndarray":
+    """(n, 4) row values, row 0 first."""
+    return ((boards[:, None] >> _tables.row_shifts) & np.uint64(0xFFFF)).astype(np.intp)
+
+
+def transpose_boards(x: "np.ndarray") -> "np.ndarray":
+    """transpose64 for arrays."""
+    u64 = np.uint64
+    a1 = x & u64(0xF0F00F0FF0F00F0F)
+    a2 = x & u64(0x0000F0F00000F0F0)
+    a3 = x & u64(0x0F0F00000F0F0000)
+    a = a1 | (a2 << u64(12)) | (a3 >> u64(12))
+    b1 = a & u64(0xFF00FF0000FF00FF)
+    b2 = a & u64(0x00FF00FF00000000)
+    b3 = a & u64(0x00000000FF00FF00)
+    return b1 | (b2 >> u64(24)) | (b3 << u64(24))
+
+
+def move_boards(boards) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """(moved, gains, valid), each (n, 4) with columns in BATCH_DIRECTIONS order.
+
+    An invalid move leaves the board unchanged with gain 0, as apply_move64 does.
+    """
+    tables = _get_tables()
+    boards = as_boards(boards)
+    rows = _rows(boards)
+    cols = _rows(transpose_boards(boards))
+    moved = np.empty((len(boards), 4), dtype=np.uint64)
+    gains = np.empty((len(boards), 4), dtype=np.int64)
+    moved[:, 0] = boards ^ np.bitwise_or.reduce(tables.col_up[cols] << (tables.row_shifts >> np.uint64(2)), axis=1)
+    moved[:, 1] = boards ^ np.bitwise_or.reduce(tables.col_down[cols] << (tables.row_shifts >> np.uint64(2)), axis=1)
+    moved[:, 2] = boards ^ np.bitwise_or.reduce(tables.row_left[rows] << tables.row_shifts, axis=1)
+    moved[:, 3] = boards ^ np.bitwise_or.reduce(tables.row_right[rows] << tables.row_shifts, axis=1)
+    gains[:, 0] = tables.gain_left[cols].sum(axis=1)
+    gains[:, 1] = tables.gain_right[cols].sum(axis=1)
+    gains[:, 2] = tables.gain_left[rows].sum(axis=1)
+    gains[:, 3] = tables.gain_right[rows].sum(axis=1)
+    valid = moved != boards[:, None]
+    gains[~valid] = 0
+    return moved, gains, valid
+
+
+def can_move_boards(boards) -> "np.ndarray":
+    return move_boards(boards)[2].any(axis=1)
+
+
+def _cells(boards: "np.ndarray") -> "np.ndarray":
+    """(n, 16) ranks, cell 0 first."""
+    return (boards[:, None] >> _tables.cell_shifts) & np.uint64(0xF)
+
+
+def empty_counts(boards) -> "np.ndarray":
+    _get_tables()
+    return (_cells(as_boards(boards)) == 0).sum(axis=1)
+
+
+def evaluate_boards(boards, symmetric: bool = False) -> "np.ndarray":
+    """evaluate_nibble64 of every board, as float64 (evaluate_nibble64_symmetric with `symmetric`)."""
+    tables = _get_tables()
+    boards = as_boards(boards)
+    r = _rows(boards)
+    c = _rows(transpose_boards(boards))
+    rows = tables.heur_row[r].sum(axis=1)
+    cols = tables.heur_col[c].sum(axis=1)
+    monotonicity = np.maximum(rows & 0xFF, (rows >> 8) & 0xFF) + np.maximum(cols & 0xFF, (cols >> 8) & 0xFF)
+
+    # Same corner tie-break as evaluate_nibble64: the first of CORNER_ORDER with the highest rank.
+    corner_ranks = np.stack([r[:, 0] & 0xF, r[:, 0] >> 12, r[:, 3] & 0xF, r[:, 3] >> 12], axis=1)
+    corner = np.argmax(corner_ranks, axis=1)
+    corner_rank = corner_ranks[np.arange(len(boards)), corner]
+    max_rank = tables.row_max_rank[r].max(axis=1)
+    corner_bonus = np.where((max_rank > 0) & (corner_rank == max_rank), max_rank * 4.0, -8.0)
+
+    if symmetric:
+        # As evaluate_nibble64_symmetric: the best snake among the corners tied for the highest rank.
+        snakes = tables.snake[np.arange(4)[None, :, None], np.arange(4)[None, None, :], r[:, None, :]].sum(axis=2)
+        snake = np.where(corner_ranks == corner_rank[:, None], snakes, -np.inf).max(axis=1)
+    else:
+        snake = tables.snake[corner[:, None], np.arange(4), r].sum(axis=1)
+    return (
+        (rows >> 16)
+        + (cols >> 16)
+        + monotonicity * game.EVAL_MONOTONICITY_WEIGHT
+        + snake
+        + corner_bonus * game.EVAL_CORNER_WEIGHT
+        + max_rank * game.EVAL_MAX_TILE_WEIGHT
+    )
+
+
+def expand_spawns(boards) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """(children, parents, probabilities) for every spawn on every board.
+
+    parents[i] indexes the board children[i] came from; the probabilities of one
+    board's children sum to 1 (0.9 / empties for a 2, 0.1 / empties for a 4).
+    Boards without an empty cell have no children.
+    """
+    _get_tables()
+    boards = as_boards(boards)
+    empty = _cells(boards) == 0
+    parents, cells = np.nonzero(empty)
+    counts = empty.sum(axis=1)
+    tiles = np.uint64(1) << _tables.cell_shifts[cells]
+    children = []
+    probabilities = []
+    for rank, prob in SPAWN_OPTIONS:
+        children.append(boards[parents] | (tiles * np.uint64(rank)))
+        probabilities.append(prob / counts[parents])
+    return np.concatenate(children), np.concatenate([parents, parents]), np.concatenate(probabilities)
+
+
+def _max_node_values(boards: "np.ndarray", depth: int) -> "np.ndarray":
+    """expectimax values of boards with the player to move and `depth` chance layers left."""
+    if depth <= 0:
+        return evaluate_boards(boards)
+    moved, _, valid = move_boards(boards)
+    values = np.full(moved.shape, -np.inf)
+    if valid.any():
+        values[valid] = _chance_node_values(moved[valid], depth)
+    best = values.max(axis=1)
+    stuck = ~valid.any(axis=1)
+    if stuck.any():
+        best[stuck] = evaluate_boards(boards[stuck])
+    return best
+
+
+def _chance_node_values(boards: "np.ndarray", depth: int) -> "np.ndarray":
+    """expectimax values of after-move boards: the whole layer is expanded and deduplicated at once."""
+    unique, inverse = np.unique(boards, return_inverse=True)
+    children, parents, probabilities = expand_spawns(unique)
+    child_boards, child_inverse = np.unique(children, return_inverse=True)
+    child_values = _max_node_values(child_boards, depth - 1)
+    values = np.bincount(parents, weights=probabilities * child_values[child_inverse.reshape(-1)], minlength=len(unique))
+    # A full board has no spawn; expectimax moves on to the player's turn.
+    full = empty_counts(unique) == 0
+    if full.any():
+        values[full] = _max_node_values(unique[full], depth - 1)
+    return values[inverse.reshape(-1)]
+
+
+def layered_move_values(packed: int, depth: int) -> List[Optional[float]]:
+    """Full-width expectimax value of each move in BATCH_DIRECTIONS order (None if illegal).
+
+    Like terminal_2048.expectimax without branch caps or a clock: every spawn is
+    expanded and leaves are scored by evaluate_nibble64.
+    """
+    moved, gains, valid = move_boards([packed])
+    values: List[Optional[float]] = [None] * 4
+    legal = np.nonzero(valid[0])[0]
+    if len(legal):
+        for direction, value in zip(legal, _chance_node_values(moved[0, legal], depth)):
+            values[direction] = float(value)
+    return values
+
+
+def layered_depth(packed: int) -> int:
+    """Search depth for choose_layered_move: deeper as the board fills up, like choose_auto_move."""
+    empty = len(game.empty_tiles64(packed))
+    return 2 if empty >= 6 else 3
+
+
+def choose_layered_move(board: game.Board, depth: Optional[int] = None) -> Optional[str]:
+    packed = game.board_to_nibble64(board)
+    values = layered_move_values(packed, depth if depth is not None else layered_depth(packed))
+    gains = move_boards([packed])[1][0]
+    best = None
+    for direction, value, gain in zip(BATCH_DIRECTIONS, values, gains):
+        if value is not None:
+            # Same gain bonus as choose_auto_move.
+            score = value + gain * 0.1
+            if best is None or score > best[0]:
+                best = (score, direction)
+    return best[1] if best is not None else None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the numpy batch API against the per-board helpers.")
+    parser.add_argument("--boards", type=int, default=100000, help="random boards per benchmark (default: 100000).")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not HAVE_NUMPY:
+        print("batch_2048 needs numpy (pip install numpy)", file=sys.stderr)
+        return 1
+    rng = np.random.default_rng(args.seed)
+    boards = rng.integers(0, 12, size=(args.boards, 16), dtype=np.uint64)
+    boards = np.bitwise_or.reduce(boards << np.arange(0, 64, 4, dtype=np.uint64), axis=1)
+    packed = [int(board) for board in boards]
+
+    for label, batch, single in (
+        ("moves", move_boards, lambda board: [game.apply_move64(board, d) for d in BATCH_DIRECTIONS]),
+        ("evaluate", evaluate_boards, game.evaluate_nibble64),
+    ):
+        started_at = time.perf_counter()
+        batch(boards)
+        batch_time = time.perf_counter() - started_at
+        started_at = time.perf_counter()
+        for board in packed:
+            single(board)
+        single_time = time.perf_counter() - started_at
+        print(
+            f"{label}: {len(packed) / batch_time:,.0f} boards/s batched, {len(packed) / single_time:,.0f} boards/s "
+            f"one at a time ({single_time / batch_time:.1f}x)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""Benchmarks for the 2048 bots in terminal_2048.py."""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import terminal_2048 as game
+
+CORPUS_TILE_VALUES = (0, 0, 0, 0, 0, 2, 2, 4, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+# Bump when the corpus format or generation rules change, so results stay comparable.
+SUITE_CORPUS_VERSION = 1
+SUITE_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_corpus.json")
+SUITE_PHASES = ("early", "mid", "late", "near_death")
+SUITE_ENGINES = ("quick", "local", "local+strong", "nneonneo")
+# Agreement references search every position untimed to a fixed depth, so they are deterministic.
+SUITE_REFERENCES = ("nneonneo", "local")
+SUITE_REFERENCE_DEPTH = 3
+
+
+def random_positions(count: int, seed: int) -> List[game.Board]:
+    rng = random.Random(seed)
+    return [
+        [[rng.choice(CORPUS_TILE_VALUES) for _ in range(game.SIZE)] for _ in range(game.SIZE)]
+        for _ in range(count)
+    ]
+
+
+def time_calls(func: Callable, items: Sequence, min_seconds: float) -> float:
+    """Return calls per second of func over items, repeating for at least min_seconds."""
+    calls = 0
+    started_at = time.perf_counter()
+    while True:
+        for item in items:
+            func(item)
+        calls += len(items)
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def run_eval_benchmark(args: argparse.Namespace) -> int:
+    boards = random_positions(args.positions, args.seed)
+    packed = [game.board_to_nibble64(board) for board in boards]
+
+    mismatches = sum(
+        1 for board, value in zip(boards, packed) if game.evaluate_board(board) != game.evaluate_nibble64(value)
+    )
+    before = time_calls(game.evaluate_board, boards, args.seconds)
+    after = time_calls(game.evaluate_nibble64, packed, args.seconds)
+
+    print(f"positions: {len(boards)} (seed {args.seed}), mismatches: {mismatches}")
+    print(f"evaluate_board:    {before:12.0f} leaf evals/sec")
+    print(f"evaluate_nibble64: {after:12.0f} leaf evals/sec ({after / before:.1f}x)")
+    return 1 if mismatches else 0
+
+
+def search_nodes(packed: int, clock: game.SearchClock, max_depth: int = 8) -> int:
+    """Deepen one position in strong mode until the clock expires; return nodes visited."""
+    table = game.TranspositionTable()
+    depth = 1
+    while not clock.expired and depth <= max_depth:
+        game.expectimax(packed, depth, True, table, clock, True)
+        depth += 1
+    return clock.node_count
+
+
+class _DeadlineExpired(Exception):
+    pass
+
+
+def _deadline_expectimax(
+    board: int,
+    depth: int,
+    chance_turn: bool,
+    table: game.TranspositionTable,
+    deadline: float,
+    nodes: List[int],
+) -> float:
+    """expectimax as it was before SearchClock, kept as the nodes benchmark baseline.
+
+    It reads time.monotonic() on every node, chance cell, spawn and move, and unwinds
+    by raising once the deadline passes. Strong mode, no probability pruning.
+    """
+    nodes[0] += 1
+    if time.monotonic() >= deadline:
+        raise _DeadlineExpired
+
+    key = (board << 2) | chance_turn
+    cached = table.get(key, depth)
+    if cached is not None:
+        return cached
+
+    if depth <= 0:
+        value = table.evaluator(board)
+        table.put(key, 0, value)
+        return value
+
+    if chance_turn:
+        empties, spawn_options = game.chance_spawns(board, depth, True, None)
+        if not empties:
+            value = _deadline_expectimax(board, depth - 1, False, table, deadline, nodes)
+            table.put(key, depth, value)
+            return value
+        total = 0.0
+        cell_weight = 1.0 / len(empties)
+        for tile in empties:
+            if time.monotonic() >= deadline:
+                raise _DeadlineExpired
+            expected_for_cell = 0.0
+            for spawned_rank, prob in spawn_options:
+                if time.monotonic() >= deadline:
+                    raise _DeadlineExpired
+                expected_for_cell += prob * _deadline_expectimax(
+                    board | (tile * spawned_rank), depth - 1, False, table, deadline, nodes
+                )
+            total += cell_weight * expected_for_cell
+        table.put(key, depth, total)
+        return total
+
+    best_value = -float("inf")
+    for move in game.BOT_MOVES64:
+        moved_board = move(board)
+        if moved_board == board:
+            continue
+        if time.monotonic() >= deadline:
+            raise _DeadlineExpired
+        best_value = max(best_value, _deadline_expectimax(moved_board, depth, True, table, deadline, nodes))
+    if best_value == -float("inf"):
+        best_value = table.evaluator(board)
+    table.put(key, depth, best_value)
+    return best_value
+
+
+def search_nodes_deadline(packed: int, budget: float, max_depth: int = 8) -> Tuple[int, float, float]:
+    """search_nodes over _deadline_expectimax: (nodes, started_at, deadline)."""
+    table = game.TranspositionTable()
+    nodes = [0]
+    started_at = time.monotonic()
+    deadline = started_at + budget
+    try:
+        for depth in range(1, max_depth + 1):
+            _deadline_expectimax(packed, depth, True, table, deadline, nodes)
+    except _DeadlineExpired:
+        pass
+    return nodes[0], started_at, deadline
+
+
+def run_nodes_benchmark(args: argparse.Namespace) -> int:
+    boards = random_positions(args.positions, args.seed)
+    packed = [game.board_to_nibble64(board) for board in boards]
+
+    results = {}
+    for label in ("per-call deadline reads", "calibrated countdown"):
+        nodes = 0
+        elapsed = 0.0
+        overshoot = 0.0
+        for value in packed:
+            if label == "calibrated countdown":
+                clock = game.SearchClock(args.budget)
+                nodes += search_nodes(value, clock)
+                started_at, deadline = clock.started_at, clock.deadline
+            else:
+                searched, started_at, deadline = search_nodes_deadline(value, args.budget)
+                nodes += searched
+            finished_at = time.monotonic()
+            elapsed += finished_at - started_at
+            overshoot = max(overshoot, finished_at - deadline)
+        results[label] = nodes / elapsed
+        print(f"{label:24s} {nodes / elapsed:10.0f} nodes/sec (max overshoot {overshoot * 1000:.1f}ms)")
+
+    before, after = results.values()
+    print(f"positions: {len(boards)} (seed {args.seed}), budget {args.budget:.3f}s, gain {after / before:.2f}x")
+    return 0
+
+
+def position_phase(board: game.Board) -> Optional[str]:
+    max_tile = max(value for row in board for value in row)
+    empty = sum(1 for row in board for value in row if value == 0)
+    if empty <= 1 and game.can_move(board):
+        return "near_death"
+    if max_tile >= 1024:
+        return "late"
+    if 256 <= max_tile <= 512:
+        return "mid"
+    if max_tile <= 64:
+        return "early"
+    return None
+
+
+def native_engine() -> Optional[game.NneonneoEngine]:
+    if not os.path.isfile(game.nneonneo_lib_path()):
+        return None
+    return game.NneonneoEngine(game.nneonneo_lib_path())
+
+
+def build_corpus(per_phase: int, seed: int) -> Dict[str, object]:
+    """Sample positions by phase from seeded self-play; the native engine reaches late boards fastest."""
+    engine = native_engine()
+    choose_move = engine.choose_move if engine is not None else game.choose_quick_move
+    rng = random.Random(seed)
+    positions: Dict[str, List[str]] = {phase: [] for phase in SUITE_PHASES}
+    # Cap each game's share of a phase so the corpus spans several games.
+    per_game = max(1, per_phase // 3)
+    game_seed = seed
+
+    def wanted(phase: str) -> bool:
+        return len(positions[phase]) < per_phase
+
+    while any(wanted(phase) for phase in SUITE_PHASES) and game_seed < seed + 1000:
+        state = game.GameState(game_seed)
+        game_seed += 1
+        taken = dict.fromkeys(SUITE_PHASES, 0)
+        while state.can_move():
+            phase = position_phase(state.board)
+            if phase is not None and wanted(phase) and taken[phase] < per_game and rng.random() < 0.1:
+                positions[phase].append(f"{game.board_to_nibble64(state.board):016x}")
+                taken[phase] += 1
+            max_tile = state.max_tile
+            reachable = [
+                phase
+                for phase in SUITE_PHASES
+                if taken[phase] < per_game
+                and (phase != "early" or max_tile <= 64)
+                and (phase != "mid" or max_tile <= 512)
+            ]
+            if not any(wanted(phase) for phase in reachable):
+                break
+            direction = choose_move(state.board)
+            if direction is None or not state.move(direction):
+                break
+    return {
+        "version": SUITE_CORPUS_VERSION,
+        "seed": seed,
+        "generator": "nneonneo" if engine is not None else "quick",
+        "positions": positions,
+    }
+
+
+def load_corpus(path: str) -> Dict[str, List[game.Board]]:
+    with open(path, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+    if corpus.get("version") != SUITE_CORPUS_VERSION:
+        raise ValueError(f"{path}: corpus version {corpus.get('version')}, expected {SUITE_CORPUS_VERSION}")
+    return {
+        phase: [game.nibble64_to_board(int(value, 16)) for value in values]
+        for phase, values in corpus["positions"].items()
+    }
+
+
+def make_suite_engine(name: str, budget: float) -> Callable[[game.Board, game.SearchStats], Optional[str]]:
+    """Return choose(board, stats) for an engine; every position starts from a cold table."""
+    if name == "quick":
+        return lambda board, stats: game.choose_quick_move(board)
+    if name == "nneonneo":
+        engine = native_engine()
+        if engine is None:
+            raise RuntimeError(f"missing shared library: {game.nneonneo_lib_path()}")
+
+        def choose_native(board: game.Board, stats: game.SearchStats) -> Optional[str]:
+            move = engine.best_move(game.board_to_nibble64(board), budget=budget)
+            if engine.has_stats:
+                stats.nodes = engine.last_stats.moves_evaled
+                stats.depth = engine.last_stats.max_depth
+            return game.NNEONNEO_MOVE_TO_DIR.get(move)
+
+        return choose_native
+    strong_mode = name == "local+strong"
+    return lambda board, stats: game.choose_auto_move(board, budget, strong_mode=strong_mode, stats=stats)
+
+
+def local_fixed_depth_move(board: game.Board, depth: int) -> Optional[str]:
+    """choose_auto_move in strong mode with no clock, searching exactly `depth` from a cold table."""
+    packed = game.board_to_nibble64(board)
+    table = game.TranspositionTable()
+    clock = game.SearchClock(86400.0)  # a day: in practice never expires
+    best = None
+    for direction in game.BOT_DIRECTIONS:
+        moved_board, gain, moved = game.apply_move64(packed, direction)
+        if moved:
+            value = game.expectimax(moved_board, depth, True, table, clock, True) + gain * 0.1
+            if best is None or value > best[0]:
+                best = (value, direction)
+    return best[1] if best is not None else None
+
+
+def make_reference(name: str, depth: int) -> Callable[[game.Board], Optional[str]]:
+    """Return choose(board) for a SUITE_REFERENCES engine searching untimed to `depth`."""
+    if name == "local":
+        return lambda board: local_fixed_depth_move(board, depth)
+    if not os.path.isfile(game.nneonneo_lib_path()):
+        raise RuntimeError(f"missing shared library: {game.nneonneo_lib_path()}")
+    engine = game.NneonneoEngine(game.nneonneo_lib_path(), table_mb=game.NNEONNEO_TABLE_MB)
+
+    def choose(board: game.Board) -> Optional[str]:
+        engine.new_game()
+        return game.NNEONNEO_MOVE_TO_DIR.get(engine.best_move(game.board_to_nibble64(board), max_depth=depth))
+
+    return choose
+
+
+def latency_percentiles(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def at(fraction: float) -> float:
+        return round(1000 * ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99), "max_ms": round(1000 * ordered[-1], 3)}
+
+
+def run_suite_engine(
+    choose: Callable[[game.Board, game.SearchStats], Optional[str]],
+    boards: List[game.Board],
+    reference: Optional[List[Optional[str]]],
+) -> Dict[str, object]:
+    latencies: List[float] = []
+    depths: List[int] = []
+    nodes = 0
+    agree = 0
+    for index, board in enumerate(boards):
+        stats = game.SearchStats()
+        started_at = time.perf_counter()
+        direction = choose(board, stats)
+        latencies.append(time.perf_counter() - started_at)
+        nodes += stats.nodes
+        if stats.depth:
+            depths.append(stats.depth)
+        if reference is not None and direction == reference[index]:
+            agree += 1
+
+    elapsed = sum(latencies)
+    result: Dict[str, object] = {"positions": len(boards), "latency": latency_percentiles(latencies)}
+    if nodes:
+        result["nodes_per_sec"] = round(nodes / elapsed)
+    if depths:
+        result["mean_depth"] = round(statistics.fmean(depths), 3)
+    if reference is not None:
+        result["agreement"] = round(agree / len(boards), 4)
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args: argparse.Namespace) -> int:
+    if args.build_corpus:
+        corpus = build_corpus(args.per_phase, args.seed)
+        with open(args.corpus, "w", encoding="utf-8") as corpus_file:
+            json.dump(corpus, corpus_file, indent=1)
+            corpus_file.write("\n")
+        counts = {phase: len(values) for phase, values in corpus["positions"].items()}
+        print(f"wrote {args.corpus}: {counts}", file=sys.stderr)
+        return 0
+
+    corpus = load_corpus(args.corpus)
+    budgets = args.budgets or [game.AUTO_MOVE_TIME_BUDGET]
+    reference_name = args.reference or ("nneonneo" if os.path.isfile(game.nneonneo_lib_path()) else "local")
+    reference_choose = make_reference(reference_name, args.reference_depth)
+    reference = {phase: [reference_choose(board) for board in boards] for phase, boards in corpus.items()}
+
+    runs = []
+    for name in args.engines:
+        # The quick bot does not search, so it runs once; the others run at every budget.
+        for budget in [None] if name == "quick" else budgets:
+            choose = make_suite_engine(name, budget or 0.0)
+            phases = {
+                phase: run_suite_engine(choose, boards, reference[phase]) for phase, boards in corpus.items() if boards
+            }
+            runs.append({"engine": name, "budget": budget, "phases": phases})
+
+    report = {
+        "corpus": os.path.basename(args.corpus),
+        "corpus_version": SUITE_CORPUS_VERSION,
+        "revision": git_revision(),
+        "reference": f"{reference_name}@depth{args.reference_depth}",
+        "runs": runs,
+    }
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        json.dump(report, out, indent=2)
+        out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the local 2048 bot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    eval_parser = subparsers.add_parser("eval", help="leaf evaluations per second, list vs table-driven.")
+    eval_parser.add_argument("--positions", type=int, default=2000, help="corpus size (default: 2000).")
+    eval_parser.add_argument("--seed", type=int, default=2048, help="corpus seed (default: 2048).")
+    eval_parser.add_argument("--seconds", type=float, default=1.0, help="minimum time per run (default: 1).")
+    eval_parser.set_defaults(func=run_eval_benchmark)
+
+    nodes_parser = subparsers.add_parser("nodes", help="expectimax nodes per second, per-call deadline reads vs the counted clock.")
+    nodes_parser.add_argument("--positions", type=int, default=20, help="corpus size (default: 20).")
+    nodes_parser.add_argument("--seed", type=int, default=2048, help="corpus seed (default: 2048).")
+    nodes_parser.add_argument("--budget", type=float, default=game.AUTO_MOVE_TIME_BUDGET, help="search budget per position.")
+    nodes_parser.set_defaults(func=run_nodes_benchmark)
+
+    suite_parser = subparsers.add_parser("suite", help="engine latency, depth and agreement on the position corpus, as JSON.")
+    suite_parser.add_argument("--corpus", default=SUITE_CORPUS_PATH, help="corpus file (default: bench_corpus.json).")
+    suite_parser.add_argument(
+        "--engines", nargs="+", choices=SUITE_ENGINES, default=["quick", "local", "local+strong"], help="engines to run."
+    )
+    suite_parser.add_argument("--budgets", nargs="+", type=float, help="local and nneonneo search budgets in seconds.")
+    suite_parser.add_argument(
+        "--reference",
+        choices=SUITE_REFERENCES,
+        default=None,
+        help="agreement reference, searched untimed to --reference-depth (default: nneonneo if built, else local).",
+    )
+    suite_parser.add_argument(
+        "--reference-depth",
+        type=int,
+        default=SUITE_REFERENCE_DEPTH,
+        help=f"reference search depth (default: {SUITE_REFERENCE_DEPTH}).",
+    )
+    suite_parser.add_argument("--output", default="-", help="JSON report path, '-' for stdout (default).")
+    suite_parser.add_argument("--build-corpus", action="store_true", help="regenerate the corpus file and exit.")
+    suite_parser.add_argument("--per-phase", type=int, default=12, help="positions per phase when building (default: 12).")
+    suite_parser.add_argument("--seed", type=int, default=2048, help="self-play seed when building (default: 2048).")
+    suite_parser.set_defaults(func=run_suite)
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
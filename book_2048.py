@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Build opening books for terminal_2048.OpeningBook.
+
+Starting from every possible opening position, the builder asks an engine for the
+best move, then follows that move into every spawn the game can produce. It keeps
+going until a position has made max_moves moves or its tile sum exceeds max_sum.
+Positions are folded by symmetry: all 8 for the nneonneo engine, whose heuristic is
+invariant under them, and the 4 row-preserving mirrors for the local engine.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import terminal_2048 as game
+
+BestMoves = Callable[[List[int]], List[int]]
+DIR_TO_NATIVE_MOVE = {direction: move for move, direction in game.NNEONNEO_MOVE_TO_DIR.items()}
+
+
+def tile_sum64(board: int) -> int:
+    total = 0
+    while board:
+        rank = board & 0xF
+        if rank:
+            total += 1 << rank
+        board >>= 4
+    return total
+
+
+def opening_positions() -> Set[int]:
+    """Every board the game can start from: two tiles, each a 2 or a 4, on distinct cells."""
+    positions = set()
+    for first in range(game.SIZE * game.SIZE):
+        for second in range(first + 1, game.SIZE * game.SIZE):
+            for first_rank in (1, 2):
+                for second_rank in (1, 2):
+                    positions.add((first_rank << (4 * first)) | (second_rank << (4 * second)))
+    return positions
+
+
+def native_best_moves(engine: game.NneonneoEngine) -> BestMoves:
+    def best_moves(boards: List[int]) -> List[int]:
+        return engine.find_best_moves(boards)[0]
+
+    return best_moves
+
+
+def local_best_moves(budget: float, strong_mode: bool) -> BestMoves:
+    table = game.TranspositionTable()
+
+    def best_moves(boards: List[int]) -> List[int]:
+        moves = []
+        for board in boards:
+            direction = game.choose_auto_move(game.nibble64_to_board(board), budget, strong_mode, table=table)
+            moves.append(DIR_TO_NATIVE_MOVE[direction] if direction is not None else -1)
+        return moves
+
+    return best_moves
+
+
+def build_book(
+    best_moves: BestMoves, symmetries: int, max_moves: int, max_sum: Optional[int] = None
+) -> Dict[int, int]:
+    """Canonical board -> native move code for every position the book's own moves reach."""
+    book: Dict[int, int] = {}
+    frontier = {game.canonical_board64(board, symmetries)[0] for board in opening_positions()}
+    for moves_made in range(max_moves + 1):
+        layer = sorted(
+            board for board in frontier if board not in book and (max_sum is None or tile_sum64(board) <= max_sum)
+        )
+        if not layer:
+            break
+        frontier = set()
+        for board, move in zip(layer, best_moves(layer)):
+            direction = game.NNEONNEO_MOVE_TO_DIR.get(move)
+            if direction is None:
+                continue
+            book[board] = move
+            if moves_made == max_moves:
+                continue
+            moved = game.execute_move64(board, direction)
+            for tile in game.empty_tiles64(moved):
+                for rank in (1, 2):
+                    frontier.add(game.canonical_board64(moved | (tile * rank), symmetries)[0])
+    return book
+
+
+def write_book(path: str, book: Dict[int, int], symmetries: int) -> None:
+    """Write the OpeningBook layout; the file is replaced atomically."""
+    keys = sorted(book)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(game.BOOK_HEADER.pack(game.BOOK_MAGIC, game.BOOK_VERSION, len(keys), symmetries, 0))
+        out.write(b"".join(key.to_bytes(8, "little") for key in keys))
+        out.write(bytes(book[key] for key in keys))
+    os.replace(tmp_path, path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build a 2048 opening book of precomputed best moves.")
+    parser.add_argument("output", help="book file to write, e.g. book.bin.")
+    parser.add_argument(
+        "--engine",
+        choices=("nneonneo", "local"),
+        default="nneonneo",
+        help="engine that picks the book moves (default: nneonneo).",
+    )
+    parser.add_argument("--max-moves", type=int, default=6, help="deepest move number in the book (default: 6).")
+    parser.add_argument(
+        "--max-sum",
+        type=int,
+        default=None,
+        help="also skip positions whose tiles add up to more than this (default: no limit).",
+    )
+    parser.add_argument("--strong", action="store_true", help="local engine: stronger search mode.")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=game.AUTO_MOVE_TIME_BUDGET,
+        help=f"local engine think time per position in seconds (default: {game.AUTO_MOVE_TIME_BUDGET}).",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.engine == "nneonneo":
+        lib_path = game.nneonneo_lib_path()
+        if not os.path.isfile(lib_path):
+            print(f"nneonneo engine unavailable: missing {lib_path}", file=sys.stderr)
+            return 1
+        engine = game.NneonneoEngine(lib_path)
+        best_moves, symmetries = native_best_moves(engine), game.SYMMETRY_COUNT
+    else:
+        engine = None
+        best_moves, symmetries = local_best_moves(args.budget, args.strong), game.MIRROR_SYMMETRIES
+
+    started_at = time.perf_counter()
+    try:
+        book = build_book(best_moves, symmetries, args.max_moves, args.max_sum)
+    finally:
+        if engine is not None:
+            engine.close()
+    write_book(args.output, book, symmetries)
+    print(
+        f"{len(book)} positions ({symmetries} symmetries) in {time.perf_counter() - started_at:.1f}s -> {args.output}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Train n-tuple network weights for terminal_2048.NTupleNetwork by TD learning.
+
+Games are played by simulate_2048.play_headless_game with a greedy player that picks
+the move maximising score gain plus the network's value of the after-move board, and
+learns as it plays: TD(0) over after-move boards, moving each board's value toward
+the next move's gain plus the next after-move value (0 once the game is over).
+
+The weight file is trained in place through a shared mapping, so training can be
+stopped and resumed; the header counts finished games and a resumed run continues
+with the next seeds. With --jobs, worker processes update the same mapping without
+locks; an occasional lost update does not matter for the learned values.
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import simulate_2048 as sim
+import terminal_2048 as game
+
+DEFAULT_ALPHA = 0.1
+
+
+class TDPlayer:
+    """Greedy n-tuple player for simulate_2048.play_headless_game that trains its network."""
+
+    label = "ntuple-td"
+
+    def __init__(self, network: game.NTupleNetwork, alpha: float = DEFAULT_ALPHA):
+        self.network = network
+        self.alpha = alpha
+        self.stats = game.SearchStats()
+        self.book = None
+        self._last_after: Optional[int] = None
+
+    def new_game(self) -> None:
+        self._last_after = None
+
+    def _learn(self, after: int, target: float) -> None:
+        self.network.update(after, self.alpha * (target - self.network.evaluate(after)))
+
+    def choose_move(self, board: game.Board) -> Optional[str]:
+        packed = game.board_to_nibble64(board)
+        best: Optional[Tuple[float, str, int]] = None
+        for direction in game.BOT_DIRECTIONS:
+            after, gain, moved = game.apply_move64(packed, direction)
+            if moved:
+                value = gain + self.network.evaluate(after)
+                if best is None or value > best[0]:
+                    best = (value, direction, after)
+        if best is None:
+            self.end_game(game_over=True)
+            return None
+        if self._last_after is not None:
+            self._learn(self._last_after, best[0])
+        self._last_after = best[2]
+        return best[1]
+
+    def end_game(self, game_over: bool) -> None:
+        """A finished game's last after-move board is worth nothing more; a cut-off one is left alone."""
+        if self._last_after is not None and game_over:
+            self._learn(self._last_after, 0.0)
+        self._last_after = None
+
+
+def train_games(
+    network: game.NTupleNetwork, seeds: List[int], alpha: float, max_moves: Optional[int] = None
+) -> List[int]:
+    """Play and learn from one game per seed; returns the scores."""
+    player = TDPlayer(network, alpha)
+    scores = []
+    for seed in seeds:
+        result = sim.play_headless_game(player, seed, max_moves)
+        player.end_game(bool(result["game_over"]))
+        scores.append(int(result["score"]))
+    return scores
+
+
+_worker_network: Optional[game.NTupleNetwork] = None
+
+
+def _init_train_worker(path: str) -> None:
+    global _worker_network
+    game._ignore_sigint_in_worker()
+    _worker_network = game.NTupleNetwork(path, writable=True)
+
+
+def _train_task(task: Tuple[List[int], float, Optional[int]]) -> List[int]:
+    seeds, alpha, max_moves = task
+    return train_games(_worker_network, seeds, alpha, max_moves)
+
+
+def train(
+    path: str,
+    games: int,
+    shape: str = "small",
+    alpha: float = DEFAULT_ALPHA,
+    base_seed: int = 0,
+    jobs: int = 1,
+    report_every: int = 100,
+    max_moves: Optional[int] = None,
+    out=sys.stderr,
+) -> List[int]:
+    """Train `games` more games into the network at path, creating it if needed; returns the scores.
+
+    The n-th game ever trained into a file uses seed base_seed + n.
+    """
+    network = game.NTupleNetwork(path, writable=True) if os.path.isfile(path) else None
+    if network is None:
+        network = game.NTupleNetwork.create(path, game.NTUPLE_SHAPES[shape])
+    pool = mp.Pool(processes=jobs, initializer=_init_train_worker, initargs=(path,)) if jobs > 1 else None
+    scores: List[int] = []
+    started_at = time.perf_counter()
+    try:
+        first = network.games
+        block = max(1, report_every)
+        chunk = max(1, block // max(1, jobs))
+        for start in range(0, games, block):
+            seeds = [base_seed + first + index for index in range(start, min(games, start + block))]
+            if pool is None:
+                block_scores = train_games(network, seeds, alpha, max_moves)
+            else:
+                tasks = [(seeds[offset : offset + chunk], alpha, max_moves) for offset in range(0, len(seeds), chunk)]
+                block_scores = [score for result in pool.map(_train_task, tasks) for score in result]
+            scores.extend(block_scores)
+            network.set_games(first + len(scores))
+            network.flush()
+            print(
+                f"{network.games} games: mean score {statistics.fmean(block_scores):.0f}, "
+                f"max {max(block_scores)} ({time.perf_counter() - started_at:.1f}s)",
+                file=out,
+            )
+        return scores
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        network.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train a 2048 n-tuple network by TD learning from self-play.")
+    parser.add_argument("output", help="weight file; an existing one is trained further.")
+    parser.add_argument("--games", type=int, default=1000, help="self-play games to train (default: 1000).")
+    parser.add_argument(
+        "--shape",
+        choices=sorted(game.NTUPLE_SHAPES),
+        default="small",
+        help="tuple layout of a new weight file (default: small).",
+    )
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help=f"learning rate (default: {DEFAULT_ALPHA}).")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the file's first game (default: 0).")
+    parser.add_argument("--jobs", type=int, default=1, help="training processes sharing the weights (0 = all cores).")
+    parser.add_argument("--report", type=int, default=100, help="print progress every this many games (default: 100).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    try:
+        train(args.output, args.games, args.shape, args.alpha, args.seed, jobs, args.report)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("interrupted; finished blocks are saved, rerun to continue", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
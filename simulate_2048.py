@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""Headless 2048 simulator: play seeded games with a bot and write JSONL stats.
+
+Spawns come from terminal_2048.SpawnRng, the same stream as `2048-ai/bin/2048 <seed>`,
+so every engine sees identical tiles for a given seed.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import statistics
+import struct
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import batch_2048 as batch
+import terminal_2048 as game
+
+
+class SimEngine:
+    """One bot instance that plays simulated games back to back."""
+
+    def __init__(
+        self,
+        engine: str,
+        strong_mode: bool = False,
+        time_budget: float = game.AUTO_MOVE_TIME_BUDGET,
+        prob_threshold: Optional[float] = None,
+        cache_mb: float = game.AUTO_TT_MAX_BYTES / (1024 * 1024),
+        workers: int = 1,
+        native_table_mb: int = 0,
+        native_threads: int = 1,
+        symmetric: bool = False,
+        book_path: Optional[str] = None,
+        tablebase_path: Optional[str] = None,
+        ntuple_path: Optional[str] = None,
+    ):
+        self.engine = engine
+        self.symmetric = symmetric
+        self.strong_mode = strong_mode
+        self.time_budget = time_budget
+        self.prob_threshold = prob_threshold
+        self.max_bytes = int(cache_mb * 1024 * 1024)
+        self.stats = game.SearchStats()
+        self.table: Optional[game.TranspositionTable] = None
+        self.pool: Optional[game.LocalSearchPool] = None
+        self.native: Optional[game.NneonneoEngine] = None
+        self.book = game.OpeningBook(book_path) if book_path else None
+        self.network = game.NTupleNetwork(ntuple_path) if ntuple_path and engine == "local" else None
+
+        if engine == "nneonneo":
+            lib_path = game.nneonneo_lib_path()
+            if not os.path.isfile(lib_path):
+                raise RuntimeError(f"missing shared library: {lib_path}")
+            self.native = game.NneonneoEngine(
+                lib_path,
+                table_mb=native_table_mb,
+                threads=native_threads,
+                symmetric=symmetric,
+                tablebase=tablebase_path,
+                ntuple=ntuple_path,
+            )
+        elif engine == "batch" and not batch.HAVE_NUMPY:
+            raise RuntimeError("the batch engine needs numpy")
+        elif engine == "local" and workers > 1:
+            self.pool = game.LocalSearchPool(
+                workers, max_bytes=self.max_bytes, symmetric=symmetric, ntuple_path=ntuple_path
+            )
+
+    @property
+    def label(self) -> str:
+        return f"{self.engine}{'+strong' if self.strong_mode and self.engine == 'local' else ''}"
+
+    def new_game(self) -> None:
+        if self.native is not None:
+            self.native.new_game()
+        if self.engine == "local":
+            self.table = game.TranspositionTable(
+                max_bytes=self.max_bytes,
+                symmetric=self.symmetric,
+                evaluator=self.network.evaluate if self.network is not None else None,
+            )
+
+    def choose_move(self, board: game.Board) -> Optional[str]:
+        self.stats.nodes = 0
+        if self.book is not None:
+            direction = self.book.lookup(board)
+            if direction is not None:
+                return direction
+        if self.native is not None:
+            return self.native.choose_move(board, self.stats)
+        if self.engine == "quick":
+            return game.choose_quick_move(board)
+        if self.engine == "batch":
+            return batch.choose_layered_move(board)
+        return game.choose_auto_move(
+            board,
+            self.time_budget,
+            strong_mode=self.strong_mode,
+            table=self.table,
+            prob_threshold=self.prob_threshold,
+            stats=self.stats,
+            pool=self.pool,
+        )
+
+    def close(self) -> None:
+        if self.native is not None:
+            self.native.close()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.network is not None:
+            self.network.close()
+            self.network = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def game_record(
+    engine: SimEngine, seed: int, state: game.GameState, nodes: int, think_times: List[float], wall_seconds: float
+) -> Dict[str, object]:
+    return {
+        "seed": seed,
+        "engine": engine.label,
+        "score": state.score,
+        "max_tile": state.max_tile,
+        "moves": state.moves,
+        "game_over": not state.can_move(),
+        "nodes": nodes,
+        "think_total_s": round(sum(think_times), 6),
+        "think_mean_ms": round(1000 * statistics.fmean(think_times), 3) if think_times else 0.0,
+        "think_p50_ms": round(1000 * percentile(think_times, 0.50), 3),
+        "think_p95_ms": round(1000 * percentile(think_times, 0.95), 3),
+        "think_max_ms": round(1000 * max(think_times, default=0.0), 3),
+        "wall_s": round(wall_seconds, 6),
+    }
+
+
+def play_headless_game(engine: SimEngine, seed: int, max_moves: Optional[int] = None) -> Dict[str, object]:
+    engine.new_game()
+    state = game.GameState(seed)
+    nodes = 0
+    think_times: List[float] = []
+    started_at = time.perf_counter()
+
+    while state.can_move() and (max_moves is None or state.moves < max_moves):
+        think_started_at = time.perf_counter()
+        direction = engine.choose_move(state.board)
+        think_times.append(time.perf_counter() - think_started_at)
+        nodes += engine.stats.nodes
+        if direction is None or not state.move(direction):
+            break
+
+    return game_record(engine, seed, state, nodes, think_times, time.perf_counter() - started_at)
+
+
+def play_headless_games(engine: SimEngine, seeds: List[int], max_moves: Optional[int] = None) -> List[Dict[str, object]]:
+    """Play several games; the native engine without a persistent table plays them in lockstep,
+    one batched call per turn.
+
+    In lockstep each game is charged an equal share of every batch call it took part in.
+    """
+    native = engine.native
+    if native is None or not native.has_batch or native.handle is not None or len(seeds) == 1:
+        return [play_headless_game(engine, seed, max_moves) for seed in seeds]
+
+    states = [game.GameState(seed) for seed in seeds]
+    think_times: List[List[float]] = [[] for _ in seeds]
+    finished_at: List[Optional[float]] = [None] * len(seeds)
+    started_at = time.perf_counter()
+
+    def active(index: int) -> bool:
+        state = states[index]
+        return finished_at[index] is None and state.can_move() and (max_moves is None or state.moves < max_moves)
+
+    while True:
+        now = time.perf_counter()
+        playing = []
+        for index in range(len(states)):
+            if active(index):
+                playing.append(index)
+            elif finished_at[index] is None:
+                finished_at[index] = now
+        if not playing:
+            break
+        think_started_at = time.perf_counter()
+        directions = [engine.book.lookup(states[index].board) if engine.book else None for index in playing]
+        searching = [index for index, direction in zip(playing, directions) if direction is None]
+        if searching:
+            moves, _ = native.find_best_moves([game.board_to_nibble64(states[index].board) for index in searching])
+            searched = dict(zip(searching, moves))
+            directions = [
+                direction or game.NNEONNEO_MOVE_TO_DIR.get(searched[index])
+                for index, direction in zip(playing, directions)
+            ]
+        share = (time.perf_counter() - think_started_at) / len(playing)
+        for index, direction in zip(playing, directions):
+            think_times[index].append(share)
+            if direction is None or not states[index].move(direction):
+                finished_at[index] = time.perf_counter()
+
+    return [
+        game_record(engine, seed, state, 0, times, (finished or started_at) - started_at)
+        for seed, state, times, finished in zip(seeds, states, think_times, finished_at)
+    ]
+
+
+_worker_engine: Optional[SimEngine] = None
+_worker_error: Optional[str] = None
+
+
+def _init_sim_worker(engine_options: Dict[str, Any]) -> None:
+    global _worker_engine, _worker_error
+    game._ignore_sigint_in_worker()
+    # An initializer that raises makes the pool respawn workers forever; fail the tasks instead.
+    try:
+        _worker_engine = SimEngine(**engine_options)
+    except Exception as exc:
+        _worker_error = f"{type(exc).__name__}: {exc}"
+
+
+def _play_chunk(engine: SimEngine, chunk: List[Tuple[int, int]], max_moves: Optional[int]) -> List[Dict[str, object]]:
+    results = play_headless_games(engine, [seed for _, seed in chunk], max_moves)
+    for (index, _), result in zip(chunk, results):
+        result["game"] = index
+    return results
+
+
+def _sim_task(task: Tuple[List[Tuple[int, int]], Optional[int]]) -> List[Dict[str, object]]:
+    chunk, max_moves = task
+    if _worker_engine is None:
+        raise RuntimeError(f"simulation worker failed to start: {_worker_error}")
+    return _play_chunk(_worker_engine, chunk, max_moves)
+
+
+def run_games(
+    engine_options: Dict[str, Any],
+    games: int,
+    base_seed: int,
+    max_moves: Optional[int] = None,
+    jobs: int = 1,
+    batch: int = 1,
+) -> Iterator[Dict[str, object]]:
+    """Yield results as games finish; game i always uses seed base_seed + i.
+
+    batch > 1 groups games into chunks that the native engine plays in lockstep.
+    With jobs > 1 one engine is built here first, so bad engine options raise before
+    any worker starts.
+    """
+    games_and_seeds = [(index, base_seed + index) for index in range(games)]
+    batch = max(1, batch)
+    chunks = [games_and_seeds[start : start + batch] for start in range(0, games, batch)]
+    if jobs <= 1:
+        engine = SimEngine(**engine_options)
+        try:
+            for chunk in chunks:
+                yield from _play_chunk(engine, chunk, max_moves)
+        finally:
+            engine.close()
+        return
+
+    SimEngine(**engine_options).close()
+    pool = mp.Pool(processes=jobs, initializer=_init_sim_worker, initargs=(engine_options,))
+    try:
+        for results in pool.imap_unordered(_sim_task, [(chunk, max_moves) for chunk in chunks]):
+            yield from results
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def summarize(results: List[Dict[str, object]], wall_seconds: float) -> str:
+    if not results:
+        return "no games played"
+    scores = [int(result["score"]) for result in results]
+    moves = sum(int(result["moves"]) for result in results)
+    think = sum(float(result["think_total_s"]) for result in results)
+    tiles: Dict[int, int] = {}
+    for result in results:
+        tiles[int(result["max_tile"])] = tiles.get(int(result["max_tile"]), 0) + 1
+    tile_summary = ", ".join(f"{tile}: {count}" for tile, count in sorted(tiles.items(), reverse=True))
+    return (
+        f"{len(results)} games in {wall_seconds:.1f}s, {moves / max(wall_seconds, 1e-9):.1f} moves/sec\n"
+        f"score mean {statistics.fmean(scores):.0f}, median {statistics.median(scores):.0f}, "
+        f"max {max(scores)}\n"
+        f"max tiles {tile_summary}\n"
+        f"think {1000 * think / max(moves, 1):.1f}ms/move"
+    )
+
+
+def write_result(out: TextIO, result: Dict[str, object]) -> None:
+    out.write(json.dumps(result, sort_keys=True) + "\n")
+    out.flush()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Play 2048 games headlessly and record per-game stats as JSONL.")
+    parser.add_argument("--games", type=int, default=10, help="number of games (default: 10).")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i.")
+    parser.add_argument(
+        "--engine",
+        choices=("local", "quick", "nneonneo", "batch"),
+        default="local",
+        help="bot engine; quick is the one-ply greedy fallback, batch the numpy full-width search (default: local).",
+    )
+    parser.add_argument("--strong", action="store_true", help="use stronger local search mode.")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=game.AUTO_MOVE_TIME_BUDGET,
+        help=f"local engine think time per move in seconds (default: {game.AUTO_MOVE_TIME_BUDGET}).",
+    )
+    parser.add_argument("--prob-threshold", type=float, default=None, help="local engine probability pruning.")
+    parser.add_argument("--workers", type=int, default=1, help="local engine root-parallel worker processes.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="games played in parallel, one engine per process (default: 1; 0 = all cores).",
+    )
+    parser.add_argument(
+        "--native-table-mb",
+        type=int,
+        default=0,
+        help="nneonneo engine: persistent transposition table size in MiB (default: 0, a fresh table per move).",
+    )
+    parser.add_argument(
+        "--native-threads",
+        type=int,
+        default=1,
+        help="nneonneo engine search threads; more than 1 implies a persistent table (default: 1).",
+    )
+    parser.add_argument("--book", default=None, help="opening book from book_2048.py, consulted before any search.")
+    parser.add_argument(
+        "--symmetric-cache",
+        action="store_true",
+        help="share transposition entries between symmetric boards; implies a native table for nneonneo.",
+    )
+    parser.add_argument(
+        "--tablebase",
+        default=None,
+        help="nneonneo engine: endgame tablebase from tablebase_2048.py used as a leaf oracle; implies a native table.",
+    )
+    parser.add_argument(
+        "--ntuple",
+        default=None,
+        help="n-tuple network from ntuple_2048.py that scores search leaves instead of the heuristic.",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=1,
+        help="nneonneo engine: games played in lockstep through one batched native call per turn (default: 1).",
+    )
+    parser.add_argument("--max-moves", type=int, default=None, help="stop each game after this many moves.")
+    parser.add_argument("--output", default="-", help="JSONL output path, '-' for stdout (default).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if jobs > 1 and args.workers > 1:
+        print("--jobs and --workers cannot both be greater than 1", file=sys.stderr)
+        return 2
+    engine_options = {
+        "engine": args.engine,
+        "strong_mode": args.strong,
+        "time_budget": args.budget,
+        "prob_threshold": args.prob_threshold,
+        "workers": args.workers,
+        "native_table_mb": args.native_table_mb,
+        "native_threads": args.native_threads,
+        "symmetric": args.symmetric_cache,
+        "book_path": args.book,
+        "tablebase_path": args.tablebase,
+        "ntuple_path": args.ntuple,
+    }
+    if args.engine == "nneonneo" and not os.path.isfile(game.nneonneo_lib_path()):
+        print(f"nneonneo engine unavailable: missing {game.nneonneo_lib_path()}", file=sys.stderr)
+        return 1
+    if args.engine == "batch" and not batch.HAVE_NUMPY:
+        print("batch engine unavailable: numpy is not installed", file=sys.stderr)
+        return 1
+    for flag, path in (("--book", args.book), ("--tablebase", args.tablebase), ("--ntuple", args.ntuple)):
+        if path and not os.path.isfile(path):
+            print(f"{flag}: no such file: {path}", file=sys.stderr)
+            return 1
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    results: List[Dict[str, object]] = []
+    started_at = time.perf_counter()
+    try:
+        for result in run_games(engine_options, args.games, args.seed, args.max_moves, jobs, args.batch):
+            write_result(out, result)
+            results.append(result)
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError, RuntimeError, struct.error) as exc:
+        print(f"{args.engine} engine failed: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(summarize(results, time.perf_counter() - started_at), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
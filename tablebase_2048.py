@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Endgame tablebases: exact chances of building a target tile around locked tiles.
+
+A layout fixes some cells to large "locked" tiles; the other cells form the free
+region. A move is legal only if it changes the board and leaves every locked tile
+where it is, and spawns land in the free region. The tablebase stores, for every
+free-region position with all tiles below the target, the probability that perfect
+play builds the target tile there before running out of legal moves.
+
+Moves keep the tile sum and spawns raise it, so positions are solved in layers of
+decreasing tile sum: every value depends only on layers already written. Each layer
+is split across worker processes that read the earlier layers from the shared
+mapped file. The header records the highest layer still pending, so an interrupted
+run resumes from the last finished layer.
+
+File layout (little-endian): TABLEBASE_HEADER, zero padding up to TABLEBASE_OFFSET,
+then one float32 per position, indexed by the free-cell ranks in ascending cell
+order as base-`target rank` digits, least significant first. 2048-ai/2048.cpp reads
+the same format (tablebase_open) and uses it as a leaf oracle.
+"""
+
+import argparse
+import array
+import mmap
+import multiprocessing as mp
+import os
+import struct
+import sys
+import time
+from typing import List, Optional, Sequence, Set, Tuple
+
+import terminal_2048 as game
+
+TABLEBASE_MAGIC = b"2048TBS\0"
+TABLEBASE_VERSION = 1
+# magic, version, target rank, locked tiles, locked cell mask, free cells, pending sum (-1: complete)
+TABLEBASE_HEADER = struct.Struct("<8sIIQQIi")
+TABLEBASE_OFFSET = 64
+SPAWN_OPTIONS = ((1, 0.9), (2, 0.1))
+SOLVE_CHUNK = 4096
+# Positions a tablebase may hold: 1 GiB of float32 values, e.g. 8 free cells up to a 1024
+# target. The largest layer's indexes are also held in memory while it is solved.
+TABLEBASE_MAX_POSITIONS = 1 << 28
+
+
+def parse_layout(text: str) -> Tuple[int, int]:
+    """(locked tiles, locked cell mask) from 16 row-major tokens: a tile value, or '.' for a free cell."""
+    tokens = text.replace("/", " ").split()
+    if len(tokens) != game.SIZE * game.SIZE:
+        raise ValueError(f"layout needs {game.SIZE * game.SIZE} cells, got {len(tokens)}")
+    locked = locked_mask = 0
+    for cell, token in enumerate(tokens):
+        if token == ".":
+            continue
+        value = int(token)
+        if value < 2 or value & (value - 1):
+            raise ValueError(f"locked tile {token} is not a power of two")
+        locked |= min(15, value.bit_length() - 1) << (4 * cell)
+        locked_mask |= 0xF << (4 * cell)
+    return locked, locked_mask
+
+
+class Tablebase:
+    def __init__(self, path: str, writable: bool = False):
+        with open(path, "r+b" if writable else "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        try:
+            magic, version, target_rank, locked, locked_mask, free_count, pending_sum = TABLEBASE_HEADER.unpack_from(
+                self._mmap
+            )
+            if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+                raise ValueError(f"{path} is not a version {TABLEBASE_VERSION} tablebase")
+            self.free_cells = tuple(cell for cell in range(16) if not (locked_mask >> (4 * cell)) & 0xF)
+            if len(self.free_cells) != free_count or target_rank < 2:
+                raise ValueError(f"{path} has an inconsistent header")
+            if len(self._mmap) != TABLEBASE_OFFSET + 4 * target_rank**free_count:
+                raise ValueError(f"{path} is truncated")
+            if sys.byteorder != "little":
+                raise ValueError("tablebases can only be read on little-endian machines")
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+        self.target_rank = target_rank
+        self.locked = locked
+        self.locked_mask = locked_mask
+        self.pending_sum = pending_sum
+        self.values = memoryview(self._mmap)[TABLEBASE_OFFSET:].cast("f")
+
+    @classmethod
+    def create(cls, path: str, locked: int, locked_mask: int, target_rank: int) -> "Tablebase":
+        free_count = sum(1 for cell in range(16) if not (locked_mask >> (4 * cell)) & 0xF)
+        pending_sum = free_count << (target_rank - 1)
+        with open(path, "wb") as out:
+            out.write(
+                TABLEBASE_HEADER.pack(
+                    TABLEBASE_MAGIC, TABLEBASE_VERSION, target_rank, locked, locked_mask, free_count, pending_sum
+                )
+            )
+            out.truncate(TABLEBASE_OFFSET + 4 * target_rank**free_count)
+        return cls(path, writable=True)
+
+    @property
+    def complete(self) -> bool:
+        return self.pending_sum < 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def matches(self, packed: int) -> bool:
+        return packed & self.locked_mask == self.locked
+
+    def reached(self, packed: int) -> bool:
+        return any((packed >> (4 * cell)) & 0xF >= self.target_rank for cell in self.free_cells)
+
+    def index(self, packed: int) -> int:
+        index = 0
+        for cell in reversed(self.free_cells):
+            index = index * self.target_rank + ((packed >> (4 * cell)) & 0xF)
+        return index
+
+    def board(self, index: int) -> int:
+        packed = self.locked
+        for cell in self.free_cells:
+            index, rank = divmod(index, self.target_rank)
+            packed |= rank << (4 * cell)
+        return packed
+
+    def value(self, packed: int) -> float:
+        """Success probability of a matching position with the player to move."""
+        return 1.0 if self.reached(packed) else self.values[self.index(packed)]
+
+    def probe(self, packed: int) -> Optional[float]:
+        """value() for a finished tablebase, or None if the position is outside it."""
+        if not self.complete or not self.matches(packed):
+            return None
+        return self.value(packed)
+
+    def solve(self, packed: int) -> float:
+        """Best expected success over legal moves; needs every higher tile-sum layer solved."""
+        best = 0.0
+        for move in game.BOT_MOVES64:
+            moved = move(packed)
+            if moved == packed or moved & self.locked_mask != self.locked:
+                continue
+            if self.reached(moved):
+                return 1.0
+            empties = game.empty_tiles64(moved)
+            total = 0.0
+            for tile in empties:
+                for rank, prob in SPAWN_OPTIONS:
+                    total += prob * self.value(moved | (tile * rank))
+            best = max(best, total / len(empties))
+        return best
+
+    def set_pending_sum(self, pending_sum: int) -> None:
+        self._mmap.flush()
+        struct.pack_into("<i", self._mmap, TABLEBASE_HEADER.size - 4, pending_sum)
+        self._mmap.flush()
+        self.pending_sum = pending_sum
+
+    def close(self) -> None:
+        self.values.release()
+        self._mmap.close()
+
+
+def reachable_sums(target_rank: int, free_count: int) -> List[Set[int]]:
+    """reachable_sums(...)[k] holds every tile sum that k free cells can add up to."""
+    tile_values = [0] + [1 << rank for rank in range(1, target_rank)]
+    reachable = [{0}]
+    for _ in range(free_count):
+        reachable.append({total + value for value in tile_values for total in reachable[-1]})
+    return reachable
+
+
+def layer_indexes(target_rank: int, free_count: int, total: int, reachable: Sequence[Set[int]]) -> array.array:
+    """Ascending indexes of the positions whose free-region tile sum is `total`.
+
+    Digits are chosen from the most significant cell down, keeping only prefixes whose
+    remaining sum the lower cells can still reach, so no other layer is enumerated.
+    """
+    tile_values = [0] + [1 << rank for rank in range(1, target_rank)]
+    indexes = array.array("Q", [0])
+    remaining = array.array("Q", [total])
+    for cell in reversed(range(free_count)):
+        scale = target_rank**cell
+        below = reachable[cell]
+        # (index step, sum left for the lower cells) of every digit that keeps a sum reachable
+        steps = {
+            left: [(digit * scale, left - value) for digit, value in enumerate(tile_values) if left - value in below]
+            for left in set(remaining)
+        }
+        next_indexes = array.array("Q")
+        next_remaining = array.array("Q")
+        for index, left in zip(indexes, remaining):
+            for step, rest in steps[left]:
+                next_indexes.append(index + step)
+                next_remaining.append(rest)
+        indexes, remaining = next_indexes, next_remaining
+    return indexes
+
+
+_worker_tablebase: Optional[Tablebase] = None
+
+
+def _init_solve_worker(path: str, ignore_sigint: bool = True) -> None:
+    global _worker_tablebase
+    if ignore_sigint:
+        game._ignore_sigint_in_worker()
+    _worker_tablebase = Tablebase(path)
+
+
+def _close_solve_worker() -> None:
+    global _worker_tablebase
+    if _worker_tablebase is not None:
+        _worker_tablebase.close()
+        _worker_tablebase = None
+
+
+def _solve_chunk(indexes: Sequence[int]) -> Tuple[Sequence[int], array.array]:
+    tablebase = _worker_tablebase
+    return indexes, array.array("f", (tablebase.solve(tablebase.board(index)) for index in indexes))
+
+
+def generate(
+    path: str,
+    locked: int,
+    locked_mask: int,
+    target_rank: int,
+    jobs: int = 1,
+    max_layers: Optional[int] = None,
+    force: bool = False,
+) -> bool:
+    """Solve (or resume solving) a tablebase; returns True once it is complete.
+
+    max_layers stops after that many layers, leaving a resumable file. An existing
+    file that is not this tablebase is only overwritten with force. Layouts with more
+    than TABLEBASE_MAX_POSITIONS positions (target rank ** free cells) are refused.
+    """
+    if not 2 <= target_rank <= 15:
+        raise ValueError(f"target rank {target_rank} is outside 2..15")
+    free_count = sum(1 for cell in range(16) if not (locked_mask >> (4 * cell)) & 0xF)
+    if target_rank**free_count > TABLEBASE_MAX_POSITIONS:
+        raise ValueError(
+            f"{free_count} free cells up to rank {target_rank} is {target_rank**free_count} positions, "
+            f"over the limit of {TABLEBASE_MAX_POSITIONS}; lock more cells or lower the target"
+        )
+    tablebase: Optional[Tablebase] = None
+    if os.path.isfile(path):
+        try:
+            tablebase = Tablebase(path, writable=True)
+        except (ValueError, struct.error) as exc:
+            if not force:
+                raise ValueError(f"{path} is not a tablebase ({exc}); refusing to overwrite it without --force") from exc
+            tablebase = None
+        if tablebase is not None and (tablebase.locked, tablebase.locked_mask, tablebase.target_rank) != (
+            locked,
+            locked_mask,
+            target_rank,
+        ):
+            tablebase.close()
+            if not force:
+                raise ValueError(f"{path} holds a different tablebase; refusing to overwrite it without --force")
+            tablebase = None
+    if tablebase is None:
+        tablebase = Tablebase.create(path, locked, locked_mask, target_rank)
+
+    pool = mp.Pool(processes=jobs, initializer=_init_solve_worker, initargs=(path,)) if jobs > 1 else None
+    if pool is None:
+        _init_solve_worker(path, ignore_sigint=False)
+    try:
+        reachable = reachable_sums(target_rank, free_count)
+        pending = sorted((total for total in reachable[free_count] if total <= tablebase.pending_sum), reverse=True)
+        for done, total in enumerate(pending):
+            if max_layers is not None and done >= max_layers:
+                return False
+            indexes = layer_indexes(target_rank, free_count, total, reachable)
+            chunks = [indexes[start : start + SOLVE_CHUNK] for start in range(0, len(indexes), SOLVE_CHUNK)]
+            results = pool.imap_unordered(_solve_chunk, chunks) if pool is not None else map(_solve_chunk, chunks)
+            for chunk, values in results:
+                for index, value in zip(chunk, values):
+                    tablebase.values[index] = value
+            tablebase.set_pending_sum(pending[done + 1] if done + 1 < len(pending) else -1)
+        return tablebase.complete
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        else:
+            _close_solve_worker()
+        tablebase.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Solve a 2048 endgame tablebase by retrograde analysis.")
+    parser.add_argument("output", help="tablebase file; an unfinished one with the same layout is resumed.")
+    parser.add_argument(
+        "--layout",
+        required=True,
+        help="16 row-major cells, '/' between rows allowed: a locked tile value or '.' for a free cell, "
+        "e.g. '2048 1024 512 256 / 16 32 64 128 / . . . 8 / . . . 4'.",
+    )
+    parser.add_argument(
+        "--target",
+        type=int,
+        default=64,
+        help="tile to build in the free region, up to 32768 (default: 64). (target rank) ** (free cells) "
+        f"may be at most {TABLEBASE_MAX_POSITIONS} positions, e.g. a 1024 target over 8 free cells.",
+    )
+    parser.add_argument("--jobs", type=int, default=0, help="worker processes (default: 0 = all cores).")
+    parser.add_argument("--max-layers", type=int, default=None, help="stop after solving this many tile-sum layers.")
+    parser.add_argument(
+        "--force", action="store_true", help="overwrite an existing output file that is not this tablebase."
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        locked, locked_mask = parse_layout(args.layout)
+    except ValueError as exc:
+        print(f"bad layout: {exc}", file=sys.stderr)
+        return 2
+    if args.target < 4 or args.target > 32768 or args.target & (args.target - 1):
+        print("--target must be a power of two from 4 to 32768", file=sys.stderr)
+        return 2
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    target_rank = args.target.bit_length() - 1
+    started_at = time.perf_counter()
+    try:
+        complete = generate(args.output, locked, locked_mask, target_rank, jobs, args.max_layers, args.force)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("interrupted; rerun the same command to resume", file=sys.stderr)
+        return 130
+    state = "complete" if complete else "paused, rerun to resume"
+    print(f"{args.output}: {state} after {time.perf_counter() - started_at:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
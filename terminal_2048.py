@@ -2,16 +2,25 @@
 """Terminal 2048 game using curses."""
 
 import argparse
+import asyncio
+import bisect
 import ctypes
 import curses
+import heapq
 import math
+import mmap
 import multiprocessing as mp
 import os
+import queue
 import random
+import signal
+import struct
 import sys
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
 
 SIZE = 4
 TARGET = 2048
@@ -22,13 +31,140 @@ MAX_CHANCE_BRANCHES = 8
 AUTO_MOVE_TIME_BUDGET = 0.28
 AUTO_MOVE_MAX_THINK_TIME = 1.0
 NNEONNEO_STARTUP_TIMEOUT = 1.5
+# Pre-started workers kept ready to replace one killed at a move deadline.
+NNEONNEO_SPARE_WORKERS = 1
+# How long a move waits for a spare that is still loading before giving up on it.
+NNEONNEO_SPARE_POLL = 0.01
+# Part of a move budget kept for pipe round-trips around the native search.
+NNEONNEO_IPC_MARGIN = 0.02
+# Persistent native transposition table per worker; replacement policies match 2048.h.
+NNEONNEO_TABLE_MB = 64
+NATIVE_REPLACE_DEPTH = 0
+NATIVE_REPLACE_ALWAYS = 1
+# Leaf bonus per unit of endgame tablebase success chance; the native heuristic's loss penalty.
+NNEONNEO_TABLEBASE_WEIGHT = 200000.0
+AUTO_TT_MAX_BYTES = 64 * 1024 * 1024
+# Opening book file header: magic, version, entry count, symmetries folded, reserved.
+BOOK_MAGIC = b"2048BOOK"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<8sIIII")
+# n-tuple network weight file: header (magic, version, tuple count, games trained), one
+# tuple record (cell count, cells) per tuple, then from NTUPLE_OFFSET each tuple's
+# 16 ** cells float32 weights in turn.
+NTUPLE_MAGIC = b"2048NTW\0"
+NTUPLE_VERSION = 1
+NTUPLE_HEADER = struct.Struct("<8sIIQ")
+NTUPLE_TUPLE = struct.Struct("<B7s")
+NTUPLE_OFFSET = 4096
+NTUPLE_MAX_CELLS = 7
+# Tuple layouts for new networks. "small": two lines and two squares of 4 cells (1 MiB);
+# "large": the 4 x 6-cell network common in the 2048 TD-learning literature (256 MiB).
+NTUPLE_SHAPES = {
+    "small": ((0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 4, 5), (5, 6, 9, 10)),
+    "large": ((0, 1, 2, 3, 4, 5), (4, 5, 6, 7, 8, 9), (0, 1, 2, 4, 5, 6), (4, 5, 6, 8, 9, 10)),
+}
+# Rough CPython cost of one transposition entry: dict slot, int key, tuple and floats.
+TT_ENTRY_BYTES = 184
+# TranspositionTable keys are board << 2 | tag: 0 max node, 1 chance node, 2 static score.
+STATIC_KEY_TAG = 2
+CLOCK_INITIAL_INTERVAL = 32
+CLOCK_MAX_INTERVAL = 4096
+CLOCK_CHECK_SECONDS = 0.002
+POOL_SPLIT_DEPTH = 3
+POOL_RESULT_GRACE = 0.05
+
+# evaluate_board weights.
+EVAL_EMPTY_WEIGHT = 360.0
+EVAL_MERGES_WEIGHT = 140.0
+EVAL_SMOOTHNESS_WEIGHT = 14.0
+EVAL_MONOTONICITY_WEIGHT = 28.0
+EVAL_SNAKE_WEIGHT = 32.0
+EVAL_CORNER_WEIGHT = 220.0
+EVAL_MAX_TILE_WEIGHT = 24.0
 
 Board = List[List[int]]
+T = TypeVar("T")
+MASK64 = (1 << 64) - 1
 NNEONNEO_MOVE_TO_DIR = {0: "up", 1: "down", 2: "left", 3: "right"}
+# memoryview formats of native-endian unsigned 64-bit buffers: array("Q") is "Q", NumPy uint64 "L" on LP64.
+NATIVE_U64_FORMATS = frozenset(
+    prefix + code for prefix in ("", "@", "=", "<" if sys.byteorder == "little" else ">") for code in "QL"
+)
+# Worker pipe framing: request id, packed board and budget in seconds (<= 0: untimed) in;
+# tagged frames out: NNEONNEO_REPLY_TAG, request id and native move (-1: none), or
+# NNEONNEO_ERROR_TAG, the failed request's id (0 during startup) and a UTF-8 message.
+# An empty frame is "ready" or "stop".
+NNEONNEO_REQUEST = struct.Struct("<IQd")
+NNEONNEO_REPLY = struct.Struct("<cIb")
+NNEONNEO_ERROR = struct.Struct("<cI")
+NNEONNEO_REPLY_TAG = b"M"
+NNEONNEO_ERROR_TAG = b"E"
+# Requests a parent keeps in flight to one worker, so neither side fills its pipe and blocks.
+NNEONNEO_PIPELINE_DEPTH = 512
+
+
+class SearchClock:
+    """Move deadline for expectimax that reads the clock once every `interval` nodes.
+
+    Nodes decrement `countdown` and call check() when it runs out. Each check
+    recalibrates the interval from the measured node rate so clock reads land about
+    CLOCK_CHECK_SECONDS apart. After the deadline `expired` stays set and every
+    node returns at once, so the search unwinds without raising through the
+    recursion. Results computed after expiry must be discarded, not cached.
+    """
+
+    __slots__ = ("started_at", "deadline", "calibrate", "interval", "countdown", "nodes", "expired")
+
+    def __init__(self, budget: float, interval: int = CLOCK_INITIAL_INTERVAL, calibrate: bool = True):
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + budget
+        self.calibrate = calibrate
+        self.interval = max(1, interval)
+        self.countdown = self.interval
+        self.nodes = 0
+        self.expired = False
+        if budget <= 0:
+            # Stale work (e.g. a queued pool task) should unwind at its first node.
+            self.expired = True
+            self.interval = self.countdown = 0
+
+    @property
+    def node_count(self) -> int:
+        if self.expired:
+            return self.nodes
+        return self.nodes + self.interval - self.countdown
+
+    def check(self) -> bool:
+        if self.expired:
+            return True
+        self.nodes += self.interval - self.countdown
+        now = time.monotonic()
+        if now >= self.deadline:
+            self.expired = True
+            self.interval = self.countdown = 0
+            return True
+        if self.calibrate:
+            rate = self.nodes / max(1e-6, now - self.started_at)
+            interval = min(CLOCK_MAX_INTERVAL, int(rate * CLOCK_CHECK_SECONDS))
+            # Never schedule the next read past the deadline at the current rate.
+            self.interval = max(1, min(interval, int(rate * (self.deadline - now))))
+        self.countdown = self.interval
+        return False
+
 
+class SearchStats:
+    """Telemetry for one choose_auto_move call.
 
-class SearchTimeout(Exception):
-    """Raised when autoplay search exceeds the move time budget."""
+    depth is the deepest completed search depth in chance layers below the root moves,
+    the same measure as the native engines' max_depth.
+    """
+
+    __slots__ = ("nodes", "depth", "elapsed")
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.depth = 0
+        self.elapsed = 0.0
 
 
 def board_to_nibble64(board: Board) -> int:
@@ -43,6 +179,274 @@ def board_to_nibble64(board: Board) -> int:
     return packed
 
 
+# Packed boards use the board_to_nibble64 layout shared with 2048-ai/2048.h: cell
+# (r, c) lives in the nibble at shift 4 * (4 * r + c), so (0, 0) is the LSB.
+ROW_MASK = 0xFFFF
+COL_MASK = 0x000F000F000F000F
+
+
+def nibble64_to_board(packed: int) -> Board:
+    board = [[0] * SIZE for _ in range(SIZE)]
+    for r in range(SIZE):
+        for c in range(SIZE):
+            rank = (packed >> (4 * (SIZE * r + c))) & 0xF
+            board[r][c] = 1 << rank if rank else 0
+    return board
+
+
+def reverse_row(row: int) -> int:
+    return (row >> 12) | ((row >> 4) & 0x00F0) | ((row << 4) & 0x0F00) | ((row << 12) & 0xF000)
+
+
+def unpack_col(row: int) -> int:
+    return (row | (row << 12) | (row << 24) | (row << 36)) & COL_MASK
+
+
+def transpose64(x: int) -> int:
+    a1 = x & 0xF0F00F0FF0F00F0F
+    a2 = x & 0x0000F0F00000F0F0
+    a3 = x & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def mirror_rows64(x: int) -> int:
+    """Reverse the tiles within every row (mirror left-right)."""
+    return (
+        ((x & 0x000F000F000F000F) << 12)
+        | ((x & 0x00F000F000F000F0) << 4)
+        | ((x & 0x0F000F000F000F00) >> 4)
+        | ((x & 0xF000F000F000F000) >> 12)
+    )
+
+
+def flip_rows64(x: int) -> int:
+    """Reverse the order of the rows (mirror top-bottom)."""
+    return ((x << 48) & MASK64) | ((x << 16) & 0x0000FFFF00000000) | ((x >> 16) & 0xFFFF0000) | (x >> 48)
+
+
+# Board symmetries, numbered as in 2048-ai/2048.h: bit 0 mirrors rows, bit 1 flips the
+# row order, bit 2 then transposes. The first MIRROR_SYMMETRIES keep rows as rows.
+SYMMETRY_COUNT = 8
+MIRROR_SYMMETRIES = 4
+_SYMMETRY_STEPS = (
+    (1, mirror_rows64, {"left": "right", "right": "left"}),
+    (2, flip_rows64, {"up": "down", "down": "up"}),
+    (4, transpose64, {"up": "left", "left": "up", "down": "right", "right": "down"}),
+)
+
+
+def symmetry_images64(board: int) -> Tuple[int, ...]:
+    """All 8 symmetric images of a board (with repeats for symmetric boards)."""
+    mirrored = mirror_rows64(board)
+    flipped = flip_rows64(board)
+    both = flip_rows64(mirrored)
+    return (
+        board,
+        mirrored,
+        flipped,
+        both,
+        transpose64(board),
+        transpose64(mirrored),
+        transpose64(flipped),
+        transpose64(both),
+    )
+
+
+def transform64(board: int, symmetry: int) -> int:
+    for bit, transform, _ in _SYMMETRY_STEPS:
+        if symmetry & bit:
+            board = transform(board)
+    return board
+
+
+def symmetry_direction(symmetry: int, direction: str) -> str:
+    """The move on transform64(board, symmetry) that matches `direction` on board."""
+    for bit, _, swap in _SYMMETRY_STEPS:
+        if symmetry & bit:
+            direction = swap.get(direction, direction)
+    return direction
+
+
+def inverse_symmetry_direction(symmetry: int, direction: str) -> str:
+    """The move on board that matches `direction` on transform64(board, symmetry)."""
+    for bit, _, swap in reversed(_SYMMETRY_STEPS):
+        if symmetry & bit:
+            direction = swap.get(direction, direction)
+    return direction
+
+
+def canonical_board64(board: int, symmetries: int = SYMMETRY_COUNT) -> Tuple[int, int]:
+    """(smallest image, its symmetry) over the first `symmetries` symmetries."""
+    return min((transform64(board, symmetry), symmetry) for symmetry in range(symmetries))
+
+
+def mirror_canonical64(board: int) -> int:
+    """canonical_board64(board, MIRROR_SYMMETRIES)[0], unrolled for the search hot path."""
+    mirrored = mirror_rows64(board)
+    return min(board, mirrored, flip_rows64(board), flip_rows64(mirrored))
+
+
+def slide_row_left(line: List[int]) -> Tuple[List[int], int]:
+    # Rank version of slide_and_merge, keeping 2048.cpp's 32768 + 32768 = 32768 limit.
+    non_zero = [rank for rank in line if rank != 0]
+    merged: List[int] = []
+    score_gain = 0
+
+    i = 0
+    while i < len(non_zero):
+        if i + 1 < len(non_zero) and non_zero[i] == non_zero[i + 1]:
+            rank = non_zero[i]
+            merged.append(rank + 1 if rank != 0xF else rank)
+            score_gain += 1 << (rank + 1)
+            i += 2
+        else:
+            merged.append(non_zero[i])
+            i += 1
+
+    merged.extend([0] * (SIZE - len(merged)))
+    return merged, score_gain
+
+
+# 65536-entry row tables. Move tables hold oldrow ^ newrow (unpacked columns for
+# up/down) so a move is four lookups xor'ed into the board.
+ROW_LEFT_TABLE = [0] * 65536
+ROW_RIGHT_TABLE = [0] * 65536
+COL_UP_TABLE = [0] * 65536
+COL_DOWN_TABLE = [0] * 65536
+ROW_LEFT_GAIN = [0] * 65536
+ROW_RIGHT_GAIN = [0] * 65536
+ROW_MOVABLE = [False] * 65536
+# Spawn bits (1 << shift) of the empty cells of a row, per row position.
+ROW_EMPTY_TILES: List[List[Tuple[int, ...]]] = [[()] * 65536 for _ in range(SIZE)]
+
+
+def init_tables() -> None:
+    empty_tiles_by_pattern = [
+        [tuple(1 << (16 * pos + 4 * c) for c in range(SIZE) if pattern >> c & 1) for pattern in range(16)]
+        for pos in range(SIZE)
+    ]
+    for row in range(65536):
+        line = [(row >> 0) & 0xF, (row >> 4) & 0xF, (row >> 8) & 0xF, (row >> 12) & 0xF]
+        moved, gain = slide_row_left(line)
+        result = moved[0] | (moved[1] << 4) | (moved[2] << 8) | (moved[3] << 12)
+        rev_result = reverse_row(result)
+        rev_row = reverse_row(row)
+
+        ROW_LEFT_TABLE[row] = row ^ result
+        ROW_RIGHT_TABLE[rev_row] = rev_row ^ rev_result
+        COL_UP_TABLE[row] = unpack_col(row) ^ unpack_col(result)
+        COL_DOWN_TABLE[rev_row] = unpack_col(rev_row) ^ unpack_col(rev_result)
+        ROW_LEFT_GAIN[row] = gain
+        ROW_RIGHT_GAIN[rev_row] = gain
+
+        pattern = (line[0] == 0) | (line[1] == 0) << 1 | (line[2] == 0) << 2 | (line[3] == 0) << 3
+        for pos in range(SIZE):
+            ROW_EMPTY_TILES[pos][row] = empty_tiles_by_pattern[pos][pattern]
+
+    for row in range(65536):
+        ROW_MOVABLE[row] = bool(ROW_LEFT_TABLE[row] or ROW_RIGHT_TABLE[row])
+
+
+init_tables()
+
+
+def _move_up64(board: int) -> int:
+    t = transpose64(board)
+    return (
+        board
+        ^ COL_UP_TABLE[t & ROW_MASK]
+        ^ (COL_UP_TABLE[(t >> 16) & ROW_MASK] << 4)
+        ^ (COL_UP_TABLE[(t >> 32) & ROW_MASK] << 8)
+        ^ (COL_UP_TABLE[t >> 48] << 12)
+    )
+
+
+def _move_down64(board: int) -> int:
+    t = transpose64(board)
+    return (
+        board
+        ^ COL_DOWN_TABLE[t & ROW_MASK]
+        ^ (COL_DOWN_TABLE[(t >> 16) & ROW_MASK] << 4)
+        ^ (COL_DOWN_TABLE[(t >> 32) & ROW_MASK] << 8)
+        ^ (COL_DOWN_TABLE[t >> 48] << 12)
+    )
+
+
+def _move_left64(board: int) -> int:
+    return (
+        board
+        ^ ROW_LEFT_TABLE[board & ROW_MASK]
+        ^ (ROW_LEFT_TABLE[(board >> 16) & ROW_MASK] << 16)
+        ^ (ROW_LEFT_TABLE[(board >> 32) & ROW_MASK] << 32)
+        ^ (ROW_LEFT_TABLE[board >> 48] << 48)
+    )
+
+
+def _move_right64(board: int) -> int:
+    return (
+        board
+        ^ ROW_RIGHT_TABLE[board & ROW_MASK]
+        ^ (ROW_RIGHT_TABLE[(board >> 16) & ROW_MASK] << 16)
+        ^ (ROW_RIGHT_TABLE[(board >> 32) & ROW_MASK] << 32)
+        ^ (ROW_RIGHT_TABLE[board >> 48] << 48)
+    )
+
+
+MOVE64_FUNCS = {"up": _move_up64, "down": _move_down64, "left": _move_left64, "right": _move_right64}
+BOT_MOVES64 = tuple(MOVE64_FUNCS[direction] for direction in BOT_DIRECTIONS)
+
+
+def execute_move64(board: int, direction: str) -> int:
+    return MOVE64_FUNCS[direction](board)
+
+
+def move_gain64(board: int, direction: str) -> int:
+    if direction in ("up", "down"):
+        board = transpose64(board)
+    table = ROW_RIGHT_GAIN if direction in ("right", "down") else ROW_LEFT_GAIN
+    return (
+        table[board & ROW_MASK]
+        + table[(board >> 16) & ROW_MASK]
+        + table[(board >> 32) & ROW_MASK]
+        + table[board >> 48]
+    )
+
+
+def apply_move64(board: int, direction: str) -> Tuple[int, int, bool]:
+    moved_board = MOVE64_FUNCS[direction](board)
+    if moved_board == board:
+        return board, 0, False
+    return moved_board, move_gain64(board, direction), True
+
+
+def can_move64(board: int) -> bool:
+    t = transpose64(board)
+    return (
+        ROW_MOVABLE[board & ROW_MASK]
+        or ROW_MOVABLE[(board >> 16) & ROW_MASK]
+        or ROW_MOVABLE[(board >> 32) & ROW_MASK]
+        or ROW_MOVABLE[board >> 48]
+        or ROW_MOVABLE[t & ROW_MASK]
+        or ROW_MOVABLE[(t >> 16) & ROW_MASK]
+        or ROW_MOVABLE[(t >> 32) & ROW_MASK]
+        or ROW_MOVABLE[t >> 48]
+    )
+
+
+def empty_tiles64(board: int) -> Tuple[int, ...]:
+    # Spawn a 2 with board | tile and a 4 with board | (tile << 1).
+    return (
+        ROW_EMPTY_TILES[0][board & ROW_MASK]
+        + ROW_EMPTY_TILES[1][(board >> 16) & ROW_MASK]
+        + ROW_EMPTY_TILES[2][(board >> 32) & ROW_MASK]
+        + ROW_EMPTY_TILES[3][board >> 48]
+    )
+
+
 @contextmanager
 def suppress_native_stdout() -> "ctypes.CDLL":
     libc = ctypes.CDLL(None)
@@ -60,63 +464,386 @@ def suppress_native_stdout() -> "ctypes.CDLL":
         os.close(devnull_fd)
 
 
+class NativeSearchStats(ctypes.Structure):
+    """Mirror of search_stats_t in 2048-ai/2048.h."""
+
+    _fields_ = [
+        ("moves_evaled", ctypes.c_uint64),
+        ("cache_hits", ctypes.c_uint32),
+        ("cache_size", ctypes.c_uint32),
+        ("max_depth", ctypes.c_int32),
+        ("elapsed", ctypes.c_double),
+    ]
+
+
 class NneonneoEngine:
-    def __init__(self, lib_path: str):
+    def __init__(
+        self,
+        lib_path: str,
+        table_mb: int = 0,
+        replace_policy: int = NATIVE_REPLACE_DEPTH,
+        threads: int = 1,
+        symmetric: bool = False,
+        tablebase: Optional[str] = None,
+        tablebase_weight: float = NNEONNEO_TABLEBASE_WEIGHT,
+        ntuple: Optional[str] = None,
+        reserve_table: bool = True,
+    ):
+        if tablebase and ntuple:
+            # NNEONNEO_TABLEBASE_WEIGHT is tuned against the heuristic's loss penalty and
+            # would swamp a network's score-scale leaf values.
+            raise ValueError("a tablebase cannot be combined with an n-tuple network")
         self.lib = ctypes.CDLL(lib_path)
         self.lib.init_tables.argtypes = []
         self.lib.init_tables.restype = None
         self.lib.find_best_move.argtypes = [ctypes.c_uint64]
         self.lib.find_best_move.restype = ctypes.c_int
-        self.lib.init_tables()
+        # Libraries built before the batch API only have find_best_move.
+        self.has_batch = hasattr(self.lib, "find_best_moves")
+        if self.has_batch:
+            self.lib.find_best_moves.argtypes = [
+                ctypes.POINTER(ctypes.c_uint64),
+                ctypes.c_int,
+                ctypes.POINTER(ctypes.c_int),
+                ctypes.POINTER(ctypes.c_float),
+            ]
+            self.lib.find_best_moves.restype = None
+        self.has_stats = hasattr(self.lib, "find_best_move_stats")
+        if self.has_stats:
+            self.lib.find_best_move_stats.argtypes = [
+                ctypes.c_uint64,
+                ctypes.POINTER(ctypes.c_float),
+                ctypes.POINTER(NativeSearchStats),
+            ]
+            self.lib.find_best_move_stats.restype = ctypes.c_int
+        self.has_timed = hasattr(self.lib, "find_best_move_timed")
+        if self.has_timed:
+            self.lib.find_best_move_timed.argtypes = [
+                ctypes.c_uint64,
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.POINTER(ctypes.c_float),
+                ctypes.POINTER(NativeSearchStats),
+            ]
+            self.lib.find_best_move_timed.restype = ctypes.c_int
+        self.last_stats = NativeSearchStats()
+        # Row tables come from a shared read-only cache file next to the library when it supports one.
+        self.tables_mapped = False
+        if hasattr(self.lib, "init_tables_cached"):
+            self.lib.init_tables_cached.argtypes = [ctypes.c_char_p]
+            self.lib.init_tables_cached.restype = ctypes.c_int
+            self.tables_mapped = self.lib.init_tables_cached(os.fsencode(nneonneo_table_cache_path(lib_path))) == 1
+        else:
+            self.lib.init_tables()
+
+        # With table_mb, searches share one persistent native table across moves.
+        # Threaded search, symmetric keys and leaf evaluators live in the handle, so they imply one.
+        # Without reserve_table the table is only allocated by the first search.
+        self.handle: Optional[int] = None
+        self._table_reserved = True
+        self._tablebase: Optional[int] = None
+        self._ntuple: Optional[int] = None
+        if (threads != 1 or symmetric or tablebase or ntuple) and table_mb <= 0:
+            table_mb = NNEONNEO_TABLE_MB
+        if table_mb > 0 and hasattr(self.lib, "engine_create"):
+            self.lib.engine_create.argtypes = [ctypes.c_int, ctypes.c_int]
+            self.lib.engine_create.restype = ctypes.c_void_p
+            self.lib.engine_destroy.argtypes = [ctypes.c_void_p]
+            self.lib.engine_destroy.restype = None
+            self.lib.engine_clear.argtypes = [ctypes.c_void_p]
+            self.lib.engine_clear.restype = None
+            self.lib.engine_set_threads.argtypes = [ctypes.c_void_p, ctypes.c_int]
+            self.lib.engine_set_threads.restype = None
+            self.lib.engine_find_best_move.argtypes = [
+                ctypes.c_void_p,
+                ctypes.c_uint64,
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.POINTER(ctypes.c_float),
+                ctypes.POINTER(NativeSearchStats),
+            ]
+            self.lib.engine_find_best_move.restype = ctypes.c_int
+            self.handle = self.lib.engine_create(table_mb, replace_policy)
+            if not self.handle:
+                raise MemoryError("native engine could not be created")
+            self.table_mb = table_mb
+            # Libraries without engine_reserve allocate the table in engine_create.
+            if hasattr(self.lib, "engine_reserve"):
+                self.lib.engine_reserve.argtypes = [ctypes.c_void_p]
+                self.lib.engine_reserve.restype = ctypes.c_int
+                self._table_reserved = False
+                if reserve_table:
+                    self._reserve_table()
+            self.lib.engine_set_threads(self.handle, threads)
+            if symmetric and hasattr(self.lib, "engine_set_symmetry"):
+                self.lib.engine_set_symmetry.argtypes = [ctypes.c_void_p, ctypes.c_int]
+                self.lib.engine_set_symmetry.restype = None
+                self.lib.engine_set_symmetry(self.handle, 1)
+            if tablebase:
+                self._open_tablebase(tablebase, tablebase_weight)
+            if ntuple:
+                self._open_ntuple(ntuple)
+
+    def _reserve_table(self) -> None:
+        if not self.lib.engine_reserve(self.handle):
+            self.close()
+            raise MemoryError(f"native engine could not allocate a {self.table_mb} MiB table")
+        self._table_reserved = True
+
+    def _open_tablebase(self, path: str, weight: float) -> None:
+        if not hasattr(self.lib, "engine_set_tablebase"):
+            self.close()
+            raise RuntimeError("native library has no tablebase support; rebuild 2048-ai")
+        self.lib.tablebase_open.argtypes = [ctypes.c_char_p]
+        self.lib.tablebase_open.restype = ctypes.c_void_p
+        self.lib.tablebase_close.argtypes = [ctypes.c_void_p]
+        self.lib.tablebase_close.restype = None
+        self.lib.tablebase_probe.argtypes = [ctypes.c_void_p, ctypes.c_uint64]
+        self.lib.tablebase_probe.restype = ctypes.c_float
+        self.lib.engine_set_tablebase.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_float]
+        self.lib.engine_set_tablebase.restype = None
+        self._tablebase = self.lib.tablebase_open(os.fsencode(path))
+        if not self._tablebase:
+            self.close()
+            raise RuntimeError(f"{path} is not a finished endgame tablebase")
+        self.lib.engine_set_tablebase(self.handle, self._tablebase, weight)
+
+    def _open_ntuple(self, path: str) -> None:
+        if not hasattr(self.lib, "engine_set_ntuple"):
+            self.close()
+            raise RuntimeError("native library has no n-tuple network support; rebuild 2048-ai")
+        self.lib.ntuple_open.argtypes = [ctypes.c_char_p]
+        self.lib.ntuple_open.restype = ctypes.c_void_p
+        self.lib.ntuple_close.argtypes = [ctypes.c_void_p]
+        self.lib.ntuple_close.restype = None
+        self.lib.ntuple_evaluate.argtypes = [ctypes.c_void_p, ctypes.c_uint64]
+        self.lib.ntuple_evaluate.restype = ctypes.c_float
+        self.lib.engine_set_ntuple.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        self.lib.engine_set_ntuple.restype = None
+        self._ntuple = self.lib.ntuple_open(os.fsencode(path))
+        if not self._ntuple:
+            self.close()
+            raise RuntimeError(f"{path} is not an n-tuple network")
+        self.lib.engine_set_ntuple(self.handle, self._ntuple)
+
+    def ntuple_evaluate(self, packed: int) -> Optional[float]:
+        """Native n-tuple network value of a board; None without a network."""
+        if self._ntuple is None:
+            return None
+        return self.lib.ntuple_evaluate(self._ntuple, packed)
 
-    def choose_move(self, board: Board) -> Optional[str]:
-        packed = board_to_nibble64(board)
-        with suppress_native_stdout():
-            move = self.lib.find_best_move(ctypes.c_uint64(packed))
-        return NNEONNEO_MOVE_TO_DIR.get(move)
+    def tablebase_probe(self, packed: int) -> Optional[float]:
+        """Native tablebase success chance with the player to move; None outside the tablebase."""
+        if self._tablebase is None:
+            return None
+        value = self.lib.tablebase_probe(self._tablebase, packed)
+        return None if value < 0 else value
 
+    def close(self) -> None:
+        if self.handle is not None:
+            self.lib.engine_destroy(self.handle)
+            self.handle = None
+        if self._tablebase is not None:
+            self.lib.tablebase_close(self._tablebase)
+            self._tablebase = None
+        if self._ntuple is not None:
+            self.lib.ntuple_close(self._ntuple)
+            self._ntuple = None
+
+    def new_game(self) -> None:
+        if self.handle is not None:
+            self.lib.engine_clear(self.handle)
+
+    def choose_move(self, board: Board, stats: Optional[SearchStats] = None) -> Optional[str]:
+        move = self.best_move(board_to_nibble64(board))
+        if stats is not None and self.has_stats:
+            stats.nodes = self.last_stats.moves_evaled
+            stats.depth = self.last_stats.max_depth
+            stats.elapsed = self.last_stats.elapsed
+        return NNEONNEO_MOVE_TO_DIR.get(move)
 
-def _nneonneo_worker(conn, lib_path: str) -> None:
+    def best_move(self, packed: int, budget: Optional[float] = None, max_depth: int = 0) -> int:
+        """Native move code for one packed board; last_stats holds its telemetry when supported.
+
+        With a budget (seconds) the library deepens iteratively up to max_depth (0: its
+        usual depth) and returns the deepest completed answer inside the budget.
+        """
+        if self.handle is not None:
+            if not self._table_reserved:
+                self._reserve_table()
+            budget_ms = max(1, int(budget * 1000)) if budget is not None else 0
+            return self.lib.engine_find_best_move(
+                self.handle, packed, budget_ms, max_depth, None, ctypes.byref(self.last_stats)
+            )
+        if budget is not None and self.has_timed:
+            budget_ms = max(1, int(budget * 1000))
+            return self.lib.find_best_move_timed(packed, budget_ms, max_depth, None, ctypes.byref(self.last_stats))
+        if self.has_stats:
+            return self.lib.find_best_move_stats(packed, None, ctypes.byref(self.last_stats))
+        with suppress_native_stdout():
+            return self.lib.find_best_move(ctypes.c_uint64(packed))
+
+    def choose_moves(self, boards: Sequence[Board]) -> List[Optional[str]]:
+        moves, _ = self.find_best_moves([board_to_nibble64(board) for board in boards])
+        return [NNEONNEO_MOVE_TO_DIR.get(move) for move in moves]
+
+    def find_best_moves(self, packed_boards, with_scores: bool = False) -> Tuple[List[int], Optional[List[float]]]:
+        """Search many packed boards in one native call.
+
+        packed_boards is a sequence of ints or any buffer of native uint64 (array("Q"),
+        a NumPy uint64 array); a writable buffer is passed to the library without a
+        copy. Returns native move codes (-1 when no move is legal) and,
+        with_scores, a flat list of four scores per board in up/down/left/right order.
+        """
+        count = len(packed_boards)
+        if not self.has_batch:
+            with suppress_native_stdout():
+                return [self.lib.find_best_move(ctypes.c_uint64(int(packed))) for packed in packed_boards], None
+        try:
+            view = memoryview(packed_boards)
+        except TypeError:
+            boards = (ctypes.c_uint64 * count)(*packed_boards)
+        else:
+            if view.format not in NATIVE_U64_FORMATS or view.itemsize != ctypes.sizeof(ctypes.c_uint64):
+                raise ValueError(f"packed_boards buffer must hold native uint64, not {view.format!r}")
+            if not view.c_contiguous:
+                raise ValueError("packed_boards buffer must be contiguous")
+            count = view.nbytes // view.itemsize
+            board_array = ctypes.c_uint64 * count
+            boards = board_array.from_buffer_copy(view) if view.readonly else board_array.from_buffer(view)
+        moves = (ctypes.c_int * count)()
+        scores = (ctypes.c_float * (4 * count))() if with_scores else None
+        self.lib.find_best_moves(boards, count, moves, scores)
+        return list(moves), list(scores) if scores is not None else None
+
+
+def encode_nneonneo_reply(request_id: int, move: int) -> bytes:
+    return NNEONNEO_REPLY.pack(NNEONNEO_REPLY_TAG, request_id, move)
+
+
+def encode_nneonneo_error(message: str, request_id: int = 0) -> bytes:
+    return NNEONNEO_ERROR.pack(NNEONNEO_ERROR_TAG, request_id) + message.encode("utf-8")
+
+
+class NneonneoRequestError(RuntimeError):
+    """A worker's error frame; request_id is the request that failed (0 during startup)."""
+
+    def __init__(self, request_id: int, message: str):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def decode_nneonneo_reply(frame: bytes) -> Tuple[int, int]:
+    """(request id, native move) from a worker reply frame.
+
+    Error frames raise NneonneoRequestError; anything else raises RuntimeError.
+    """
+    tag = frame[:1]
+    if tag == NNEONNEO_REPLY_TAG and len(frame) == NNEONNEO_REPLY.size:
+        _, request_id, move = NNEONNEO_REPLY.unpack(frame)
+        return request_id, move
+    if tag == NNEONNEO_ERROR_TAG and len(frame) >= NNEONNEO_ERROR.size:
+        _, request_id = NNEONNEO_ERROR.unpack_from(frame)
+        message = frame[NNEONNEO_ERROR.size :].decode("utf-8", "replace")
+        raise NneonneoRequestError(request_id, message or "nneonneo worker returned an error")
+    raise RuntimeError(f"malformed nneonneo worker frame of {len(frame)} bytes")
+
+
+def _nneonneo_worker(
+    conn,
+    lib_path: str,
+    threads: int = 1,
+    symmetric: bool = False,
+    tablebase: Optional[str] = None,
+    ntuple: Optional[str] = None,
+) -> None:
+    """Serve NNEONNEO_REQUEST frames until an empty frame (or EOF) arrives.
+
+    Requests are read as soon as they arrive and answered in priority order, not
+    arrival order: timed requests first, then untimed ones, each in arrival order.
+    A request's budget bounds its own search and starts when that search does. A
+    failed search is answered with an error frame for its request id, and the worker
+    goes on serving; only a broken pipe stops it.
+    """
     try:
-        engine = NneonneoEngine(lib_path)
-        conn.send(("ready", ""))
+        engine = NneonneoEngine(
+            lib_path,
+            table_mb=NNEONNEO_TABLE_MB,
+            threads=threads,
+            symmetric=symmetric,
+            tablebase=tablebase,
+            ntuple=ntuple,
+            # Idle spares should not hold a zeroed table; the first request allocates it.
+            reserve_table=False,
+        )
+        conn.send_bytes(b"")
     except Exception as exc:
         try:
-            conn.send(("error", str(exc)))
+            conn.send_bytes(encode_nneonneo_error(str(exc) or "nneonneo worker failed to start"))
         finally:
             conn.close()
         return
 
+    pending: List[Tuple[bool, int, int, int, float]] = []
+    received = 0
     while True:
         try:
-            command, payload = conn.recv()
+            while not pending or conn.poll(0):
+                frame = conn.recv_bytes()
+                if not frame:
+                    conn.close()
+                    return
+                request_id, packed, budget = NNEONNEO_REQUEST.unpack(frame)
+                heapq.heappush(pending, (budget <= 0, received, request_id, packed, budget))
+                received += 1
         except (EOFError, OSError):
             break
 
-        if command == "stop":
-            break
-        if command != "move":
-            continue
-
+        untimed, _, request_id, packed, budget = heapq.heappop(pending)
         try:
-            with suppress_native_stdout():
-                move = engine.lib.find_best_move(ctypes.c_uint64(payload))
-            conn.send(("move", int(move)))
+            frame = encode_nneonneo_reply(request_id, engine.best_move(packed, None if untimed else budget))
         except Exception as exc:
-            try:
-                conn.send(("error", str(exc)))
-            finally:
-                break
+            frame = encode_nneonneo_error(str(exc) or "nneonneo search failed", request_id)
+        try:
+            conn.send_bytes(frame)
+        except OSError:
+            break
 
     conn.close()
 
 
 class TimedNneonneoEngine:
-    def __init__(self, lib_path: str, move_timeout: float):
+    """Native search in a worker process, so a stuck search can be killed at the move deadline.
+
+    Up to `spares` extra workers are started ahead of time and load the library
+    while idle. When the active worker has to be dropped, the next move adopts a
+    ready spare (`spare_hits`) instead of starting a process and waiting for
+    init_tables (`cold_starts`), and a replacement spare starts in the background.
+    """
+
+    def __init__(
+        self,
+        lib_path: str,
+        move_timeout: float,
+        threads: int = 1,
+        spares: int = NNEONNEO_SPARE_WORKERS,
+        symmetric: bool = False,
+        tablebase: Optional[str] = None,
+        ntuple: Optional[str] = None,
+    ):
         self.lib_path = lib_path
+        self.threads = threads
+        self.symmetric = symmetric
+        self.tablebase = tablebase
+        self.ntuple = ntuple
         self.move_timeout = max(0.05, move_timeout)
+        self.spares = max(0, spares)
         self._process: Optional[mp.Process] = None
         self._conn = None
+        self._spare_workers: List[Tuple[mp.Process, object]] = []
+        self._next_id = 0
+        self.spare_hits = 0
+        self.cold_starts = 0
         self.last_error: Optional[str] = None
 
     @staticmethod
@@ -132,6 +859,14 @@ class TimedNneonneoEngine:
         except (ValueError, OSError):
             pass
 
+    @classmethod
+    def _discard(cls, process: mp.Process, conn) -> None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+        cls._stop_process(process)
+
     def _clear_worker(self) -> None:
         if self._conn is not None:
             try:
@@ -144,52 +879,87 @@ class TimedNneonneoEngine:
             self._process = None
 
     def close(self) -> None:
-        if self._conn is not None:
-            try:
-                self._conn.send(("stop", 0))
-            except OSError:
-                pass
+        for conn in [self._conn] + [conn for _, conn in self._spare_workers]:
+            if conn is not None:
+                try:
+                    conn.send_bytes(b"")
+                except OSError:
+                    pass
+        for process, conn in self._spare_workers:
+            self._discard(process, conn)
+        self._spare_workers = []
         self._clear_worker()
 
-    def _ensure_worker(self, startup_timeout: Optional[float] = None) -> bool:
-        if self._conn is not None and self._process is not None and self._process.is_alive():
-            return True
-
-        self._clear_worker()
+    def _start_process(self) -> Tuple[mp.Process, object]:
         parent_conn, child_conn = mp.Pipe(duplex=True)
-        process = mp.Process(target=_nneonneo_worker, args=(child_conn, self.lib_path), daemon=True)
+        process = mp.Process(
+            target=_nneonneo_worker,
+            args=(child_conn, self.lib_path, self.threads, self.symmetric, self.tablebase, self.ntuple),
+            daemon=True,
+        )
         process.start()
         child_conn.close()
+        return process, parent_conn
 
-        wait_startup = NNEONNEO_STARTUP_TIMEOUT if startup_timeout is None else max(0.05, startup_timeout)
-        if not parent_conn.poll(wait_startup):
-            self.last_error = "nneonneo worker startup timed out"
-            try:
-                parent_conn.close()
-            except OSError:
-                pass
-            self._stop_process(process)
-            return False
+    def _replenish(self) -> None:
+        """Start spares up to `spares`; they finish loading while the active worker searches."""
+        while len(self._spare_workers) < self.spares:
+            self._spare_workers.append(self._start_process())
 
+    def _adopt(self, process: mp.Process, conn, wait_startup: float) -> Optional[bool]:
+        """Make a starting worker the active one once ready: True, False if it failed, None if still loading."""
+        if not conn.poll(wait_startup):
+            return None
         try:
-            kind, payload = parent_conn.recv()
+            frame = conn.recv_bytes()
         except (EOFError, OSError):
-            kind, payload = "error", "nneonneo worker exited during startup"
-
-        if kind != "ready":
-            self.last_error = str(payload) if payload else "failed to initialize nneonneo worker"
+            frame = encode_nneonneo_error("nneonneo worker exited during startup")
+        if frame:
             try:
-                parent_conn.close()
-            except OSError:
-                pass
-            self._stop_process(process)
+                decode_nneonneo_reply(frame)
+                self.last_error = "nneonneo worker replied before it was ready"
+            except RuntimeError as exc:
+                self.last_error = str(exc)
+            self._discard(process, conn)
             return False
-
-        self._conn = parent_conn
+        self._conn = conn
         self._process = process
         self.last_error = None
         return True
 
+    def _ensure_worker(self, startup_timeout: Optional[float] = None) -> bool:
+        if self._conn is not None and self._process is not None and self._process.is_alive():
+            return True
+
+        self._clear_worker()
+        wait_startup = NNEONNEO_STARTUP_TIMEOUT if startup_timeout is None else max(0.05, startup_timeout)
+        # A move only glances at spares, so one still loading costs it no more than NNEONNEO_SPARE_POLL.
+        wait_spare = wait_startup if startup_timeout is None else min(wait_startup, NNEONNEO_SPARE_POLL)
+        deadline = time.monotonic() + wait_spare
+        while self._spare_workers:
+            process, conn = self._spare_workers.pop(0)
+            adopted = self._adopt(process, conn, max(0.0, deadline - time.monotonic()))
+            if adopted:
+                self.spare_hits += 1
+                self._replenish()
+                return True
+            if adopted is None:
+                # Still loading: keep it for the next move rather than paying for a new process.
+                self._spare_workers.insert(0, (process, conn))
+                self.last_error = "nneonneo spare worker still starting"
+                return False
+
+        self.cold_starts += 1
+        process, conn = self._start_process()
+        adopted = self._adopt(process, conn, wait_startup)
+        if adopted is None:
+            self.last_error = "nneonneo worker startup timed out"
+            self._discard(process, conn)
+            return False
+        if adopted:
+            self._replenish()
+        return adopted
+
     def warmup(self) -> bool:
         return self._ensure_worker()
 
@@ -206,42 +976,573 @@ class TimedNneonneoEngine:
         if remaining <= 0:
             self.last_error = f"nneonneo timed out after {total_budget:.2f}s"
             return None
-        wait_seconds = max(0.05, remaining)
+        # The native search stops itself inside the budget; the kill below is a last resort.
+        search_budget = max(0.001, remaining - NNEONNEO_IPC_MARGIN)
+        wait_seconds = max(0.05, remaining + NNEONNEO_IPC_MARGIN)
+        request_id = self._send_request(packed, search_budget)
+        if request_id is None:
+            return None
 
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            reply = self._read_reply(deadline - time.monotonic())
+            if reply is None:
+                return None
+            if reply[0] == request_id:
+                return NNEONNEO_MOVE_TO_DIR.get(reply[1])
+
+    def choose_moves(self, boards: Sequence[Board], budget: Optional[float] = None) -> List[Optional[str]]:
+        """Pipeline many boards through the worker; budget (seconds) bounds each search, None is untimed.
+
+        Up to NNEONNEO_PIPELINE_DEPTH requests are in flight at once and replies are
+        matched by request id. Boards the worker could not answer come back as None.
+        """
+        results: List[Optional[str]] = [None] * len(boards)
+        if not boards or not self._ensure_worker():
+            return results
+        search_budget = 0.0 if budget is None else max(0.001, budget)
+        # Replies come one search apart, so each is awaited for one budget plus the margin.
+        wait_seconds = None if budget is None else max(0.05, search_budget + NNEONNEO_IPC_MARGIN)
+        in_flight: Dict[int, int] = {}
+        next_board = 0
+        while next_board < len(boards) or in_flight:
+            while next_board < len(boards) and len(in_flight) < NNEONNEO_PIPELINE_DEPTH:
+                request_id = self._send_request(board_to_nibble64(boards[next_board]), search_budget)
+                if request_id is None:
+                    return results
+                in_flight[request_id] = next_board
+                next_board += 1
+            reply = self._read_reply(wait_seconds)
+            if reply is None:
+                return results
+            index = in_flight.pop(reply[0], None)
+            if index is not None:
+                results[index] = NNEONNEO_MOVE_TO_DIR.get(reply[1])
+        return results
+
+    def _send_request(self, packed: int, budget: float) -> Optional[int]:
+        request_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
         try:
-            self._conn.send(("move", packed))
+            self._conn.send_bytes(NNEONNEO_REQUEST.pack(request_id, packed, budget))
         except OSError:
             self.last_error = "nneonneo worker send failed"
             self._clear_worker()
             return None
+        return request_id
 
-        if not self._conn.poll(wait_seconds):
+    def _read_reply(self, wait_seconds: Optional[float]) -> Optional[Tuple[int, int]]:
+        """Next (request id, move) from the worker; None after a timeout or failure, which drops the worker."""
+        if wait_seconds is not None and not self._conn.poll(max(0.0, wait_seconds)):
             self.last_error = f"nneonneo timed out after {wait_seconds:.2f}s"
             self._clear_worker()
             return None
-
         try:
-            kind, payload = self._conn.recv()
+            return decode_nneonneo_reply(self._conn.recv_bytes())
         except (EOFError, OSError):
             self.last_error = "nneonneo worker disconnected"
-            self._clear_worker()
+        except NneonneoRequestError as exc:
+            # One failed search; the worker keeps serving, and the request has no move.
+            self.last_error = str(exc)
+            return exc.request_id, -1
+        except RuntimeError as exc:
+            self.last_error = str(exc)
+        self._clear_worker()
+        return None
+
+
+class _AsyncWorker:
+    """One worker process of an AsyncNneonneoEngine and the request it is serving."""
+
+    __slots__ = ("process", "conn", "ready", "request", "request_id", "expiry")
+
+    def __init__(self, process: mp.Process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.request: Optional["_AsyncRequest"] = None
+        self.request_id = 0
+        self.expiry: Optional[asyncio.TimerHandle] = None
+
+
+class _AsyncRequest:
+    __slots__ = ("packed", "deadline", "future", "expiry")
+
+    def __init__(self, packed: int, deadline: float, future: "asyncio.Future[Optional[str]]"):
+        self.packed = packed
+        self.deadline = deadline
+        self.future = future
+        self.expiry: Optional[asyncio.TimerHandle] = None
+
+
+class AsyncNneonneoEngine:
+    """Asyncio front end that multiplexes move requests over `workers` native worker processes.
+
+    Each worker runs one search at a time; waiting requests queue in arrival order.
+    Pipes are watched with loop.add_reader, so no thread blocks on a worker. Every
+    request has its own deadline: the native search is given the time left when a
+    worker picks it up, and a worker that overruns the deadline by the IPC margin is
+    killed and respawned. Cancelling a request drops it from the queue, or lets its
+    worker finish and discards the answer.
+    """
+
+    def __init__(
+        self, lib_path: str, workers: int = 2, move_timeout: float = AUTO_MOVE_MAX_THINK_TIME, threads: int = 1
+    ):
+        self.lib_path = lib_path
+        self.threads = threads
+        self.move_timeout = max(0.05, move_timeout)
+        self.size = max(1, workers)
+        self.last_error: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[_AsyncWorker] = []
+        self._pending: "deque[_AsyncRequest]" = deque()
+        self._next_id = 0
+        self._closed = False
+
+    async def start(self, startup_timeout: float = NNEONNEO_STARTUP_TIMEOUT) -> bool:
+        """Spawn the workers and wait until all have loaded the library.
+
+        On failure every worker is stopped again, so the next start begins from scratch.
+        A closed engine cannot be started again and raises RuntimeError.
+        """
+        if self._closed:
+            raise RuntimeError("engine is closed")
+        self._loop = asyncio.get_running_loop()
+        while len(self._workers) < self.size:
+            self._spawn_worker()
+        deadline = self._loop.time() + startup_timeout
+        while len(self._workers) < self.size or not all(worker.ready for worker in self._workers):
+            if len(self._workers) < self.size or self._loop.time() >= deadline:
+                self.last_error = self.last_error or "nneonneo worker startup timed out"
+                for worker in list(self._workers):
+                    self._drop_worker(worker)
+                self._loop = None
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    def _spawn_worker(self) -> _AsyncWorker:
+        parent_conn, child_conn = mp.Pipe(duplex=True)
+        process = mp.Process(target=_nneonneo_worker, args=(child_conn, self.lib_path, self.threads), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _AsyncWorker(process, parent_conn)
+        self._workers.append(worker)
+        self._loop.add_reader(parent_conn.fileno(), self._on_readable, worker)
+        return worker
+
+    def _retire_worker(self, worker: _AsyncWorker, error: str) -> None:
+        """Stop a broken or overrunning worker, fail its request and start a replacement."""
+        self.last_error = error
+        if worker.expiry is not None:
+            worker.expiry.cancel()
+        self._finish(worker.request, None)
+        worker.request = None
+        self._drop_worker(worker)
+        # A worker that never became ready is not replaced, so a broken library cannot respawn forever.
+        if worker.ready and not self._closed:
+            self._spawn_worker()
+
+    def _drop_worker(self, worker: _AsyncWorker) -> None:
+        try:
+            self._loop.remove_reader(worker.conn.fileno())
+        except (OSError, ValueError):
+            pass
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+        TimedNneonneoEngine._stop_process(worker.process)
+        self._workers.remove(worker)
+
+    @staticmethod
+    def _finish(request: Optional[_AsyncRequest], move: Optional[str]) -> None:
+        if request is None:
+            return
+        if request.expiry is not None:
+            request.expiry.cancel()
+        if not request.future.done():
+            request.future.set_result(move)
+
+    def _on_readable(self, worker: _AsyncWorker) -> None:
+        try:
+            frame = worker.conn.recv_bytes()
+            reply = decode_nneonneo_reply(frame) if frame else None
+        except (EOFError, OSError):
+            self._retire_worker(worker, "nneonneo worker disconnected")
+            return
+        except NneonneoRequestError as exc:
+            if not worker.ready:
+                self._retire_worker(worker, str(exc))
+                return
+            # One failed search; the worker keeps serving, and the request has no move.
+            self.last_error = str(exc)
+            reply = (exc.request_id, -1)
+        except RuntimeError as exc:
+            self._retire_worker(worker, str(exc))
+            return
+
+        if reply is None:
+            worker.ready = True
+        elif worker.request is not None and reply[0] == worker.request_id:
+            if worker.expiry is not None:
+                worker.expiry.cancel()
+                worker.expiry = None
+            self._finish(worker.request, NNEONNEO_MOVE_TO_DIR.get(reply[1]))
+            worker.request = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        idle = [worker for worker in self._workers if worker.ready and worker.request is None]
+        while idle and self._pending:
+            request = self._pending.popleft()
+            if request.future.done():
+                continue
+            remaining = request.deadline - self._loop.time()
+            if remaining <= NNEONNEO_IPC_MARGIN:
+                self.last_error = "nneonneo request expired in queue"
+                self._finish(request, None)
+                continue
+            worker = idle.pop()
+            request_id = self._next_id
+            self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+            frame = NNEONNEO_REQUEST.pack(request_id, request.packed, max(0.001, remaining - NNEONNEO_IPC_MARGIN))
+            try:
+                worker.conn.send_bytes(frame)
+            except OSError:
+                self._pending.appendleft(request)
+                self._retire_worker(worker, "nneonneo worker send failed")
+                continue
+            worker.request = request
+            worker.request_id = request_id
+            # The native search stops itself inside the budget; this kill is a last resort.
+            worker.expiry = self._loop.call_at(
+                request.deadline + NNEONNEO_IPC_MARGIN,
+                self._retire_worker,
+                worker,
+                f"nneonneo timed out after {remaining:.2f}s",
+            )
+
+    def _expire(self, request: _AsyncRequest) -> None:
+        # Only queued requests expire here; a running one is bounded by its worker's timer.
+        if request in self._pending:
+            self._pending.remove(request)
+            self.last_error = "nneonneo request expired in queue"
+            self._finish(request, None)
+
+    async def choose_move(self, board: Union[Board, int], timeout: Optional[float] = None) -> Optional[str]:
+        """Search a board (or packed board); resolves to a direction, or None on timeout or failure.
+
+        Starts the workers on first use and raises RuntimeError if they cannot start or
+        the engine is closed.
+        """
+        if self._closed:
+            raise RuntimeError("engine is closed")
+        if self._loop is None:
+            if not await self.start():
+                raise RuntimeError(self.last_error or "failed to start nneonneo workers")
+        packed = board if isinstance(board, int) else board_to_nibble64(board)
+        budget = max(0.05, self.move_timeout if timeout is None else timeout)
+        request = _AsyncRequest(packed, self._loop.time() + budget, self._loop.create_future())
+        request.expiry = self._loop.call_at(request.deadline, self._expire, request)
+        self._pending.append(request)
+        self._dispatch()
+        try:
+            return await request.future
+        except asyncio.CancelledError:
+            if request.expiry is not None:
+                request.expiry.cancel()
+            if request in self._pending:
+                self._pending.remove(request)
+            raise
+
+    async def close(self) -> None:
+        self._closed = True
+        for request in self._pending:
+            self._finish(request, None)
+        self._pending.clear()
+        for worker in list(self._workers):
+            try:
+                worker.conn.send_bytes(b"")
+            except OSError:
+                pass
+            self._retire_worker(worker, "nneonneo engine closed")
+        self._loop = None
+
+    async def __aenter__(self) -> "AsyncNneonneoEngine":
+        if not await self.start():
+            error = self.last_error or "failed to start nneonneo workers"
+            await self.close()
+            raise RuntimeError(error)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class NneonneoEnginePool:
+    """Native search contexts shared by many Python threads in one process.
+
+    Owns `handles` engine handles, each with its own persistent table, and a thread
+    pool of the same size. A request checks out a free handle for the duration of
+    one native call; ctypes drops the GIL during the call, so up to `handles`
+    searches run at once. Handles share the loaded library, whose row tables are
+    set up once per process and only read after that, so engines may be created
+    while pool threads search.
+    """
+
+    def __init__(
+        self,
+        lib_path: str,
+        handles: int,
+        table_mb: int = NNEONNEO_TABLE_MB,
+        replace_policy: int = NATIVE_REPLACE_DEPTH,
+        threads_per_handle: int = 1,
+    ):
+        self.handles: List[NneonneoEngine] = []
+        self._free: "queue.SimpleQueue[NneonneoEngine]" = queue.SimpleQueue()
+        try:
+            # All handles are built before any search starts.
+            for _ in range(max(1, handles)):
+                handle = NneonneoEngine(
+                    lib_path, table_mb=max(1, table_mb), replace_policy=replace_policy, threads=threads_per_handle
+                )
+                if handle.handle is None:
+                    raise RuntimeError(f"{lib_path} has no engine handle API; rebuild 2048-ai")
+                self.handles.append(handle)
+                self._free.put(handle)
+        except Exception:
+            self._destroy_handles()
+            raise
+        self._executor = ThreadPoolExecutor(max_workers=len(self.handles), thread_name_prefix="nneonneo")
+
+    def _destroy_handles(self) -> None:
+        for handle in self.handles:
+            handle.close()
+        self.handles = []
+
+    def _search(self, packed: int, budget: Optional[float], stats: Optional[SearchStats]) -> Optional[str]:
+        handle = self._free.get()
+        try:
+            move = handle.best_move(packed, budget)
+            if stats is not None:
+                stats.nodes = handle.last_stats.moves_evaled
+                stats.depth = handle.last_stats.max_depth
+                stats.elapsed = handle.last_stats.elapsed
+        finally:
+            self._free.put(handle)
+        return NNEONNEO_MOVE_TO_DIR.get(move)
+
+    def submit(
+        self, board: Union[Board, int], budget: Optional[float] = None, stats: Optional[SearchStats] = None
+    ) -> "Future[Optional[str]]":
+        """Queue a search of a board (or packed board); the future resolves to a direction or None."""
+        packed = board if isinstance(board, int) else board_to_nibble64(board)
+        return self._executor.submit(self._search, packed, budget, stats)
+
+    def choose_move(self, board: Board, budget: Optional[float] = None) -> Optional[str]:
+        return self.submit(board, budget).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._destroy_handles()
+
+    def __enter__(self) -> "NneonneoEnginePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class OpeningBook:
+    """Precomputed best moves for early positions, built by book_2048.py.
+
+    The file is a BOOK_HEADER, then `count` sorted uint64 canonical boards (over the
+    first `symmetries` symmetries), then one native move code per board for its
+    canonical orientation, all little-endian. It is mmapped and binary-searched in
+    place, so opening a book parses nothing but the header.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, symmetries, _ = BOOK_HEADER.unpack_from(self._mmap)
+            if magic != BOOK_MAGIC or version != BOOK_VERSION:
+                raise ValueError(f"{path} is not a version {BOOK_VERSION} opening book")
+            if len(self._mmap) != BOOK_HEADER.size + 9 * count or not 1 <= symmetries <= SYMMETRY_COUNT:
+                raise ValueError(f"{path} is truncated or corrupt")
+            if sys.byteorder != "little":
+                raise ValueError("opening books can only be read on little-endian machines")
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+        self.symmetries = symmetries
+        view = memoryview(self._mmap)
+        self._keys = view[BOOK_HEADER.size : BOOK_HEADER.size + 8 * count].cast("Q")
+        self._moves = view[BOOK_HEADER.size + 8 * count :]
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup_packed(self, packed: int) -> Optional[str]:
+        self.lookups += 1
+        canonical, symmetry = canonical_board64(packed, self.symmetries)
+        index = bisect.bisect_left(self._keys, canonical)
+        if index == len(self._keys) or self._keys[index] != canonical:
+            return None
+        direction = NNEONNEO_MOVE_TO_DIR.get(self._moves[index])
+        if direction is None:
             return None
+        self.hits += 1
+        return inverse_symmetry_direction(symmetry, direction)
 
-        if kind == "move":
-            return NNEONNEO_MOVE_TO_DIR.get(int(payload))
+    def lookup(self, board: Board) -> Optional[str]:
+        return self.lookup_packed(board_to_nibble64(board))
 
-        self.last_error = str(payload) if payload else "nneonneo worker returned an error"
-        self._clear_worker()
-        return None
+    def close(self) -> None:
+        self._keys.release()
+        self._moves.release()
+        self._mmap.close()
+
+
+def ntuple_runs(cells: Sequence[int]) -> Tuple[Tuple[int, int], ...]:
+    """(shift, mask) runs of adjacent ascending cells: a tuple's index is OR of (board >> shift) & mask."""
+    runs = []
+    start = 0
+    for end in range(1, len(cells) + 1):
+        if end == len(cells) or cells[end] != cells[end - 1] + 1:
+            width = 4 * (end - start)
+            runs.append((4 * (cells[start] - start), ((1 << width) - 1) << (4 * start)))
+            start = end
+    return tuple(runs)
+
+
+class NTupleNetwork:
+    """n-tuple network value function for after-move boards, trained by ntuple_2048.py.
+
+    Each tuple is a set of cells whose ranks, read straight from the packed board,
+    index that tuple's weight table. A board's value is the sum of every tuple's weight
+    over the 8 symmetric images of the board, so the 8 orientations of a tuple share one
+    table and the value is symmetry-invariant. Cells are stored ascending, so an index
+    is a few shifted and masked runs of adjacent nibbles. The weights stay in the
+    mmapped file; `writable` maps it shared for in-place training.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        with open(path, "r+b" if writable else "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        try:
+            magic, version, count, _ = NTUPLE_HEADER.unpack_from(self._mmap)
+            if magic != NTUPLE_MAGIC or version != NTUPLE_VERSION:
+                raise ValueError(f"{path} is not a version {NTUPLE_VERSION} n-tuple network")
+            if not 0 < count <= (NTUPLE_OFFSET - NTUPLE_HEADER.size) // NTUPLE_TUPLE.size:
+                raise ValueError(f"{path} has a bad tuple count")
+            shapes = []
+            for index in range(count):
+                size, cells = NTUPLE_TUPLE.unpack_from(self._mmap, NTUPLE_HEADER.size + index * NTUPLE_TUPLE.size)
+                shape = tuple(cells[:size])
+                if not 0 < size <= NTUPLE_MAX_CELLS or list(shape) != sorted(set(shape)) or shape[-1] >= 16:
+                    raise ValueError(f"{path} has a bad tuple {list(shape)}")
+                shapes.append(shape)
+            if len(self._mmap) != NTUPLE_OFFSET + 4 * sum(16 ** len(shape) for shape in shapes):
+                raise ValueError(f"{path} is truncated")
+            if sys.byteorder != "little":
+                raise ValueError("n-tuple networks can only be read on little-endian machines")
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+        self.shapes = tuple(shapes)
+        self._view = memoryview(self._mmap)
+        self._tables: List[memoryview] = []
+        offset = NTUPLE_OFFSET
+        for shape in shapes:
+            size = 4 * 16 ** len(shape)
+            self._tables.append(self._view[offset : offset + size].cast("f"))
+            offset += size
+        self._features = tuple(zip(self._tables, (ntuple_runs(shape) for shape in shapes)))
+        self._update_scale = 1.0 / (SYMMETRY_COUNT * len(shapes))
+
+    @classmethod
+    def create(cls, path: str, shapes: Sequence[Sequence[int]]) -> "NTupleNetwork":
+        """Write an all-zero network and open it for training."""
+        with open(path, "wb") as out:
+            out.write(NTUPLE_HEADER.pack(NTUPLE_MAGIC, NTUPLE_VERSION, len(shapes), 0))
+            for shape in shapes:
+                cells = sorted(shape)
+                out.write(NTUPLE_TUPLE.pack(len(cells), bytes(cells)))
+            out.truncate(NTUPLE_OFFSET + 4 * sum(16 ** len(shape) for shape in shapes))
+        return cls(path, writable=True)
+
+    @property
+    def games(self) -> int:
+        """Self-play games trained into the weights so far."""
+        return NTUPLE_HEADER.unpack_from(self._mmap)[3]
+
+    def set_games(self, games: int) -> None:
+        NTUPLE_HEADER.pack_into(self._mmap, 0, NTUPLE_MAGIC, NTUPLE_VERSION, len(self.shapes), games)
+
+    def evaluate(self, board: int) -> float:
+        total = 0.0
+        for image in symmetry_images64(board):
+            for weights, runs in self._features:
+                index = 0
+                for shift, mask in runs:
+                    index |= (image >> shift) & mask
+                total += weights[index]
+        return total
+
+    def update(self, board: int, delta: float) -> None:
+        """Move evaluate(board) by about delta, spread evenly over its weights."""
+        step = delta * self._update_scale
+        for image in symmetry_images64(board):
+            for weights, runs in self._features:
+                index = 0
+                for shift, mask in runs:
+                    index |= (image >> shift) & mask
+                weights[index] += step
+
+    def flush(self) -> None:
+        self._mmap.flush()
+
+    def close(self) -> None:
+        for table in self._tables:
+            table.release()
+        self._view.release()
+        self._mmap.close()
 
 
-def load_nneonneo_engine(move_timeout: float) -> Tuple[Optional[TimedNneonneoEngine], Optional[str]]:
+def nneonneo_lib_path() -> str:
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    lib_path = os.path.join(base_dir, "2048-ai", "bin", "2048.so")
+    return os.path.join(base_dir, "2048-ai", "bin", "2048.so")
+
+
+def nneonneo_table_cache_path(lib_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(lib_path)), "tables.cache")
+
+
+def load_nneonneo_engine(
+    move_timeout: float,
+    threads: int = 1,
+    symmetric: bool = False,
+    tablebase: Optional[str] = None,
+    ntuple: Optional[str] = None,
+) -> Tuple[Optional[TimedNneonneoEngine], Optional[str]]:
+    lib_path = nneonneo_lib_path()
     if not os.path.isfile(lib_path):
         return None, f"missing shared library: {lib_path}"
     try:
-        engine = TimedNneonneoEngine(lib_path, move_timeout=move_timeout)
+        engine = TimedNneonneoEngine(
+            lib_path,
+            move_timeout=move_timeout,
+            threads=threads,
+            symmetric=symmetric,
+            tablebase=tablebase,
+            ntuple=ntuple,
+        )
         if not engine.warmup():
             err = engine.last_error or "failed to start nneonneo worker"
             engine.close()
@@ -282,19 +1583,79 @@ def build_corner_weight_matrices() -> Dict[str, List[List[float]]]:
 SNAKE_WEIGHT_BY_CORNER = build_corner_weight_matrices()
 
 
-def new_board() -> Board:
+class SpawnRng:
+    """splitmix64 tile-spawn stream, bit-identical to spawn_rng_t in 2048-ai/2048.cpp.
+
+    Exposes the two calls add_random_tile makes (choice, then random), so a game
+    seeded here replays the same spawns as play_game_seeded in the native engine.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed: int = 0):
+        self.state = seed & MASK64
+
+    def next64(self) -> int:
+        self.state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def choice(self, items: Sequence[T]) -> T:
+        return items[self.next64() % len(items)]
+
+    def random(self) -> float:
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+
+SpawnSource = Union[random.Random, SpawnRng]
+
+
+class GameState:
+    """Board, score and spawn stream of one game, replayable from its seed."""
+
+    __slots__ = ("board", "score", "moves", "rng")
+
+    def __init__(self, seed: Optional[int] = None, rng: Optional[SpawnSource] = None):
+        self.rng: SpawnSource = rng if rng is not None else SpawnRng(seed) if seed is not None else random.Random()
+        self.board = new_board(self.rng)
+        self.score = 0
+        self.moves = 0
+
+    @property
+    def max_tile(self) -> int:
+        return max(value for row in self.board for value in row)
+
+    def can_move(self) -> bool:
+        return can_move(self.board)
+
+    def move(self, direction: str) -> bool:
+        """Apply direction and spawn a tile; False (and no spawn) if nothing moved."""
+        board, gain, moved = apply_move(self.board, direction)
+        if not moved:
+            return False
+        self.board = board
+        self.score += gain
+        self.moves += 1
+        add_random_tile(self.board, self.rng)
+        return True
+
+
+def new_board(rng: Optional[SpawnSource] = None) -> Board:
     board = [[0] * SIZE for _ in range(SIZE)]
-    add_random_tile(board)
-    add_random_tile(board)
+    add_random_tile(board, rng)
+    add_random_tile(board, rng)
     return board
 
 
-def add_random_tile(board: Board) -> bool:
+def add_random_tile(board: Board, rng: Optional[SpawnSource] = None) -> bool:
+    rng = rng or random
     empty_cells = [(r, c) for r in range(SIZE) for c in range(SIZE) if board[r][c] == 0]
     if not empty_cells:
         return False
-    row, col = random.choice(empty_cells)
-    board[row][col] = 4 if random.random() < SPAWN_FOUR_CHANCE else 2
+    row, col = rng.choice(empty_cells)
+    board[row][col] = 4 if rng.random() < SPAWN_FOUR_CHANCE else 2
     return True
 
 
@@ -451,161 +1812,517 @@ def evaluate_board(board: Board) -> float:
     max_tile_log = math.log2(max_tile) if max_tile else 0.0
 
     return (
-        empty_cells * 360.0
-        + merges * 140.0
-        + smoothness * 14.0
-        + monotonicity * 28.0
-        + snake_score * 32.0
-        + corner_bonus * 220.0
-        + max_tile_log * 24.0
+        empty_cells * EVAL_EMPTY_WEIGHT
+        + merges * EVAL_MERGES_WEIGHT
+        + smoothness * EVAL_SMOOTHNESS_WEIGHT
+        + monotonicity * EVAL_MONOTONICITY_WEIGHT
+        + snake_score * EVAL_SNAKE_WEIGHT
+        + corner_bonus * EVAL_CORNER_WEIGHT
+        + max_tile_log * EVAL_MAX_TILE_WEIGHT
     )
 
 
-def board_key(board: Board) -> Tuple[Tuple[int, ...], ...]:
-    return tuple(tuple(row) for row in board)
+# Table-driven evaluate_board for packed boards, in the spirit of heur_score_table in
+# 2048.cpp. On ranks every term is an integer, so the empty/merge/smoothness terms
+# are summed per row and column. Monotonicity takes a max over whole-board sums, so
+# line entries carry both directions in the low bytes (at most 180 per board, no
+# carry) under the weighted score in the high bits. The snake term gets one table per
+# corner and row position; CORNER_ORDER is evaluate_board's tie-break order.
+HEUR_ROW_TABLE = [0] * 65536
+HEUR_COL_TABLE = [0] * 65536
+ROW_MAX_RANK = [0] * 65536
+CORNER_ORDER = ("top_left", "top_right", "bottom_left", "bottom_right")
+SNAKE_ROW_TABLES: List[Tuple[List[float], ...]] = []
+
+
+def init_heuristic_tables() -> None:
+    snake_by_weights: Dict[Tuple[float, ...], List[float]] = {}
+    for corner in CORNER_ORDER:
+        for weights in SNAKE_WEIGHT_BY_CORNER[corner]:
+            snake_by_weights.setdefault(tuple(weights), [0.0] * 65536)
+    interned: Dict[float, float] = {}
+
+    for row in range(65536):
+        line = [(row >> 0) & 0xF, (row >> 4) & 0xF, (row >> 8) & 0xF, (row >> 12) & 0xF]
+        merges = smoothness = mono_left = mono_right = 0
+        for i in range(SIZE - 1):
+            a, b = line[i], line[i + 1]
+            if a and b:
+                smoothness -= abs(a - b)
+                if a == b:
+                    merges += 1
+            if a > b:
+                mono_left += a - b
+            else:
+                mono_right += b - a
+
+        line_score = merges * EVAL_MERGES_WEIGHT + smoothness * EVAL_SMOOTHNESS_WEIGHT
+        mono = (mono_right << 8) | mono_left
+        HEUR_ROW_TABLE[row] = int(line.count(0) * EVAL_EMPTY_WEIGHT + line_score) * 65536 + mono
+        HEUR_COL_TABLE[row] = int(line_score) * 65536 + mono
+        ROW_MAX_RANK[row] = max(line)
+
+        for (w0, w1, w2, w3), table in snake_by_weights.items():
+            value = (w0 * line[0] + w1 * line[1] + w2 * line[2] + w3 * line[3]) * EVAL_SNAKE_WEIGHT
+            table[row] = interned.setdefault(value, value)
+
+    SNAKE_ROW_TABLES[:] = [
+        tuple(snake_by_weights[tuple(weights)] for weights in SNAKE_WEIGHT_BY_CORNER[corner])
+        for corner in CORNER_ORDER
+    ]
+
+
+init_heuristic_tables()
+
+
+def evaluate_nibble64(board: int) -> float:
+    r0 = board & ROW_MASK
+    r1 = (board >> 16) & ROW_MASK
+    r2 = (board >> 32) & ROW_MASK
+    r3 = board >> 48
+    t = transpose64(board)
+    rows = HEUR_ROW_TABLE[r0] + HEUR_ROW_TABLE[r1] + HEUR_ROW_TABLE[r2] + HEUR_ROW_TABLE[r3]
+    cols = (
+        HEUR_COL_TABLE[t & ROW_MASK]
+        + HEUR_COL_TABLE[(t >> 16) & ROW_MASK]
+        + HEUR_COL_TABLE[(t >> 32) & ROW_MASK]
+        + HEUR_COL_TABLE[t >> 48]
+    )
+    monotonicity = max(rows & 0xFF, (rows >> 8) & 0xFF) + max(cols & 0xFF, (cols >> 8) & 0xFF)
+
+    corner = 0
+    corner_rank = r0 & 0xF
+    if r0 >> 12 > corner_rank:
+        corner, corner_rank = 1, r0 >> 12
+    if r3 & 0xF > corner_rank:
+        corner, corner_rank = 2, r3 & 0xF
+    if r3 >> 12 > corner_rank:
+        corner, corner_rank = 3, r3 >> 12
+    snake = SNAKE_ROW_TABLES[corner]
+
+    max_rank = max(ROW_MAX_RANK[r0], ROW_MAX_RANK[r1], ROW_MAX_RANK[r2], ROW_MAX_RANK[r3])
+    corner_bonus = max_rank * 4.0 if max_rank and corner_rank == max_rank else -8.0
 
+    return (
+        (rows >> 16)
+        + (cols >> 16)
+        + monotonicity * EVAL_MONOTONICITY_WEIGHT
+        + snake[0][r0]
+        + snake[1][r1]
+        + snake[2][r2]
+        + snake[3][r3]
+        + corner_bonus * EVAL_CORNER_WEIGHT
+        + max_rank * EVAL_MAX_TILE_WEIGHT
+    )
+
+
+def evaluate_nibble64_symmetric(board: int) -> float:
+    """evaluate_nibble64, except that corners tied for the highest rank take the best of
+    their snakes instead of the first in CORNER_ORDER, so mirror images score alike.
+    This is the default evaluator of a symmetric TranspositionTable."""
+    r0 = board & ROW_MASK
+    r3 = board >> 48
+    corner_ranks = (r0 & 0xF, r0 >> 12, r3 & 0xF, r3 >> 12)
+    corner_rank = max(corner_ranks)
+    value = evaluate_nibble64(board)
+    if corner_ranks.count(corner_rank) == 1:
+        return value
+    r1 = (board >> 16) & ROW_MASK
+    r2 = (board >> 32) & ROW_MASK
+    snakes = [
+        snake[0][r0] + snake[1][r1] + snake[2][r2] + snake[3][r3]
+        for snake, rank in zip(SNAKE_ROW_TABLES, corner_ranks)
+        if rank == corner_rank
+    ]
+    # evaluate_nibble64 counted the first tied corner's snake.
+    return value - snakes[0] + max(snakes)
+
+
+def _corner_distance(tile: int) -> Tuple[int, int, int]:
+    index = tile.bit_length() // 4
+    r, c = divmod(index, SIZE)
+    distance = min(
+        r + c,
+        r + (SIZE - 1 - c),
+        (SIZE - 1 - r) + c,
+        (SIZE - 1 - r) + (SIZE - 1 - c),
+    )
+    return (distance, r, c)
+
+
+CHANCE_TILE_PRIORITY = {1 << (4 * i): _corner_distance(1 << (4 * i)) for i in range(SIZE * SIZE)}
 
-def limited_empty_cells(board: Board, max_cells: int = MAX_CHANCE_BRANCHES) -> List[Tuple[int, int]]:
-    cells = [(r, c) for r in range(SIZE) for c in range(SIZE) if board[r][c] == 0]
-    if len(cells) <= max_cells:
-        return cells
+
+def limited_empty_tiles64(
+    board: int,
+    max_cells: int = MAX_CHANCE_BRANCHES,
+    symmetric: bool = False,
+) -> Tuple[int, ...]:
+    tiles = empty_tiles64(board)
+    if len(tiles) <= max_cells:
+        return tiles
 
     # Prefer cells close to corners for stable board shaping.
-    def corner_distance(cell: Tuple[int, int]) -> Tuple[int, int, int]:
-        r, c = cell
-        distance = min(
-            r + c,
-            r + (SIZE - 1 - c),
-            (SIZE - 1 - r) + c,
-            (SIZE - 1 - r) + (SIZE - 1 - c),
-        )
-        return (distance, r, c)
+    tiles = sorted(tiles, key=CHANCE_TILE_PRIORITY.__getitem__)
+    if not symmetric:
+        return tuple(tiles[:max_cells])
+
+    # For a symmetric table, cells the same distance from a corner are kept or dropped
+    # together so mirror images get the same cells, whichever count is nearer
+    # max_cells. That count may then exceed max_cells.
+    cutoff = CHANCE_TILE_PRIORITY[tiles[max_cells - 1]][0]
+    closer = tuple(tile for tile in tiles if CHANCE_TILE_PRIORITY[tile][0] < cutoff)
+    with_ties = tuple(tile for tile in tiles if CHANCE_TILE_PRIORITY[tile][0] <= cutoff)
+    if closer and max_cells - len(closer) < len(with_ties) - max_cells:
+        return closer
+    return with_ties
+
+
+class TranspositionTable:
+    """Depth-tagged expectimax cache that lives for a whole autoplay session.
+
+    Entries remember the remaining search depth they were computed with and answer
+    any probe asking for that depth or less, so work from earlier iterative-deepening
+    passes and earlier moves is reused. Under probability pruning they also remember
+    the path probability (cprob) they were searched at: a node reached with a larger
+    cprob prunes less below it, so an entry only answers probes with at most its
+    cprob. Memory is capped by generational eviction: new entries go to a recent
+    generation, and once it holds half of max_entries the older generation is dropped
+    wholesale. Hits in the older generation are promoted.
+
+    With `symmetric`, expectimax searches every board as its mirror_canonical64 image,
+    so left-right and top-bottom mirror images share entries. Its default evaluator is
+    evaluate_nibble64_symmetric and its chance nodes trim spawn cells by whole corner
+    distance classes, so mirror images also search alike. The local heuristic's snake
+    runs along rows, so transposes are not folded together.
+
+    `evaluator` scores after-move boards in place of the default, e.g. a
+    NTupleNetwork's evaluate. Such values exclude the move's own merges (the network
+    learns gain + value), so expectimax then calls it only at chance nodes, adds each
+    move's merge gain and scores boards without moves as 0. Entries are only valid for
+    the evaluator they came from.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = AUTO_TT_MAX_BYTES,
+        symmetric: bool = False,
+        evaluator: Optional[Callable[[int], float]] = None,
+    ):
+        self.max_entries = max(1024, max_bytes // TT_ENTRY_BYTES)
+        self.symmetric = symmetric
+        self.evaluator = evaluator or (evaluate_nibble64_symmetric if symmetric else evaluate_nibble64)
+        self.afterstate_values = evaluator is not None
+        self._recent: Dict[int, Tuple[float, int, float]] = {}
+        self._older: Dict[int, Tuple[float, int, float]] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._older)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def get(self, key: int, depth: int, cprob: float = 1.0) -> Optional[float]:
+        self.lookups += 1
+        entry = self._recent.get(key)
+        if entry is None:
+            entry = self._older.get(key)
+            if entry is None:
+                return None
+            self._store(key, entry)
+        if entry[1] < depth or entry[2] < cprob:
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: int, depth: int, value: float, cprob: float = 1.0) -> None:
+        self._store(key, (value, depth, cprob))
+
+    def _store(self, key: int, entry: Tuple[float, int, float]) -> None:
+        recent = self._recent
+        if len(recent) >= self.max_entries // 2 and key not in recent:
+            self.evictions += len(self._older)
+            self._older = recent
+            recent = self._recent = {}
+        recent[key] = entry
+
+    def evaluate(self, board: int) -> float:
+        """Cached static score of a board, never a searched value."""
+        if self.symmetric:
+            board = mirror_canonical64(board)
+        key = (board << 2) | STATIC_KEY_TAG
+        value = self.get(key, 0)
+        if value is None:
+            value = self.evaluator(board)
+            self.put(key, 0, value)
+        return value
 
-    cells.sort(key=corner_distance)
-    return cells[:max_cells]
+    def clear(self) -> None:
+        self._recent = {}
+        self._older = {}
+        self.lookups = self.hits = self.evictions = 0
+
+
+def chance_spawns(
+    board: int,
+    depth: int,
+    strong_mode: bool,
+    prob_threshold: Optional[float],
+    symmetric: bool = False,
+) -> Tuple[Tuple[int, ...], Tuple[Tuple[int, float], ...]]:
+    """Return the spawn cells and (rank, probability) options of a chance node.
+
+    Spawn ranks multiply a cell's tile bit: tile * 1 places a 2, tile * 2 a 4.
+    `symmetric` trims cells as limited_empty_tiles64 does for a symmetric table.
+    """
+    if prob_threshold is not None:
+        # Probability pruning expands every spawn and lets cprob bound the work.
+        return empty_tiles64(board), ((1, 0.9), (2, 0.1))
+
+    if strong_mode:
+        chance_branches = 4 if depth >= 4 else 6 if depth == 3 else MAX_CHANCE_BRANCHES
+    else:
+        chance_branches = 3 if depth >= 4 else 4 if depth == 3 else 6
+    # Deep layers ignore rare 4-spawns to keep turn time stable.
+    spawn_options = ((1, 0.9), (2, 0.1)) if (strong_mode or depth <= 3) else ((1, 1.0),)
+    return limited_empty_tiles64(board, chance_branches, symmetric), spawn_options
 
 
 def expectimax(
-    board: Board,
+    board: int,
     depth: int,
     chance_turn: bool,
-    cache: Dict[Tuple[Tuple[Tuple[int, ...], ...], int, bool], float],
-    move_cache: Dict[Tuple[Tuple[int, ...], ...], List[Tuple[str, Board, int]]],
-    eval_cache: Dict[Tuple[Tuple[int, ...], ...], float],
-    deadline: float,
+    table: TranspositionTable,
+    clock: SearchClock,
     strong_mode: bool,
+    cprob: float = 1.0,
+    prob_threshold: Optional[float] = None,
 ) -> float:
-    if time.monotonic() >= deadline:
-        raise SearchTimeout
-
-    key = (board_key(board), depth, chance_turn)
-    cached = cache.get(key)
+    clock.countdown -= 1
+    if clock.countdown <= 0 and clock.check():
+        return 0.0
+
+    if table.symmetric:
+        board = mirror_canonical64(board)
+    # The packed board with the node type in the low bits; depth is tagged on the entry.
+    key = (board << 2) | chance_turn
+    # Without pruning every entry is exact for its depth and is stored at cprob 1.
+    key_cprob = cprob if prob_threshold is not None else 1.0
+    cached = table.get(key, depth, key_cprob)
     if cached is not None:
         return cached
 
-    board_state = key[0]
-
-    if depth <= 0:
-        value = eval_cache.get(board_state)
-        if value is None:
-            value = evaluate_board(board)
-            eval_cache[board_state] = value
-        cache[key] = value
+    # After-move evaluators are only asked at chance nodes, so max nodes always move.
+    if depth <= 0 and (chance_turn or not table.afterstate_values):
+        value = table.evaluator(board)
+        table.put(key, 0, value)
         return value
 
     if chance_turn:
-        if strong_mode:
-            chance_branches = 4 if depth >= 4 else 6 if depth == 3 else MAX_CHANCE_BRANCHES
-        else:
-            chance_branches = 3 if depth >= 4 else 4 if depth == 3 else 6
-        empties = limited_empty_cells(board, chance_branches)
+        # Probability pruning, like CPROB_THRESH_BASE in 2048.cpp: stop at the
+        # heuristic once the path probability is too small. Pruned leaves are not
+        # cached, and their ancestors are stored with the cprob they were searched at.
+        if prob_threshold is not None and cprob < prob_threshold:
+            return table.evaluator(board)
+        empties, spawn_options = chance_spawns(board, depth, strong_mode, prob_threshold, table.symmetric)
         if not empties:
             value = expectimax(
                 board,
                 depth - 1,
                 False,
-                cache,
-                move_cache,
-                eval_cache,
-                deadline,
+                table,
+                clock,
                 strong_mode,
+                cprob,
+                prob_threshold,
             )
-            cache[key] = value
+            if not clock.expired:
+                table.put(key, depth, value, key_cprob)
             return value
 
         total = 0.0
         cell_weight = 1.0 / len(empties)
-
-        # Deep layers ignore rare 4-spawns to keep turn time stable.
-        spawn_options = ((2, 0.9), (4, 0.1)) if (strong_mode or depth <= 3) else ((2, 1.0),)
-        for r, c in empties:
-            if time.monotonic() >= deadline:
-                raise SearchTimeout
+        cell_cprob = cprob * cell_weight
+        for tile in empties:
             expected_for_cell = 0.0
-            for spawned_value, prob in spawn_options:
-                if time.monotonic() >= deadline:
-                    raise SearchTimeout
-                next_board = [row[:] for row in board]
-                next_board[r][c] = spawned_value
+            for spawned_rank, prob in spawn_options:
                 expected_for_cell += prob * expectimax(
-                    next_board,
+                    board | (tile * spawned_rank),
                     depth - 1,
                     False,
-                    cache,
-                    move_cache,
-                    eval_cache,
-                    deadline,
+                    table,
+                    clock,
                     strong_mode,
+                    cell_cprob * prob,
+                    prob_threshold,
                 )
             total += cell_weight * expected_for_cell
 
-        cache[key] = total
+        if clock.expired:
+            return 0.0
+        table.put(key, depth, total, key_cprob)
         return total
 
-    moves = move_cache.get(board_state)
-    if moves is None:
-        computed_moves: List[Tuple[str, Board, int]] = []
+    best_value = -float("inf")
+    if table.afterstate_values:
         for direction in BOT_DIRECTIONS:
-            moved_board, gain, moved = apply_move(board, direction)
-            if moved:
-                computed_moves.append((direction, moved_board, gain))
-        moves = computed_moves
-        move_cache[board_state] = moves
-
-    if not moves:
-        value = eval_cache.get(board_state)
-        if value is None:
-            value = evaluate_board(board)
-            eval_cache[board_state] = value
-        cache[key] = value
-        return value
+            moved_board, gain, moved = apply_move64(board, direction)
+            if not moved:
+                continue
+            value = gain + expectimax(
+                moved_board,
+                depth,
+                True,
+                table,
+                clock,
+                strong_mode,
+                cprob,
+                prob_threshold,
+            )
+            best_value = max(best_value, value)
+    else:
+        for move in BOT_MOVES64:
+            moved_board = move(board)
+            if moved_board == board:
+                continue
+            value = expectimax(
+                moved_board,
+                depth,
+                True,
+                table,
+                clock,
+                strong_mode,
+                cprob,
+                prob_threshold,
+            )
+            best_value = max(best_value, value)
 
-    best_value = -float("inf")
-    for _, moved_board, _ in moves:
-        if time.monotonic() >= deadline:
-            raise SearchTimeout
-        value = expectimax(
-            moved_board,
-            depth,
-            True,
-            cache,
-            move_cache,
-            eval_cache,
-            deadline,
-            strong_mode,
+    if clock.expired:
+        return 0.0
+    if best_value == -float("inf"):
+        # A finished game earns nothing more, which is what after-move values assume.
+        best_value = 0.0 if table.afterstate_values else table.evaluator(board)
+    table.put(key, depth, best_value, key_cprob)
+    return best_value
+
+
+_worker_table: Optional[TranspositionTable] = None
+
+
+def _ignore_sigint_in_worker() -> None:
+    """Pool initializer step: Ctrl-C is handled by the parent, which terminates the pool."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _init_local_search_worker(max_bytes: int, symmetric: bool = False, ntuple_path: Optional[str] = None) -> None:
+    global _worker_table
+    _ignore_sigint_in_worker()
+    evaluator = NTupleNetwork(ntuple_path).evaluate if ntuple_path else None
+    _worker_table = TranspositionTable(max_bytes=max_bytes, symmetric=symmetric, evaluator=evaluator)
+
+
+def _local_search_task(
+    task: Tuple[int, int, bool, float, bool, float, Optional[float]],
+) -> Tuple[float, int, bool]:
+    board, depth, chance_turn, deadline, strong_mode, cprob, prob_threshold = task
+    clock = SearchClock(deadline - time.monotonic())
+    value = expectimax(board, depth, chance_turn, _worker_table, clock, strong_mode, cprob, prob_threshold)
+    return value, clock.node_count, clock.expired
+
+
+class LocalSearchPool:
+    """Persistent worker processes that score root moves for choose_auto_move.
+
+    The pool is started once per session so moves do not pay process startup, and
+    each worker keeps its own TranspositionTable between moves. Tasks carry an
+    absolute time.monotonic() deadline shared by all workers. From
+    POOL_SPLIT_DEPTH on, each root move is split into its first-layer chance
+    children so that up to four root moves still keep every core busy.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_bytes: int = AUTO_TT_MAX_BYTES,
+        symmetric: bool = False,
+        ntuple_path: Optional[str] = None,
+    ):
+        self.workers = max(1, workers)
+        self.symmetric = symmetric
+        self._pool = mp.Pool(
+            processes=self.workers,
+            initializer=_init_local_search_worker,
+            initargs=(max_bytes // self.workers, symmetric, ntuple_path),
         )
-        best_value = max(best_value, value)
 
-    cache[key] = best_value
-    return best_value
+    def close(self) -> None:
+        self._pool.terminate()
+        self._pool.join()
+
+    def score_moves(
+        self,
+        boards: List[int],
+        depth: int,
+        deadline: float,
+        strong_mode: bool,
+        prob_threshold: Optional[float],
+    ) -> Tuple[Optional[List[float]], int]:
+        """Return expectimax values of after-move boards, or None if the deadline hit."""
+        owners: List[Tuple[int, float]] = []
+        tasks = []
+        for index, board in enumerate(boards):
+            if depth < POOL_SPLIT_DEPTH:
+                owners.append((index, 1.0))
+                tasks.append((board, depth, True, deadline, strong_mode, 1.0, prob_threshold))
+                continue
+            empties, spawn_options = chance_spawns(board, depth, strong_mode, prob_threshold, self.symmetric)
+            for tile in empties:
+                for spawned_rank, prob in spawn_options:
+                    weight = prob / len(empties)
+                    owners.append((index, weight))
+                    tasks.append(
+                        (
+                            board | (tile * spawned_rank),
+                            depth - 1,
+                            False,
+                            deadline,
+                            strong_mode,
+                            weight,
+                            prob_threshold,
+                        )
+                    )
+
+        pending = self._pool.map_async(_local_search_task, tasks, chunksize=1)
+        try:
+            results = pending.get(timeout=max(0.0, deadline - time.monotonic()) + POOL_RESULT_GRACE)
+        except mp.TimeoutError:
+            return None, 0
+
+        values = [0.0] * len(boards)
+        nodes = 0
+        expired = False
+        for (index, weight), (value, task_nodes, task_expired) in zip(owners, results):
+            values[index] += weight * value
+            nodes += task_nodes
+            expired = expired or task_expired
+        return (None if expired else values), nodes
 
 
 def choose_auto_move(
     board: Board,
     time_budget: float = AUTO_MOVE_TIME_BUDGET,
     strong_mode: bool = False,
+    table: Optional[TranspositionTable] = None,
+    prob_threshold: Optional[float] = None,
+    stats: Optional[SearchStats] = None,
+    pool: Optional[LocalSearchPool] = None,
 ) -> Optional[str]:
-    empty_count = sum(1 for row in board for value in row if value == 0)
+    packed = board_to_nibble64(board)
+    empty_count = len(empty_tiles64(packed))
     if strong_mode:
         if empty_count >= 8:
             max_depth = 3
@@ -621,95 +2338,103 @@ def choose_auto_move(
         else:
             max_depth = 4
 
-    candidates: List[Tuple[str, Board, int]] = []
+    candidates: List[Tuple[str, int, int]] = []
     for direction in BOT_DIRECTIONS:
-        moved_board, gain, moved = apply_move(board, direction)
+        moved_board, gain, moved = apply_move64(packed, direction)
         if moved:
             candidates.append((direction, moved_board, gain))
 
     if not candidates:
         return None
 
-    eval_cache: Dict[Tuple[Tuple[int, ...], ...], float] = {}
-    move_cache: Dict[Tuple[Tuple[int, ...], ...], List[Tuple[str, Board, int]]] = {}
-
-    def cached_eval(state: Board) -> float:
-        key = board_key(state)
-        value = eval_cache.get(key)
-        if value is None:
-            value = evaluate_board(state)
-            eval_cache[key] = value
-        return value
-
-    move_cache[board_key(board)] = candidates[:]
+    if table is None:
+        table = TranspositionTable()
 
     # Move ordering helps deeper iterations find good lines faster.
     candidates.sort(
         key=lambda item: (
             item[2],
-            sum(1 for row in item[1] for value in row if value == 0),
-            cached_eval(item[1]),
+            len(empty_tiles64(item[1])),
+            table.evaluate(item[1]),
         ),
         reverse=True,
     )
 
-    deadline = time.monotonic() + max(0.005, time_budget)
+    clock = SearchClock(max(0.005, time_budget))
     best_move = candidates[0][0]
     best_value = -float("inf")
+    completed = 0
+    pool_nodes = 0
 
     for depth in range(1, max_depth + 1):
-        cache: Dict[Tuple[Tuple[Tuple[int, ...], ...], int, bool], float] = {}
-        depth_best_move = best_move
-        depth_best_value = -float("inf")
-        completed_depth = True
-
-        for direction, moved_board, gain in candidates:
-            if time.monotonic() >= deadline:
-                completed_depth = False
-                break
-            try:
+        values: Optional[List[float]]
+        if pool is not None:
+            values, nodes = pool.score_moves(
+                [item[1] for item in candidates],
+                depth,
+                clock.deadline,
+                strong_mode,
+                prob_threshold,
+            )
+            pool_nodes += nodes
+        else:
+            values = []
+            for _, moved_board, _ in candidates:
                 value = expectimax(
                     moved_board,
                     depth,
                     True,
-                    cache,
-                    move_cache,
-                    eval_cache,
-                    deadline,
+                    table,
+                    clock,
                     strong_mode,
+                    1.0,
+                    prob_threshold,
                 )
-            except SearchTimeout:
-                completed_depth = False
-                break
+                if clock.expired:
+                    values = None
+                    break
+                values.append(value)
+
+        # Only completed depths may replace the previous answer.
+        if values is None:
+            break
 
-            value += gain * 0.1
+        depth_best_move = best_move
+        depth_best_value = -float("inf")
+        # After-move values are scored like TDPlayer: the full gain plus the value.
+        gain_weight = 1.0 if table.afterstate_values else 0.1
+        for (direction, _, gain), value in zip(candidates, values):
+            value += gain * gain_weight
             if value > depth_best_value:
                 depth_best_value = value
                 depth_best_move = direction
 
-        if completed_depth and depth_best_value > -float("inf"):
-            best_move = depth_best_move
-            best_value = depth_best_value
-        else:
-            break
+        best_move = depth_best_move
+        best_value = depth_best_value
+        completed = depth
 
-        if time.monotonic() >= deadline:
+        if time.monotonic() >= clock.deadline:
             break
 
     # If timeout happened before depth 1 completed, use quick heuristic fallback.
     if best_value == -float("inf"):
         best_move = max(
             candidates,
-            key=lambda item: (item[2], cached_eval(item[1])),
+            key=lambda item: (item[2], table.evaluate(item[1])),
         )[0]
 
+    if stats is not None:
+        stats.nodes = clock.node_count + pool_nodes
+        stats.depth = completed
+        stats.elapsed = time.monotonic() - clock.started_at
     return best_move
 
 
 def choose_quick_move(board: Board) -> Optional[str]:
-    candidates: List[Tuple[str, Board, int]] = []
+    packed = board_to_nibble64(board)
+    candidates: List[Tuple[str, int, int]] = []
     for direction in BOT_DIRECTIONS:
-        moved_board, gain, moved = apply_move(board, direction)
+        moved_board, gain, moved = apply_move64(packed, direction)
         if moved:
             candidates.append((direction, moved_board, gain))
 
@@ -720,8 +2445,8 @@ def choose_quick_move(board: Board) -> Optional[str]:
         candidates,
         key=lambda item: (
             item[2],
-            sum(1 for row in item[1] for value in row if value == 0),
-            evaluate_board(item[1]),
+            len(empty_tiles64(item[1])),
+            evaluate_nibble64(item[1]),
         ),
     )[0]
 
@@ -948,7 +2673,20 @@ def run_game(stdscr: "curses._CursesWindow") -> None:
             status = f"Moved {direction}."
 
 
-def run_auto_game(stdscr: "curses._CursesWindow", speed: float, strong_mode: bool, engine: str) -> None:
+def run_auto_game(
+    stdscr: "curses._CursesWindow",
+    speed: float,
+    strong_mode: bool,
+    engine: str,
+    cache_mb: float = AUTO_TT_MAX_BYTES / (1024 * 1024),
+    prob_threshold: Optional[float] = None,
+    workers: int = 1,
+    native_threads: int = 1,
+    symmetric: bool = False,
+    book_path: Optional[str] = None,
+    tablebase_path: Optional[str] = None,
+    ntuple_path: Optional[str] = None,
+) -> None:
     try:
         curses.curs_set(0)
     except curses.error:
@@ -961,20 +2699,51 @@ def run_auto_game(stdscr: "curses._CursesWindow", speed: float, strong_mode: boo
     nneonneo_timeout = AUTO_MOVE_MAX_THINK_TIME
     base_budget = AUTO_MOVE_TIME_BUDGET * (1.6 if strong_mode else 1.0)
     search_budget = min(base_budget, max(0.05, step_delay * (0.9 if strong_mode else 0.75)))
+    engine_notice = ""
+    network: Optional[NTupleNetwork] = None
+    if ntuple_path:
+        try:
+            network = NTupleNetwork(ntuple_path)
+        except (OSError, ValueError) as exc:
+            engine_notice = f"n-tuple network unavailable ({exc}); using the heuristic."
+            ntuple_path = None
+    search_table = TranspositionTable(
+        max_bytes=int(cache_mb * 1024 * 1024),
+        symmetric=symmetric,
+        evaluator=network.evaluate if network is not None else None,
+    )
+    search_stats = SearchStats()
+    search_pool = (
+        LocalSearchPool(workers, max_bytes=int(cache_mb * 1024 * 1024), symmetric=symmetric, ntuple_path=ntuple_path)
+        if workers > 1
+        else None
+    )
 
     active_engine = "local"
     nneonneo_engine: Optional[TimedNneonneoEngine] = None
-    engine_notice = ""
     if engine in ("auto", "nneonneo"):
-        nneonneo_engine, err = load_nneonneo_engine(move_timeout=nneonneo_timeout)
+        nneonneo_engine, err = load_nneonneo_engine(
+            move_timeout=nneonneo_timeout,
+            threads=native_threads,
+            symmetric=symmetric,
+            tablebase=tablebase_path,
+            ntuple=ntuple_path,
+        )
         if nneonneo_engine is not None:
             active_engine = "nneonneo"
         else:
             active_engine = "local"
             if engine == "nneonneo":
-                engine_notice = f"nneonneo unavailable ({err}); using local bot."
+                engine_notice = f"{engine_notice} nneonneo unavailable ({err}); using local bot.".lstrip()
             else:
-                engine_notice = f"auto engine fell back to local ({err})."
+                engine_notice = f"{engine_notice} auto engine fell back to local ({err}).".lstrip()
+
+    opening_book: Optional[OpeningBook] = None
+    if book_path:
+        try:
+            opening_book = OpeningBook(book_path)
+        except (OSError, ValueError) as exc:
+            engine_notice = f"{engine_notice} opening book unavailable ({exc}).".lstrip()
 
     color_pairs = init_colors()
 
@@ -1018,8 +2787,11 @@ def run_auto_game(stdscr: "curses._CursesWindow", speed: float, strong_mode: boo
             think_started_at = time.monotonic()
             fallback_reason = ""
             fallback_used = False
+            book_direction = opening_book.lookup(board) if opening_book is not None else None
 
-            if active_engine == "nneonneo" and nneonneo_engine is not None:
+            if book_direction is not None:
+                direction = book_direction
+            elif active_engine == "nneonneo" and nneonneo_engine is not None:
                 direction = nneonneo_engine.choose_move(board, timeout=nneonneo_timeout)
                 if direction is None:
                     fallback_used = True
@@ -1034,9 +2806,20 @@ def run_auto_game(stdscr: "curses._CursesWindow", speed: float, strong_mode: boo
                             board,
                             time_budget=local_budget,
                             strong_mode=True,
+                            table=search_table,
+                            prob_threshold=prob_threshold,
+                            pool=search_pool,
                         )
             else:
-                direction = choose_auto_move(board, search_budget, strong_mode=strong_mode)
+                direction = choose_auto_move(
+                    board,
+                    search_budget,
+                    strong_mode=strong_mode,
+                    table=search_table,
+                    prob_threshold=prob_threshold,
+                    stats=search_stats,
+                    pool=search_pool,
+                )
 
             think_ms = int((time.monotonic() - think_started_at) * 1000)
 
@@ -1064,10 +2847,18 @@ def run_auto_game(stdscr: "curses._CursesWindow", speed: float, strong_mode: boo
             elif not can_move(board):
                 game_over = True
                 status = "Auto-play finished (game over). Press R or Q."
+            elif book_direction is not None:
+                status = f"Auto moved {direction} ({think_ms}ms, opening book)."
             elif fallback_used:
-                status = f"Auto moved {direction} ({think_ms}ms, local fallback: {fallback_reason})."
+                status = (
+                    f"Auto moved {direction} ({think_ms}ms, local fallback: {fallback_reason}; "
+                    f"spare hits {nneonneo_engine.spare_hits}, cold starts {nneonneo_engine.cold_starts})."
+                )
             else:
-                status = f"Auto moved {direction} ({think_ms}ms)."
+                status = f"Auto moved {direction} ({think_ms}ms"
+                if active_engine == "local":
+                    status += f", {search_stats.nodes} nodes, cache hits {search_table.hit_rate:.0%}"
+                status += ")."
 
             next_move_time = move_scheduled_at + step_delay
             if next_move_time < time.monotonic():
@@ -1075,12 +2866,56 @@ def run_auto_game(stdscr: "curses._CursesWindow", speed: float, strong_mode: boo
     finally:
         if nneonneo_engine is not None:
             nneonneo_engine.close()
+        if opening_book is not None:
+            opening_book.close()
+        if search_pool is not None:
+            search_pool.close()
+        if network is not None:
+            network.close()
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Play 2048 in the terminal.")
     parser.add_argument("--auto", action="store_true", help="Run autoplay bot.")
     parser.add_argument("--strong", action="store_true", help="Use stronger but heavier auto-search.")
+    parser.add_argument(
+        "--prob-threshold",
+        type=float,
+        default=None,
+        help="Prune local chance nodes below this path probability (e.g. 0.001) instead of capping branches.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Local engine worker processes for root-parallel search (default: 1, no pool).",
+    )
+    parser.add_argument(
+        "--native-threads",
+        type=int,
+        default=1,
+        help="nneonneo engine search threads (default: 1; 0 = one per CPU).",
+    )
+    parser.add_argument(
+        "--book",
+        default=None,
+        help="Opening book built by book_2048.py; book moves are played before any search.",
+    )
+    parser.add_argument(
+        "--symmetric-cache",
+        action="store_true",
+        help="Share transposition entries between mirror-image boards (and transposes, for nneonneo).",
+    )
+    parser.add_argument(
+        "--tablebase",
+        default=None,
+        help="Endgame tablebase built by tablebase_2048.py; the nneonneo search scores matching leaves with it.",
+    )
+    parser.add_argument(
+        "--ntuple",
+        default=None,
+        help="n-tuple network trained by ntuple_2048.py; both engines score search leaves with it.",
+    )
     parser.add_argument(
         "--engine",
         choices=("local", "nneonneo", "auto"),
@@ -1093,6 +2928,12 @@ def parse_args() -> argparse.Namespace:
         default=AUTO_DEFAULT_SPEED,
         help="Auto mode moves per second (default: 2).",
     )
+    parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=AUTO_TT_MAX_BYTES / (1024 * 1024),
+        help="Memory cap for the local bot's transposition table in MB (default: 64).",
+    )
     return parser.parse_args()
 
 
@@ -1100,7 +2941,20 @@ def main() -> None:
     args = parse_args()
     auto_mode = args.auto or args.engine != "local" or "--engine" in sys.argv
     if auto_mode:
-        curses.wrapper(run_auto_game, args.speed, args.strong, args.engine)
+        curses.wrapper(
+            run_auto_game,
+            args.speed,
+            args.strong,
+            args.engine,
+            args.cache_mb,
+            args.prob_threshold,
+            args.workers,
+            args.native_threads,
+            args.symmetric_cache,
+            args.book,
+            args.tablebase,
+            args.ntuple,
+        )
     else:
         curses.wrapper(run_game)
 
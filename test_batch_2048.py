@@ -0,0 +1,78 @@
+import random
+import unittest
+
+import batch_2048 as batch
+import simulate_2048 as sim
+import terminal_2048 as game
+
+
+def random_boards(count, seed, max_rank=11):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = 0
+        for cell in range(16):
+            if rng.random() < 0.7:
+                board |= rng.randint(1, max_rank) << (4 * cell)
+        boards.append(board)
+    return boards
+
+
+@unittest.skipUnless(batch.HAVE_NUMPY, "numpy not installed")
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.boards = random_boards(500, 25)
+
+    def test_moves_match_apply_move64(self):
+        moved, gains, valid = batch.move_boards(self.boards)
+        for row, board in enumerate(self.boards):
+            for column, direction in enumerate(batch.BATCH_DIRECTIONS):
+                expected = game.apply_move64(board, direction)
+                self.assertEqual((int(moved[row, column]), int(gains[row, column]), bool(valid[row, column])), expected)
+        can_move = batch.can_move_boards(self.boards)
+        self.assertEqual([bool(flag) for flag in can_move], [game.can_move64(board) for board in self.boards])
+
+    def test_evaluation_matches_evaluate_nibble64(self):
+        values = batch.evaluate_boards(self.boards + [0])
+        for board, value in zip(self.boards + [0], values):
+            self.assertAlmostEqual(float(value), game.evaluate_nibble64(board), places=6)
+        values = batch.evaluate_boards(self.boards + [0], symmetric=True)
+        for board, value in zip(self.boards + [0], values):
+            self.assertAlmostEqual(float(value), game.evaluate_nibble64_symmetric(board), places=6)
+
+    def test_spawns_cover_every_empty_cell(self):
+        children, parents, probabilities = batch.expand_spawns(self.boards)
+        counts = batch.empty_counts(self.boards)
+        for index, board in enumerate(self.boards):
+            tiles = game.empty_tiles64(board)
+            self.assertEqual(counts[index], len(tiles))
+            mine = parents == index
+            expected = {board | (tile * rank) for tile in tiles for rank in (1, 2)}
+            self.assertEqual({int(child) for child in children[mine]}, expected)
+            if tiles:
+                self.assertAlmostEqual(float(probabilities[mine].sum()), 1.0)
+
+    def test_layered_search_matches_full_width_expectimax(self):
+        packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 2, 32, 4], [0, 0, 8, 2], [0, 0, 0, 4]])
+        values = batch.layered_move_values(packed, 2)
+        for direction, value in zip(batch.BATCH_DIRECTIONS, values):
+            moved, _, legal = game.apply_move64(packed, direction)
+            if not legal:
+                self.assertIsNone(value)
+                continue
+            expected = game.expectimax(
+                moved, 2, True, game.TranspositionTable(), game.SearchClock(60.0), False, prob_threshold=0.0
+            )
+            self.assertAlmostEqual(value, expected, delta=1e-6 * abs(expected))
+
+    def test_simulated_games_use_the_batch_engine(self):
+        engine = sim.SimEngine("batch")
+        try:
+            result = sim.play_headless_game(engine, seed=4, max_moves=5)
+            self.assertEqual(result["moves"], 5)
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
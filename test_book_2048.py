@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import book_2048 as book
+import simulate_2048 as sim
+import terminal_2048 as game
+
+
+def quick_best_moves(boards):
+    directions = [game.choose_quick_move(game.nibble64_to_board(board)) for board in boards]
+    return [book.DIR_TO_NATIVE_MOVE[direction] if direction else -1 for direction in directions]
+
+
+class OpeningBookTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, "book.bin")
+        cls.entries = book.build_book(quick_best_moves, game.SYMMETRY_COUNT, max_moves=1)
+        book.write_book(cls.path, cls.entries, game.SYMMETRY_COUNT)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.book = game.OpeningBook(self.path)
+
+    def tearDown(self):
+        self.book.close()
+
+    def test_every_opening_is_in_the_book(self):
+        self.assertEqual(len(self.book), len(self.entries))
+        for packed in book.opening_positions():
+            direction = self.book.lookup_packed(packed)
+            self.assertIsNotNone(direction)
+            self.assertTrue(game.apply_move64(packed, direction)[2])
+        self.assertEqual(self.book.hits, self.book.lookups)
+
+    def test_lookups_follow_board_symmetries(self):
+        packed = game.board_to_nibble64([[2, 0, 0, 0], [0, 0, 4, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        direction = self.book.lookup_packed(packed)
+        for symmetry in range(game.SYMMETRY_COUNT):
+            self.assertEqual(
+                self.book.lookup_packed(game.transform64(packed, symmetry)),
+                game.symmetry_direction(symmetry, direction),
+            )
+
+    def test_positions_outside_the_book_miss(self):
+        self.assertIsNone(self.book.lookup([[2, 4, 8, 16], [32, 64, 128, 256], [0, 0, 0, 0], [0, 0, 0, 2]]))
+        self.assertEqual(self.book.hits, 0)
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.tmpdir.name, "junk.bin")
+        with open(path, "wb") as out:
+            out.write(b"not a book, just some bytes")
+        with self.assertRaises(ValueError):
+            game.OpeningBook(path)
+
+    def test_simulated_games_play_book_moves(self):
+        engine = sim.SimEngine("quick", book_path=self.path)
+        try:
+            result = sim.play_headless_game(engine, seed=3, max_moves=5)
+            self.assertGreater(engine.book.hits, 0)
+            self.assertEqual(result["moves"], 5)
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
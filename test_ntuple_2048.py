@@ -0,0 +1,163 @@
+import array
+import ctypes
+import io
+import os
+import random
+import tempfile
+import unittest
+
+import ntuple_2048 as ntuple
+import terminal_2048 as game
+
+
+def file_bytes(path):
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+class NTupleNetworkTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, "trained.ntw")
+        ntuple.train(cls.path, 6, base_seed=1, report_every=3, out=io.StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.network = game.NTupleNetwork(self.path)
+        rng = random.Random(24)
+        self.boards = [rng.getrandbits(64) for _ in range(50)]
+
+    def tearDown(self):
+        self.network.close()
+
+    def test_tuple_runs_read_cells_in_order(self):
+        board = game.board_to_nibble64([[2, 4, 8, 16], [32, 64, 128, 256], [0, 0, 0, 0], [0, 0, 0, 0]])
+        for shape in game.NTUPLE_SHAPES["small"] + game.NTUPLE_SHAPES["large"]:
+            index = 0
+            for shift, mask in game.ntuple_runs(shape):
+                index |= (board >> shift) & mask
+            expected = sum(((board >> (4 * cell)) & 0xF) << (4 * i) for i, cell in enumerate(shape))
+            self.assertEqual(index, expected)
+
+    def test_training_learns_symmetric_values(self):
+        self.assertEqual(self.network.games, 6)
+        self.assertTrue(any(self.network.evaluate(board) for board in self.boards))
+        for board in self.boards[:10]:
+            value = self.network.evaluate(board)
+            for image in game.symmetry_images64(board):
+                self.assertAlmostEqual(self.network.evaluate(image), value, places=3)
+
+    def test_resumed_training_matches_one_run(self):
+        path = os.path.join(self.tmpdir.name, "resumed.ntw")
+        ntuple.train(path, 4, base_seed=1, report_every=2, out=io.StringIO())
+        ntuple.train(path, 2, base_seed=1, report_every=2, out=io.StringIO())
+        self.assertEqual(file_bytes(path), file_bytes(self.path))
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.tmpdir.name, "junk.ntw")
+        with open(path, "wb") as out:
+            out.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            game.NTupleNetwork(path)
+
+    def test_local_search_uses_the_network(self):
+        calls = []
+
+        def evaluator(board):
+            calls.append(board)
+            return self.network.evaluate(board)
+
+        table = game.TranspositionTable(evaluator=evaluator)
+        board = [[2, 4, 8, 16], [0, 2, 0, 4], [0, 0, 0, 0], [0, 0, 2, 0]]
+        direction = game.choose_auto_move(board, time_budget=0.05, table=table)
+        self.assertTrue(game.apply_move(board, direction)[2])
+        self.assertTrue(calls)
+
+    def test_search_scores_moves_as_gain_plus_value(self):
+        table = game.TranspositionTable(evaluator=self.network.evaluate)
+        packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 2, 0, 4], [0, 0, 0, 0], [0, 0, 2, 0]])
+        expected = max(
+            gain + self.network.evaluate(moved)
+            for moved, gain, legal in (game.apply_move64(packed, direction) for direction in game.BOT_DIRECTIONS)
+            if legal
+        )
+        self.assertAlmostEqual(game.expectimax(packed, 0, False, table, game.SearchClock(60.0), False), expected)
+        dead = game.board_to_nibble64([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]])
+        self.assertEqual(game.expectimax(dead, 2, False, table, game.SearchClock(60.0), False), 0.0)
+
+    @unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+    def test_native_search_matches_python_search(self):
+        engine = game.NneonneoEngine(game.nneonneo_lib_path(), ntuple=self.path)
+        table = game.TranspositionTable(evaluator=self.network.evaluate)
+        try:
+            packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 2, 0, 4], [0, 0, 0, 0], [0, 0, 2, 0]])
+            scores = (ctypes.c_float * 4)()
+            engine.lib.engine_find_best_move(engine.handle, packed, 0, 1, scores, None)
+            for move, direction in game.NNEONNEO_MOVE_TO_DIR.items():
+                moved, gain, legal = game.apply_move64(packed, direction)
+                if not legal:
+                    self.assertEqual(scores[move], 0.0)
+                    continue
+                expected = gain + game.expectimax(
+                    moved, 1, True, table, game.SearchClock(60.0), False, prob_threshold=0.0
+                )
+                self.assertAlmostEqual(scores[move], expected, delta=1e-4 * max(1.0, abs(expected)))
+        finally:
+            engine.close()
+
+    @unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+    def test_native_search_keeps_negative_move_values(self):
+        path = os.path.join(self.tmpdir.name, "negative.ntw")
+        game.NTupleNetwork.create(path, game.NTUPLE_SHAPES["small"]).close()
+        with open(path, "r+b") as handle:
+            handle.seek(game.NTUPLE_OFFSET)
+            count = (os.path.getsize(path) - game.NTUPLE_OFFSET) // 4
+            handle.write(array.array("f", [-1.0]) * count)
+        network = game.NTupleNetwork(path)
+        engine = game.NneonneoEngine(game.nneonneo_lib_path(), ntuple=path)
+        table = game.TranspositionTable(evaluator=network.evaluate)
+        try:
+            # Nothing merges, so every legal move is worth its negative afterstate value.
+            packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            scores = (ctypes.c_float * 4)()
+            move = engine.lib.engine_find_best_move(engine.handle, packed, 0, 1, scores, None)
+            self.assertTrue(game.apply_move64(packed, game.NNEONNEO_MOVE_TO_DIR[move])[2])
+            for move, direction in game.NNEONNEO_MOVE_TO_DIR.items():
+                moved, gain, legal = game.apply_move64(packed, direction)
+                if not legal:
+                    self.assertEqual(scores[move], 0.0)
+                    continue
+                expected = gain + game.expectimax(
+                    moved, 1, True, table, game.SearchClock(60.0), False, prob_threshold=0.0
+                )
+                self.assertLess(expected, 0.0)
+                self.assertAlmostEqual(scores[move], expected, delta=1e-4 * max(1.0, abs(expected)))
+            self.assertTrue(game.apply_move64(packed, game.NNEONNEO_MOVE_TO_DIR[engine.best_move(packed, max_depth=3)])[2])
+        finally:
+            engine.close()
+            network.close()
+
+    def test_native_engine_rejects_network_with_tablebase(self):
+        with self.assertRaisesRegex(ValueError, "tablebase"):
+            game.NneonneoEngine(game.nneonneo_lib_path(), tablebase=self.path, ntuple=self.path)
+
+    @unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+    def test_native_network_matches_python(self):
+        engine = game.NneonneoEngine(game.nneonneo_lib_path(), ntuple=self.path)
+        try:
+            for board in self.boards:
+                expected = self.network.evaluate(board)
+                self.assertAlmostEqual(engine.ntuple_evaluate(board), expected, delta=1e-4 * max(1.0, abs(expected)))
+            packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 2, 0, 4], [0, 0, 0, 0], [0, 0, 2, 0]])
+            move = engine.best_move(packed, max_depth=2)
+            self.assertTrue(game.apply_move64(packed, game.NNEONNEO_MOVE_TO_DIR[move])[2])
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import signal
+import unittest
+
+import simulate_2048 as sim
+import terminal_2048 as game
+
+
+class HeadlessGameTests(unittest.TestCase):
+    def test_seeded_games_replay_identically(self):
+        engine = sim.SimEngine("quick")
+        first = sim.play_headless_game(engine, seed=7, max_moves=40)
+        second = sim.play_headless_game(engine, seed=7, max_moves=40)
+        for key in ("seed", "score", "max_tile", "moves", "game_over"):
+            self.assertEqual(first[key], second[key])
+        self.assertEqual(first["moves"], 40)
+        self.assertEqual(first["engine"], "quick")
+
+    def test_game_farm_seeds_do_not_depend_on_job_count(self):
+        options = {"engine": "quick"}
+        serial = list(sim.run_games(options, games=3, base_seed=11, max_moves=15, jobs=1))
+        farmed = list(sim.run_games(options, games=3, base_seed=11, max_moves=15, jobs=2))
+        by_game = {result["game"]: result for result in farmed}
+        for result in serial:
+            other = by_game[result["game"]]
+            self.assertEqual(other["seed"], 11 + result["game"])
+            self.assertEqual((other["score"], other["max_tile"]), (result["score"], result["max_tile"]))
+
+    def test_game_farm_with_a_bad_engine_fails_instead_of_hanging(self):
+        options = {"engine": "quick", "book_path": os.path.join(os.path.dirname(__file__), "no-such-book.bin")}
+        with self.assertRaises(OSError):
+            list(sim.run_games(options, games=2, base_seed=0, max_moves=5, jobs=2))
+        handler = signal.getsignal(signal.SIGINT)
+        sim._init_sim_worker(options)
+        try:
+            with self.assertRaises(RuntimeError):
+                sim._sim_task(([(0, 0)], 5))
+        finally:
+            signal.signal(signal.SIGINT, handler)
+            sim._worker_error = None
+
+    @unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+    def test_lockstep_batch_matches_sequential_games(self):
+        options = {"engine": "nneonneo"}
+        sequential = list(sim.run_games(options, games=3, base_seed=5, max_moves=20))
+        lockstep = list(sim.run_games(options, games=3, base_seed=5, max_moves=20, batch=3))
+        self.assertEqual(
+            [(result["game"], result["score"], result["moves"]) for result in lockstep],
+            [(result["game"], result["score"], result["moves"]) for result in sequential],
+        )
+
+    def test_summary_counts_games(self):
+        results = [
+            {"score": 100, "moves": 10, "think_total_s": 0.1, "max_tile": 64},
+            {"score": 300, "moves": 30, "think_total_s": 0.3, "max_tile": 128},
+        ]
+        summary = sim.summarize(results, 1.0)
+        self.assertIn("2 games", summary)
+        self.assertIn("128: 1, 64: 1", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
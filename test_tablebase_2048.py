@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+import tablebase_2048 as tablebase
+import terminal_2048 as game
+
+# Two free cells at the end of the bottom row; every locked tile is stuck.
+PAIR_LAYOUT = "2 4 8 16 / 32 64 128 256 / 512 1024 2048 4096 / 8192 16384 . ."
+# A 2x2 free corner.
+CORNER_LAYOUT = "2 4 8 16 / 32 64 128 256 / 512 1024 . . / 2048 4096 . ."
+
+
+def file_bytes(path):
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+class TablebaseTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def generate(self, name, layout, target_rank, **kwargs):
+        locked, locked_mask = tablebase.parse_layout(layout)
+        return tablebase.generate(self.path(name), locked, locked_mask, target_rank, **kwargs)
+
+    def test_small_region_has_exact_values(self):
+        self.assertTrue(self.generate("pair.tb", PAIR_LAYOUT, 3))
+        tb = tablebase.Tablebase(self.path("pair.tb"))
+        try:
+            def free(left, right):
+                return tb.locked | (left << 56) | (right << 60)
+
+            self.assertEqual(tb.probe(free(0, 0)), 0.0)
+            self.assertEqual(tb.probe(free(2, 1)), 0.0)
+            self.assertEqual(tb.probe(free(2, 2)), 1.0)
+            self.assertAlmostEqual(tb.probe(free(1, 1)), 0.1, places=6)
+            self.assertAlmostEqual(tb.probe(free(0, 1)), 0.09, places=6)
+            # Moving right would push the locked tiles into the free cells.
+            self.assertEqual(tb.probe(free(1, 0)), 0.0)
+            self.assertEqual(tb.probe(free(3, 0)), 1.0)
+            self.assertIsNone(tb.probe(free(1, 1) ^ 1))
+        finally:
+            tb.close()
+
+    def test_resumed_run_matches_full_run(self):
+        self.assertFalse(self.generate("resumed.tb", CORNER_LAYOUT, 4, max_layers=5))
+        partial = tablebase.Tablebase(self.path("resumed.tb"))
+        self.assertFalse(partial.complete)
+        self.assertIsNone(partial.probe(partial.board(0)))
+        partial.close()
+        self.assertTrue(self.generate("resumed.tb", CORNER_LAYOUT, 4))
+        self.assertTrue(self.generate("full.tb", CORNER_LAYOUT, 4))
+        self.assertEqual(file_bytes(self.path("resumed.tb")), file_bytes(self.path("full.tb")))
+
+    def test_worker_processes_match_serial_run(self):
+        self.assertTrue(self.generate("serial.tb", CORNER_LAYOUT, 4))
+        self.assertTrue(self.generate("parallel.tb", CORNER_LAYOUT, 4, jobs=2))
+        self.assertEqual(file_bytes(self.path("serial.tb")), file_bytes(self.path("parallel.tb")))
+
+    def test_rejects_a_different_layout(self):
+        self.assertTrue(self.generate("pair.tb", PAIR_LAYOUT, 3))
+        with self.assertRaises(ValueError):
+            self.generate("pair.tb", CORNER_LAYOUT, 3)
+        with self.assertRaises(ValueError):
+            tablebase.parse_layout("2 4 8 . / . . . .")
+
+    def test_does_not_overwrite_other_files_without_force(self):
+        with open(self.path("notes.txt"), "wb") as handle:
+            handle.write(b"not a tablebase")
+        with self.assertRaises(ValueError):
+            self.generate("notes.txt", PAIR_LAYOUT, 3)
+        self.assertEqual(file_bytes(self.path("notes.txt")), b"not a tablebase")
+        self.assertTrue(self.generate("notes.txt", PAIR_LAYOUT, 3, force=True))
+        self.assertTrue(self.generate("pair.tb", PAIR_LAYOUT, 3))
+        self.assertTrue(self.generate("pair.tb", CORNER_LAYOUT, 3, force=True))
+        with self.assertRaises(ValueError):
+            self.generate("big.tb", PAIR_LAYOUT, 16)
+
+    def test_layers_partition_every_position_by_tile_sum(self):
+        target_rank, free_count = 4, 5
+        reachable = tablebase.reachable_sums(target_rank, free_count)
+        tile_values = [0] + [1 << rank for rank in range(1, target_rank)]
+        expected = {}
+        for index in range(target_rank**free_count):
+            total, rest = 0, index
+            for _ in range(free_count):
+                rest, digit = divmod(rest, target_rank)
+                total += tile_values[digit]
+            expected.setdefault(total, []).append(index)
+        self.assertEqual(reachable[free_count], set(expected))
+        for total, indexes in expected.items():
+            self.assertEqual(list(tablebase.layer_indexes(target_rank, free_count, total, reachable)), indexes)
+
+    def test_refuses_layouts_over_the_size_limit(self):
+        with self.assertRaisesRegex(ValueError, "over the limit"):
+            self.generate("huge.tb", ". . . . / . . . . / 2 4 8 16 / 32 64 128 256", 12)
+        self.assertFalse(os.path.exists(self.path("huge.tb")))
+
+    @unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+    def test_native_probe_matches_python(self):
+        self.assertTrue(self.generate("corner.tb", CORNER_LAYOUT, 4))
+        tb = tablebase.Tablebase(self.path("corner.tb"))
+        engine = game.NneonneoEngine(game.nneonneo_lib_path(), tablebase=self.path("corner.tb"))
+        try:
+            for index in range(len(tb)):
+                packed = tb.board(index)
+                self.assertEqual(engine.tablebase_probe(packed), tb.probe(packed))
+            self.assertIsNone(engine.tablebase_probe(0))
+            packed = tb.board(len(tb) // 2)
+            self.assertIn(engine.best_move(packed, max_depth=2), range(-1, 4))
+        finally:
+            engine.close()
+            tb.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,769 @@
+import array
+import asyncio
+import ctypes
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+import terminal_2048 as game
+
+
+def random_board(rng: random.Random) -> game.Board:
+    values = [0, 0, 0, 0, 2, 2, 4, 8, 16, 32, 64, 128, 256, 2048]
+    return [[rng.choice(values) for _ in range(game.SIZE)] for _ in range(game.SIZE)]
+
+
+class BitboardEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(2048)
+
+    def test_nibble64_roundtrip(self):
+        for _ in range(200):
+            board = random_board(self.rng)
+            self.assertEqual(game.nibble64_to_board(game.board_to_nibble64(board)), board)
+
+    def test_apply_move64_matches_list_engine(self):
+        for _ in range(500):
+            board = random_board(self.rng)
+            packed = game.board_to_nibble64(board)
+            for direction in game.BOT_DIRECTIONS:
+                moved_board, gain, moved = game.apply_move(board, direction)
+                self.assertEqual(
+                    game.apply_move64(packed, direction),
+                    (game.board_to_nibble64(moved_board), gain, moved),
+                )
+
+    def test_can_move64_and_empty_tiles(self):
+        for _ in range(500):
+            board = random_board(self.rng)
+            packed = game.board_to_nibble64(board)
+            self.assertEqual(game.can_move64(packed), game.can_move(board))
+            empty = sum(1 for row in board for value in row if value == 0)
+            self.assertEqual(len(game.empty_tiles64(packed)), empty)
+
+    def test_transpose64_swaps_rows_and_columns(self):
+        board = random_board(self.rng)
+        transposed = [list(column) for column in zip(*board)]
+        packed = game.board_to_nibble64(board)
+        self.assertEqual(game.transpose64(packed), game.board_to_nibble64(transposed))
+
+    def test_symmetries_commute_with_moves(self):
+        for _ in range(20):
+            packed = game.board_to_nibble64(random_board(self.rng))
+            canonical, _ = game.canonical_board64(packed)
+            for symmetry in range(game.SYMMETRY_COUNT):
+                image = game.transform64(packed, symmetry)
+                self.assertEqual(game.canonical_board64(image)[0], canonical)
+                for direction in game.BOT_DIRECTIONS:
+                    self.assertEqual(
+                        game.transform64(game.execute_move64(packed, direction), symmetry),
+                        game.execute_move64(image, game.symmetry_direction(symmetry, direction)),
+                    )
+            self.assertEqual(game.mirror_canonical64(packed), game.canonical_board64(packed, game.MIRROR_SYMMETRIES)[0])
+
+    def test_choose_auto_move_returns_legal_move(self):
+        board = [
+            [2, 4, 8, 16],
+            [4, 8, 16, 32],
+            [8, 16, 32, 64],
+            [0, 0, 2, 0],
+        ]
+        direction = game.choose_auto_move(board, time_budget=0.2)
+        self.assertIn(direction, game.BOT_DIRECTIONS)
+        self.assertTrue(game.apply_move(board, direction)[2])
+
+    def test_choose_auto_move_without_moves(self):
+        board = [
+            [2, 4, 2, 4],
+            [4, 2, 4, 2],
+            [2, 4, 2, 4],
+            [4, 2, 4, 2],
+        ]
+        self.assertIsNone(game.choose_auto_move(board))
+        self.assertIsNone(game.choose_quick_move(board))
+
+
+class TableEvaluatorTests(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(4096)
+
+    def test_matches_evaluate_board(self):
+        for _ in range(2000):
+            board = random_board(self.rng)
+            self.assertEqual(game.evaluate_nibble64(game.board_to_nibble64(board)), game.evaluate_board(board))
+
+    def test_corner_tie_break_matches_evaluate_board(self):
+        board = [
+            [64, 2, 0, 64],
+            [4, 0, 0, 2],
+            [2, 0, 0, 8],
+            [64, 0, 4, 64],
+        ]
+        self.assertEqual(game.evaluate_nibble64(game.board_to_nibble64(board)), game.evaluate_board(board))
+
+    def test_symmetric_evaluator_scores_mirror_images_alike(self):
+        for _ in range(500):
+            packed = game.board_to_nibble64(random_board(self.rng))
+            value = game.evaluate_nibble64_symmetric(packed)
+            for image in (game.mirror_rows64(packed), game.flip_rows64(packed)):
+                self.assertAlmostEqual(game.evaluate_nibble64_symmetric(image), value, places=9)
+        packed = game.board_to_nibble64([[64, 2, 4, 64], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        self.assertGreaterEqual(game.evaluate_nibble64_symmetric(packed), game.evaluate_nibble64(packed))
+
+    def test_same_greedy_move_choices(self):
+        for _ in range(300):
+            board = random_board(self.rng)
+            packed = game.board_to_nibble64(board)
+            list_scores = {}
+            packed_scores = {}
+            for direction in game.BOT_DIRECTIONS:
+                moved_board, _, moved = game.apply_move(board, direction)
+                if moved:
+                    list_scores[direction] = game.evaluate_board(moved_board)
+                    packed_scores[direction] = game.evaluate_nibble64(game.apply_move64(packed, direction)[0])
+            if list_scores:
+                self.assertEqual(
+                    max(list_scores, key=list_scores.get),
+                    max(packed_scores, key=packed_scores.get),
+                )
+
+
+class TranspositionTableTests(unittest.TestCase):
+    def test_deeper_entries_answer_shallower_probes(self):
+        table = game.TranspositionTable()
+        table.put(10, 3, 1.5)
+        self.assertEqual(table.get(10, 2), 1.5)
+        self.assertEqual(table.get(10, 3), 1.5)
+        self.assertIsNone(table.get(10, 4))
+        self.assertIsNone(table.get(11, 0))
+        self.assertEqual((table.hits, table.lookups), (2, 4))
+        self.assertAlmostEqual(table.hit_rate, 0.5)
+
+    def test_memory_cap_evicts_older_generation(self):
+        table = game.TranspositionTable(max_bytes=0)
+        for key in range(10 * table.max_entries):
+            table.put(key, 1, float(key))
+        self.assertLessEqual(len(table), table.max_entries)
+        self.assertGreater(table.evictions, 0)
+        last = 10 * table.max_entries - 1
+        self.assertEqual(table.get(last, 1), float(last))
+
+    def test_older_generation_hits_are_promoted(self):
+        table = game.TranspositionTable(max_bytes=0)
+        half = table.max_entries // 2
+        table.put(-1, 2, 7.0)
+        for key in range(half - 1):
+            table.put(key, 1, 0.0)
+        table.put(half, 1, 0.0)
+        self.assertEqual(table.get(-1, 2), 7.0)
+        for key in range(half + 1, 2 * half):
+            table.put(key, 1, 0.0)
+        self.assertEqual(table.get(-1, 2), 7.0)
+
+    def test_static_scores_do_not_share_search_entries(self):
+        packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 0, 0, 2], [0, 0, 0, 0]])
+        table = game.TranspositionTable()
+        searched = game.expectimax(packed, 2, False, table, game.SearchClock(60.0), False)
+        self.assertNotEqual(searched, game.evaluate_nibble64(packed))
+        self.assertEqual(table.evaluate(packed), game.evaluate_nibble64(packed))
+        clock = game.SearchClock(60.0)
+        self.assertEqual(game.expectimax(packed, 2, False, table, clock, False), searched)
+        self.assertEqual(clock.node_count, 1)
+
+    def test_table_is_reused_across_moves(self):
+        board = [
+            [2, 4, 8, 16],
+            [0, 0, 4, 32],
+            [0, 0, 0, 2],
+            [0, 0, 0, 0],
+        ]
+        table = game.TranspositionTable()
+        first = game.choose_auto_move(board, time_budget=0.2, table=table)
+        lookups = table.lookups
+        second = game.choose_auto_move(board, time_budget=0.2, table=table)
+        self.assertEqual(first, second)
+        self.assertGreater(table.hits, 0)
+        self.assertGreater(table.lookups, lookups)
+
+
+    def test_symmetric_table_shares_mirror_images(self):
+        packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 0, 0, 2], [0, 0, 0, 0]])
+        table = game.TranspositionTable(symmetric=True)
+        value = game.expectimax(packed, 2, True, table, game.SearchClock(60.0), False)
+        for image in (game.mirror_rows64(packed), game.flip_rows64(packed)):
+            clock = game.SearchClock(60.0)
+            self.assertEqual(game.expectimax(image, 2, True, table, clock, False), value)
+            self.assertEqual(clock.node_count, 1)
+
+    def test_spawn_cells_respect_the_cap(self):
+        packed = game.board_to_nibble64([[2, 0, 0, 4], [0, 8, 16, 0], [0, 32, 64, 0], [128, 0, 0, 256]])
+        for max_cells in range(1, 9):
+            self.assertEqual(len(game.limited_empty_tiles64(packed, max_cells)), max_cells)
+
+    def test_symmetric_spawn_cells_match_mirror_images(self):
+        rng = random.Random(21)
+        for _ in range(300):
+            packed = game.board_to_nibble64(random_board(rng))
+            for max_cells in (3, 4, 6):
+                cells = game.limited_empty_tiles64(packed, max_cells, symmetric=True)
+                for mirror in (game.mirror_rows64, game.flip_rows64):
+                    image_cells = game.limited_empty_tiles64(mirror(packed), max_cells, symmetric=True)
+                    self.assertEqual(sorted(image_cells), sorted(mirror(tile) for tile in cells))
+
+
+class SearchClockTests(unittest.TestCase):
+    def test_expired_search_unwinds_without_caching(self):
+        packed = game.board_to_nibble64(
+            [
+                [2, 4, 8, 16],
+                [0, 0, 4, 32],
+                [0, 2, 0, 2],
+                [0, 0, 0, 0],
+            ]
+        )
+        table = game.TranspositionTable()
+        clock = game.SearchClock(0.0, interval=1)
+        self.assertEqual(game.expectimax(packed, 3, True, table, clock, False), 0.0)
+        self.assertTrue(clock.expired)
+        self.assertEqual(len(table), 0)
+
+    def test_interval_is_calibrated_from_node_rate(self):
+        clock = game.SearchClock(10.0, interval=1)
+        time.sleep(0.01)
+        clock.countdown = 0
+        self.assertFalse(clock.check())
+        self.assertEqual(clock.node_count, 1)
+        self.assertGreaterEqual(clock.interval, 1)
+        self.assertLessEqual(clock.interval, game.CLOCK_MAX_INTERVAL)
+
+    def test_tiny_budget_still_returns_legal_move(self):
+        board = [
+            [2, 4, 8, 16],
+            [4, 8, 16, 32],
+            [8, 16, 32, 64],
+            [0, 0, 2, 0],
+        ]
+        direction = game.choose_auto_move(board, time_budget=0.0, strong_mode=True)
+        self.assertTrue(game.apply_move(board, direction)[2])
+
+
+class ProbabilityPruningTests(unittest.TestCase):
+    board = game.board_to_nibble64(
+        [
+            [2, 4, 8, 16],
+            [0, 0, 4, 32],
+            [0, 2, 0, 2],
+            [0, 0, 0, 0],
+        ]
+    )
+
+    def search(self, depth, threshold):
+        return game.expectimax(
+            self.board,
+            depth,
+            True,
+            game.TranspositionTable(),
+            game.SearchClock(60.0),
+            False,
+            1.0,
+            threshold,
+        )
+
+    def test_expands_every_spawn_above_threshold(self):
+        tiles = game.empty_tiles64(self.board)
+        expected = sum(
+            0.9 * game.evaluate_nibble64(self.board | tile) + 0.1 * game.evaluate_nibble64(self.board | (tile << 1))
+            for tile in tiles
+        ) / len(tiles)
+        self.assertAlmostEqual(self.search(1, 0.0), expected)
+
+    def test_prunes_to_heuristic_below_threshold(self):
+        self.assertEqual(self.search(3, 1.5), game.evaluate_nibble64(self.board))
+
+    def test_pruned_values_do_not_answer_probes_nearer_the_root(self):
+        table = game.TranspositionTable()
+        game.expectimax(self.board, 3, True, table, game.SearchClock(60.0), False, 1.0, 0.01)
+        child = self.board | game.empty_tiles64(self.board)[0]
+        fresh = game.expectimax(child, 2, False, game.TranspositionTable(), game.SearchClock(60.0), False, 1.0, 0.01)
+        self.assertEqual(game.expectimax(child, 2, False, table, game.SearchClock(60.0), False, 1.0, 0.01), fresh)
+
+    def test_choose_auto_move_reports_stats(self):
+        stats = game.SearchStats()
+        board = game.nibble64_to_board(self.board)
+        direction = game.choose_auto_move(board, time_budget=0.2, prob_threshold=0.01, stats=stats)
+        self.assertTrue(game.apply_move(board, direction)[2])
+        self.assertGreater(stats.nodes, 0)
+        self.assertGreaterEqual(stats.depth, 1)
+
+
+class SpawnRngTests(unittest.TestCase):
+    def test_seeded_games_replay_identically(self):
+        first = game.GameState(seed=99)
+        second = game.GameState(seed=99)
+        for direction in game.BOT_DIRECTIONS * 10:
+            self.assertEqual(first.move(direction), second.move(direction))
+        self.assertEqual(first.board, second.board)
+        self.assertEqual(first.score, second.score)
+        self.assertNotEqual(game.GameState(seed=100).board, game.GameState(seed=101).board)
+
+    @unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+    def test_matches_native_spawn_stream(self):
+        class NativeSpawnRng(ctypes.Structure):
+            _fields_ = [("state", ctypes.c_uint64)]
+
+        lib = ctypes.CDLL(game.nneonneo_lib_path())
+        lib.initial_board_seeded.argtypes = [ctypes.POINTER(NativeSpawnRng)]
+        lib.initial_board_seeded.restype = ctypes.c_uint64
+        lib.insert_tile_seeded.argtypes = [ctypes.c_uint64, ctypes.POINTER(NativeSpawnRng)]
+        lib.insert_tile_seeded.restype = ctypes.c_uint64
+
+        for seed in (0, 1, 2048, 2**63 + 5):
+            native_rng = NativeSpawnRng(seed)
+            native = lib.initial_board_seeded(ctypes.byref(native_rng))
+            rng = game.SpawnRng(seed)
+            board = game.new_board(rng)
+            self.assertEqual(game.board_to_nibble64(board), native)
+            while game.add_random_tile(board, rng):
+                native = lib.insert_tile_seeded(native, ctypes.byref(native_rng))
+                self.assertEqual(game.board_to_nibble64(board), native)
+            self.assertEqual(rng.state, native_rng.state)
+
+
+class WorkerFramingTests(unittest.TestCase):
+    def test_replies_and_errors_are_told_apart_by_tag(self):
+        self.assertEqual(game.decode_nneonneo_reply(game.encode_nneonneo_reply(7, -1)), (7, -1))
+        with self.assertRaisesRegex(game.NneonneoRequestError, "broken") as failure:
+            game.decode_nneonneo_reply(game.encode_nneonneo_error("broken", 9))
+        self.assertEqual(failure.exception.request_id, 9)
+        # An error as long as a reply frame is still an error.
+        frame = game.encode_nneonneo_error("x")
+        self.assertEqual(len(frame), game.NNEONNEO_REPLY.size)
+        with self.assertRaisesRegex(game.NneonneoRequestError, "x"):
+            game.decode_nneonneo_reply(frame)
+        with self.assertRaisesRegex(RuntimeError, "malformed"):
+            game.decode_nneonneo_reply(b"broken")
+
+
+@unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+class NativeBatchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = game.NneonneoEngine(game.nneonneo_lib_path())
+
+    def test_batch_matches_single_board_search(self):
+        rng = random.Random(11)
+        packed = [game.board_to_nibble64(random_board(rng)) for _ in range(20)]
+        moves, scores = self.engine.find_best_moves(packed, with_scores=True)
+        with game.suppress_native_stdout():
+            expected = [self.engine.lib.find_best_move(ctypes.c_uint64(value)) for value in packed]
+        self.assertEqual(moves, expected)
+        self.assertEqual(len(scores), 4 * len(packed))
+        for index, move in enumerate(moves):
+            if move >= 0:
+                self.assertEqual(max(scores[4 * index : 4 * index + 4]), scores[4 * index + move])
+
+    def test_cached_tables_match_built_tables(self):
+        lib = self.engine.lib
+        if not hasattr(lib, "init_tables_cached"):
+            self.skipTest("library has no table cache")
+        rng = random.Random(20)
+        packed = [game.board_to_nibble64(random_board(rng)) for _ in range(10)]
+
+        def search_in_new_process(build_first):
+            # Tables are set up once per process, so each variant needs its own process.
+            script = (
+                "import ctypes, json, sys, terminal_2048 as game\n"
+                "lib_path = game.nneonneo_lib_path()\n"
+                f"if {build_first}: ctypes.CDLL(lib_path).init_tables()\n"
+                "engine = game.NneonneoEngine(lib_path)\n"
+                "moves, scores = engine.find_best_moves(json.loads(sys.argv[1]), with_scores=True)\n"
+                "print(json.dumps([engine.tables_mapped, moves, scores]))\n"
+            )
+            output = subprocess.run(
+                [sys.executable, "-c", script, json.dumps(packed)],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            return json.loads(output)
+
+        built = search_in_new_process(True)
+        search_in_new_process(False)
+        mapped = search_in_new_process(False)
+        self.assertFalse(built[0])
+        self.assertTrue(mapped[0])
+        self.assertEqual(mapped[1:], built[1:])
+
+    def test_tables_are_initialized_once_per_process(self):
+        lib = self.engine.lib
+        if not hasattr(lib, "init_tables_cached"):
+            self.skipTest("library has no table cache")
+        path = os.fsencode(game.nneonneo_table_cache_path(game.nneonneo_lib_path()))
+        first = lib.init_tables_cached(path)
+        lib.init_tables()
+        self.assertEqual(lib.init_tables_cached(path), first)
+        self.assertEqual(game.NneonneoEngine(game.nneonneo_lib_path()).tables_mapped, first == 1)
+
+    def test_stats_search_matches_printing_search(self):
+        rng = random.Random(13)
+        for _ in range(10):
+            board = random_board(rng)
+            stats = game.SearchStats()
+            direction = self.engine.choose_move(board, stats)
+            with game.suppress_native_stdout():
+                expected = self.engine.lib.find_best_move(ctypes.c_uint64(game.board_to_nibble64(board)))
+            self.assertEqual(direction, game.NNEONNEO_MOVE_TO_DIR.get(expected))
+            if direction is not None:
+                self.assertGreater(stats.nodes, 0)
+                self.assertGreater(self.engine.last_stats.cache_size, 0)
+                self.assertGreaterEqual(stats.depth, 1)
+
+    def test_timed_search_deepens_within_budget(self):
+        rng = random.Random(14)
+        for _ in range(10):
+            packed = game.board_to_nibble64(random_board(rng))
+            self.assertEqual(self.engine.best_move(packed, budget=60.0), self.engine.best_move(packed))
+
+        packed = game.board_to_nibble64([[2, 4, 8, 16], [4, 8, 16, 32], [0, 2, 0, 64], [0, 0, 0, 128]])
+        started_at = time.monotonic()
+        move = self.engine.best_move(packed, budget=0.01, max_depth=20)
+        self.assertLess(time.monotonic() - started_at, 0.1)
+        self.assertIn(move, game.NNEONNEO_MOVE_TO_DIR)
+        self.assertGreaterEqual(self.engine.last_stats.max_depth, 1)
+
+    def test_timed_engine_keeps_worker_under_tight_budget(self):
+        engine = game.TimedNneonneoEngine(game.nneonneo_lib_path(), move_timeout=0.05)
+        try:
+            self.assertTrue(engine.warmup())
+            process = engine._process
+            board = [[2, 4, 8, 16], [4, 8, 16, 32], [0, 2, 0, 64], [0, 0, 0, 128]]
+            for _ in range(3):
+                self.assertIsNotNone(engine.choose_move(board))
+            self.assertIs(engine._process, process)
+        finally:
+            engine.close()
+
+    def test_timed_engine_pipelines_boards(self):
+        rng = random.Random(18)
+        boards = [random_board(rng) for _ in range(40)]
+        engine = game.TimedNneonneoEngine(game.nneonneo_lib_path(), move_timeout=1.0)
+        try:
+            directions = engine.choose_moves(boards, budget=0.2)
+            self.assertEqual(len(directions), len(boards))
+            for board, direction in zip(boards, directions):
+                if direction is None:
+                    self.assertFalse(game.can_move(board))
+                else:
+                    self.assertTrue(game.apply_move(board, direction)[2])
+            self.assertIn(engine.choose_move(boards[0]), game.BOT_DIRECTIONS + (None,))
+        finally:
+            engine.close()
+
+    def test_worker_answers_a_failed_request_and_keeps_serving(self):
+        best_move = game.NneonneoEngine.best_move
+
+        def failing_best_move(engine, packed, budget=None, max_depth=0):
+            if packed == 1:
+                raise ValueError("bad board")
+            return best_move(engine, packed, budget, max_depth)
+
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=True)
+        with mock.patch.object(game.NneonneoEngine, "best_move", failing_best_move):
+            worker = threading.Thread(target=game._nneonneo_worker, args=(child_conn, game.nneonneo_lib_path()))
+            worker.start()
+            try:
+                self.assertEqual(parent_conn.recv_bytes(), b"")
+                packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]])
+                parent_conn.send_bytes(game.NNEONNEO_REQUEST.pack(5, 1, 0.0))
+                parent_conn.send_bytes(game.NNEONNEO_REQUEST.pack(6, packed, 0.0))
+                with self.assertRaisesRegex(game.NneonneoRequestError, "bad board") as failure:
+                    game.decode_nneonneo_reply(parent_conn.recv_bytes())
+                self.assertEqual(failure.exception.request_id, 5)
+                request_id, move = game.decode_nneonneo_reply(parent_conn.recv_bytes())
+                self.assertEqual(request_id, 6)
+                self.assertIn(move, game.NNEONNEO_MOVE_TO_DIR)
+            finally:
+                parent_conn.send_bytes(b"")
+                worker.join(10.0)
+        self.assertFalse(worker.is_alive())
+
+    def test_timed_engine_swaps_in_spare_worker(self):
+        engine = game.TimedNneonneoEngine(game.nneonneo_lib_path(), move_timeout=1.0, spares=1)
+        try:
+            self.assertTrue(engine.warmup())
+            self.assertEqual((engine.cold_starts, engine.spare_hits), (1, 0))
+            spare, spare_conn = engine._spare_workers[0]
+            self.assertTrue(spare_conn.poll(game.NNEONNEO_STARTUP_TIMEOUT))
+            engine._clear_worker()
+            board = [[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]]
+            self.assertIn(engine.choose_move(board), game.BOT_DIRECTIONS)
+            self.assertIs(engine._process, spare)
+            self.assertEqual((engine.cold_starts, engine.spare_hits), (1, 1))
+            self.assertEqual(len(engine._spare_workers), 1)
+        finally:
+            engine.close()
+        self.assertEqual(engine._spare_workers, [])
+
+    def test_loading_spare_does_not_use_up_the_move_budget(self):
+        engine = game.TimedNneonneoEngine(game.nneonneo_lib_path(), move_timeout=1.0, spares=1)
+        # A spare that never reports ready, like one still loading the library.
+        loading, other_end = multiprocessing.Pipe(duplex=True)
+        engine._spare_workers.append((None, loading))
+        try:
+            started_at = time.monotonic()
+            self.assertIsNone(engine.choose_move([[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]]))
+            self.assertLess(time.monotonic() - started_at, 0.5)
+            self.assertEqual(engine._spare_workers, [(None, loading)])
+            self.assertEqual(engine.cold_starts, 0)
+        finally:
+            engine.close()
+            other_end.close()
+
+    def test_deferred_table_is_allocated_by_the_first_search(self):
+        engine = game.NneonneoEngine(game.nneonneo_lib_path(), table_mb=1, reserve_table=False)
+        try:
+            packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]])
+            self.assertIn(engine.best_move(packed, max_depth=2), game.NNEONNEO_MOVE_TO_DIR)
+            self.assertGreater(engine.last_stats.cache_size, 0)
+        finally:
+            engine.close()
+
+    def test_engine_handle_reuses_table_across_moves(self):
+        for policy in (game.NATIVE_REPLACE_DEPTH, game.NATIVE_REPLACE_ALWAYS):
+            engine = game.NneonneoEngine(game.nneonneo_lib_path(), table_mb=1, replace_policy=policy)
+            try:
+                packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]])
+                first = engine.best_move(packed)
+                filled = engine.last_stats.cache_size
+                self.assertGreater(filled, 0)
+                self.assertEqual(engine.best_move(packed), first)
+                self.assertGreater(engine.last_stats.cache_hits, 0)
+                self.assertLess(engine.last_stats.moves_evaled, 100)
+                engine.new_game()
+                self.assertEqual(engine.best_move(packed), first)
+                self.assertEqual(engine.last_stats.cache_size, filled)
+            finally:
+                engine.close()
+
+    def test_threaded_search_agrees_with_single_thread(self):
+        single = game.NneonneoEngine(game.nneonneo_lib_path(), table_mb=4)
+        threaded = game.NneonneoEngine(game.nneonneo_lib_path(), threads=3)
+        try:
+            self.assertIsNotNone(threaded.handle)
+            rng = random.Random(15)
+            for _ in range(10):
+                packed = game.board_to_nibble64(random_board(rng))
+                single.new_game()
+                threaded.new_game()
+                move = threaded.best_move(packed)
+                expected = single.best_move(packed)
+                self.assertEqual(threaded.last_stats.max_depth, single.last_stats.max_depth)
+                if move == expected:
+                    continue
+                # Threads race to fill shared entries, so near-tied moves may swap.
+                _, scores = self.engine.find_best_moves([packed], with_scores=True)
+                self.assertGreaterEqual(move, 0)
+                self.assertGreaterEqual(scores[move], 0.99 * max(scores))
+        finally:
+            single.close()
+            threaded.close()
+
+    def test_native_symmetries_match_python(self):
+        lib = self.engine.lib
+        if not hasattr(lib, "canonical_board"):
+            self.skipTest("library has no symmetry API")
+        lib.canonical_board.argtypes = [ctypes.c_uint64, ctypes.POINTER(ctypes.c_int)]
+        lib.canonical_board.restype = ctypes.c_uint64
+        lib.transform_board.argtypes = [ctypes.c_uint64, ctypes.c_int]
+        lib.transform_board.restype = ctypes.c_uint64
+        lib.symmetry_move.argtypes = [ctypes.c_int, ctypes.c_int]
+        lib.symmetry_move.restype = ctypes.c_int
+        dir_to_move = {direction: move for move, direction in game.NNEONNEO_MOVE_TO_DIR.items()}
+        rng = random.Random(21)
+        for _ in range(20):
+            packed = game.board_to_nibble64(random_board(rng))
+            symmetry = ctypes.c_int()
+            self.assertEqual(
+                (lib.canonical_board(packed, ctypes.byref(symmetry)), symmetry.value), game.canonical_board64(packed)
+            )
+            for index in range(game.SYMMETRY_COUNT):
+                self.assertEqual(lib.transform_board(packed, index), game.transform64(packed, index))
+                for move, direction in game.NNEONNEO_MOVE_TO_DIR.items():
+                    self.assertEqual(lib.symmetry_move(index, move), dir_to_move[game.symmetry_direction(index, direction)])
+
+    def test_symmetric_engine_scores_images_alike(self):
+        engine = game.NneonneoEngine(game.nneonneo_lib_path(), symmetric=True)
+        try:
+            packed = game.board_to_nibble64([[2, 4, 8, 16], [4, 8, 16, 32], [0, 2, 0, 64], [0, 0, 0, 128]])
+            dir_to_move = {direction: move for move, direction in game.NNEONNEO_MOVE_TO_DIR.items()}
+            scores = (ctypes.c_float * 4)()
+            engine.lib.engine_find_best_move(engine.handle, packed, 0, 2, scores, None)
+            expected = list(scores)
+            for symmetry in range(1, game.SYMMETRY_COUNT):
+                engine.lib.engine_find_best_move(engine.handle, game.transform64(packed, symmetry), 0, 2, scores, None)
+                for move, direction in game.NNEONNEO_MOVE_TO_DIR.items():
+                    image_move = dir_to_move[game.symmetry_direction(symmetry, direction)]
+                    self.assertAlmostEqual(scores[image_move], expected[move], delta=1e-3 * abs(expected[move]))
+        finally:
+            engine.close()
+
+    def test_accepts_uint64_buffers(self):
+        rng = random.Random(12)
+        packed = [game.board_to_nibble64(random_board(rng)) for _ in range(5)]
+        expected = self.engine.find_best_moves(packed)
+        self.assertEqual(self.engine.find_best_moves(array.array("Q", packed)), expected)
+        self.assertEqual(self.engine.find_best_moves(memoryview(array.array("Q", packed)).toreadonly()), expected)
+        for wrong in (array.array("i", [1, 2]), array.array("q", [1, 2]), array.array("d", [1.0, 2.0])):
+            with self.assertRaises(ValueError):
+                self.engine.find_best_moves(wrong)
+
+
+@unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+class AsyncNneonneoEngineTests(unittest.TestCase):
+    def test_multiplexes_requests_over_workers(self):
+        rng = random.Random(17)
+        boards = [random_board(rng) for _ in range(8)]
+
+        async def play():
+            async with game.AsyncNneonneoEngine(game.nneonneo_lib_path(), workers=2, move_timeout=5.0) as engine:
+                return await asyncio.gather(*(engine.choose_move(board) for board in boards))
+
+        for board, direction in zip(boards, asyncio.run(play())):
+            if direction is None:
+                self.assertFalse(game.can_move(board))
+            else:
+                self.assertTrue(game.apply_move(board, direction)[2])
+
+    def test_cancelled_request_does_not_block_the_next(self):
+        board = [[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]]
+
+        async def play():
+            async with game.AsyncNneonneoEngine(game.nneonneo_lib_path(), workers=1, move_timeout=5.0) as engine:
+                running = asyncio.ensure_future(engine.choose_move(board, timeout=0.5))
+                queued = asyncio.ensure_future(engine.choose_move(board, timeout=0.5))
+                await asyncio.sleep(0)
+                running.cancel()
+                queued.cancel()
+                return await engine.choose_move(board, timeout=2.0), running.cancelled(), queued.cancelled()
+
+        direction, running_cancelled, queued_cancelled = asyncio.run(play())
+        self.assertIn(direction, game.BOT_DIRECTIONS)
+        self.assertTrue(running_cancelled and queued_cancelled)
+
+    def test_closed_engine_raises_instead_of_restarting(self):
+        board = [[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]]
+
+        async def play():
+            async with game.AsyncNneonneoEngine(game.nneonneo_lib_path(), workers=1, move_timeout=5.0) as engine:
+                self.assertIn(await engine.choose_move(board), game.BOT_DIRECTIONS)
+            with self.assertRaisesRegex(RuntimeError, "closed"):
+                await engine.choose_move(board)
+            with self.assertRaisesRegex(RuntimeError, "closed"):
+                await engine.start()
+            self.assertEqual(engine._workers, [])
+
+        asyncio.run(play())
+
+    def test_failed_start_raises_and_leaves_no_workers(self):
+        board = [[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]]
+        missing = os.path.join(os.path.dirname(game.nneonneo_lib_path()), "missing.so")
+
+        async def play():
+            engine = game.AsyncNneonneoEngine(missing, workers=2, move_timeout=1.0)
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    await engine.choose_move(board)
+                self.assertEqual(engine._workers, [])
+            await engine.close()
+
+        asyncio.run(play())
+
+
+@unittest.skipUnless(os.path.isfile(game.nneonneo_lib_path()), "native library not built")
+class NneonneoEnginePoolTests(unittest.TestCase):
+    def test_concurrent_sessions_get_legal_moves(self):
+        rng = random.Random(16)
+        boards = [random_board(rng) for _ in range(12)]
+        results = {}
+        with game.NneonneoEnginePool(game.nneonneo_lib_path(), handles=3, table_mb=2) as pool:
+            self.assertEqual(len(pool.handles), 3)
+
+            def play(session):
+                futures = [pool.submit(board) for board in boards[session::4]]
+                results[session] = [future.result(timeout=30) for future in futures]
+
+            sessions = [threading.Thread(target=play, args=(session,)) for session in range(4)]
+            for thread in sessions:
+                thread.start()
+            for thread in sessions:
+                thread.join()
+
+            stats = game.SearchStats()
+            packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]])
+            self.assertIn(pool.submit(packed, budget=5.0, stats=stats).result(), game.BOT_DIRECTIONS)
+            self.assertGreater(stats.nodes, 0)
+
+        for session, directions in results.items():
+            for board, direction in zip(boards[session::4], directions):
+                if direction is None:
+                    self.assertFalse(game.can_move(board))
+                else:
+                    self.assertTrue(game.apply_move(board, direction)[2])
+        self.assertEqual(pool.handles, [])
+
+
+class LocalSearchPoolTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = game.LocalSearchPool(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_shallow_scores_match_serial_search(self):
+        board = [
+            [2, 4, 8, 16],
+            [0, 0, 4, 32],
+            [0, 2, 0, 2],
+            [0, 0, 0, 0],
+        ]
+        packed = game.board_to_nibble64(board)
+        boards = [game.apply_move64(packed, direction)[0] for direction in ("left", "up")]
+        deadline = time.monotonic() + 30.0
+        values, nodes = self.pool.score_moves(boards, 1, deadline, False, None)
+        expected = [
+            game.expectimax(value, 1, True, game.TranspositionTable(), game.SearchClock(30.0), False)
+            for value in boards
+        ]
+        self.assertEqual(values, expected)
+        self.assertGreater(nodes, 0)
+
+    def test_expired_deadline_reports_incomplete_depth(self):
+        packed = game.board_to_nibble64([[2, 4, 8, 16], [0, 0, 4, 32], [0, 2, 0, 2], [0, 0, 0, 0]])
+        values, _ = self.pool.score_moves([packed], game.POOL_SPLIT_DEPTH, time.monotonic() - 1.0, True, None)
+        self.assertIsNone(values)
+
+    def test_choose_auto_move_with_pool(self):
+        board = [
+            [2, 4, 8, 16],
+            [4, 8, 16, 32],
+            [8, 16, 32, 64],
+            [0, 0, 2, 0],
+        ]
+        stats = game.SearchStats()
+        direction = game.choose_auto_move(board, time_budget=0.3, strong_mode=True, stats=stats, pool=self.pool)
+        self.assertTrue(game.apply_move(board, direction)[2])
+        self.assertGreater(stats.nodes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()